@@ -0,0 +1,121 @@
+import math
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+
+class OverloadedError(Exception):
+    """Raised when a request is refused by the admission controller"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Server overloaded ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded wait queue in front of inference.
+
+    At most `max_concurrent` requests run at once; the rest wait in a queue
+    of at most `max_queue`. The expected wait is estimated from a smoothed
+    service time, and requests that would wait past the deadline are refused
+    straight away instead of timing out later. Requests expected to wait
+    longer than `degrade_after` are admitted in degraded mode so the caller
+    can do less work for them.
+    """
+
+    def __init__(self, max_concurrent, max_queue=32, deadline=2.0, degrade_after=None):
+        """
+        Args:
+            max_concurrent: Requests allowed to run at the same time
+            max_queue: Requests allowed to wait for a slot
+            deadline: Longest time in seconds a request may wait for a slot
+            degrade_after: Expected wait in seconds beyond which requests are
+                admitted in degraded mode (None never degrades)
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.degrade_after = degrade_after
+
+        self.in_flight = 0
+        self.waiting = 0
+        self._service_time = None
+        self._cond = threading.Condition()
+
+        # Admission statistics
+        self.admitted = 0
+        self.degraded = 0
+        self.rejected = Counter()
+
+    def estimate_wait(self):
+        """Expected seconds until a new request gets a slot"""
+        if self.in_flight < self.max_concurrent:
+            return 0.0
+        return (self.waiting + 1) * (self._service_time or 0.0) / self.max_concurrent
+
+    def _reject(self, reason, wait):
+        self.rejected[reason] += 1
+        raise OverloadedError(reason, max(1, math.ceil(wait)))
+
+    @contextmanager
+    def admit(self):
+        """
+        Hold a slot for the duration of the with-block
+
+        Yields:
+            True when the request was admitted in degraded mode
+
+        Raises:
+            OverloadedError: When the request should be refused
+        """
+        with self._cond:
+            wait = self.estimate_wait()
+            if self.in_flight >= self.max_concurrent:
+                if self.waiting >= self.max_queue:
+                    self._reject('queue_full', wait)
+                if wait > self.deadline:
+                    self._reject('deadline', wait)
+
+            self.waiting += 1
+            try:
+                acquired = self._cond.wait_for(lambda: self.in_flight < self.max_concurrent, self.deadline)
+            finally:
+                self.waiting -= 1
+            if not acquired:
+                self._reject('timeout', self.estimate_wait())
+
+            self.in_flight += 1
+            self.admitted += 1
+            degraded = self.degrade_after is not None and wait > self.degrade_after
+            if degraded:
+                self.degraded += 1
+
+        start = time.perf_counter()
+        try:
+            yield degraded
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._cond:
+                self.in_flight -= 1
+                if self._service_time is None:
+                    self._service_time = elapsed
+                else:
+                    self._service_time = 0.9 * self._service_time + 0.1 * elapsed
+                self._cond.notify()
+
+    def get_stats(self):
+        """Get the current load and admission counters"""
+        with self._cond:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'estimated_wait': self.estimate_wait(),
+                'admitted': self.admitted,
+                'degraded': self.degraded,
+                'rejected': dict(self.rejected)
+            }
@@ -1,99 +1,775 @@
+import time
+startup_begin = time.perf_counter()
+
 import os
-import cv2
-import numpy as np
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Request, Response, g, request, jsonify, send_from_directory
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
-from PIL import Image
-import io
-import base64
 import json
-import time
-from pathlib import Path
+import threading
+import zipfile
+import uuid
+import atexit
+from datetime import datetime, timedelta, timezone
+from collections import OrderedDict, Counter
+from contextlib import contextmanager
 
 # Import YOLO model (to be implemented in model.py)
-from model.model import EwasteDetector
+from model.model import (
+    EwasteDetector, BatchScheduler, DetectionStats, decode_image, decode_reduced, scale_detections,
+    draw_detections, resize_to_fit, encode_image
+)
+from model.backends import resolve_weights
+from model.pool import DetectorPool
+from model.cache import ResultCache
+from model.stream import FrameStream
+from model.registry import ModelRegistry, ModelProxy
+from monitoring import MetricsRegistry, SamplingProfiler
+from storage import ImageStore
+from stats_store import StatsStore
+from jobs import JobQueue, QueueFullError
+from admission import AdmissionController, OverloadedError
+from suggestions import SuggestionIndex
 
 app = Flask(__name__, static_folder='static')
 CORS(app)
 
+# Startup lifecycle: every phase is timed and logged, and /api/ready only
+# reports ready once the model is loaded and warmed up
+startup_phases = OrderedDict()
+startup_status = {'state': 'starting', 'error': None}
+
+@contextmanager
+def startup_phase(name):
+    start = time.perf_counter()
+    yield
+    startup_phases[name] = time.perf_counter() - start
+    print(f"Startup: {name} took {startup_phases[name]:.2f}s")
+
+startup_phases['imports'] = time.perf_counter() - startup_begin
+print(f"Startup: imports took {startup_phases['imports']:.2f}s")
+
 # Configuration
 UPLOAD_FOLDER = os.path.join(app.static_folder, 'uploads')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload
-
-# Initialize detector
-detector = EwasteDetector(model_path='model/best.pt')
-
-# E-waste recycling suggestions
-recycling_suggestions = {
-    'battery': [
-        'Recycle at certified e-waste centers',
-        'Many electronic stores offer battery recycling programs',
-        'Never dispose of in regular trash due to hazardous materials'
-    ],
-    'circuit board': [
-        'Contains valuable metals that can be recovered',
-        'Donate to educational institutions for STEM projects',
-        'Take to specialized e-waste recyclers'
-    ],
-    'charger': [
-        'Check with manufacturer for take-back programs',
-        'Recycle at e-waste collection events',
-        'Can often be reused with other compatible devices'
-    ],
-    'mobile': [
-        'Many carrier stores offer trade-in or recycling programs',
-        'Donate working phones to charity organizations',
-        'Remove personal data before recycling'
-    ],
-    'laptop': [
-        'Many manufacturers have take-back programs',
-        'Separate battery before recycling',
-        'Consider donation if still functional'
-    ],
-    'adapter': [
-        'Recycle with other electronic accessories',
-        'Check if compatible with other devices before disposal',
-        'E-waste collection sites accept these items'
-    ]
-}
-
-# Creative reuse ideas
-reuse_ideas = {
-    'circuit board': [
-        'Create decorative art or jewelry',
-        'Use in STEM education projects',
-        'Make coasters or wall art'
-    ],
-    'charger': [
-        'Repurpose cables for cable management',
-        'Use as plant ties in garden',
-        'Convert to a keychain or cable organizer'
-    ],
-    'mobile': [
-        'Repurpose as a dedicated music player',
-        'Use as a home security camera',
-        'Convert to a remote control for smart home devices'
-    ],
-    'laptop': [
-        'Convert to a digital photo frame',
-        'Use as a dedicated media server',
-        'Repurpose as a kitchen cookbook display'
-    ]
-}
+MAX_IMAGE_BYTES = 16 * 1024 * 1024  # 16MB max per image
+
+# Limits for /api/detect/batch (zip archives count their uncompressed size)
+app.config['BATCH_MAX_IMAGES'] = int(os.environ.get('BATCH_MAX_IMAGES', 64))
+app.config['BATCH_MAX_BYTES'] = int(os.environ.get('BATCH_MAX_MB', 256)) * 1024 * 1024
+
+# Request bodies are limited to a single image, plus some room for the
+# multipart framing; only the batch routes accept a whole batch
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+app.config['MAX_CONTENT_LENGTH'] = MAX_IMAGE_BYTES + MULTIPART_OVERHEAD_BYTES
+BATCH_ENDPOINTS = {'detect_batch', 'create_job'}
+
+class UploadRequest(Request):
+    """Request whose body limit is raised to BATCH_MAX_BYTES on the batch routes"""
+    
+    @property
+    def max_content_length(self):
+        # The endpoint is known before the view parses the form
+        if self.endpoint in BATCH_ENDPOINTS:
+            return app.config['BATCH_MAX_BYTES'] + MULTIPART_OVERHEAD_BYTES
+        return app.config['MAX_CONTENT_LENGTH']
+
+app.request_class = UploadRequest
+
+# Admission control for /api/detect: at most ADMISSION_MAX_CONCURRENT requests
+# decode and run inference at once (0 sizes it to fill every inference batch),
+# ADMISSION_QUEUE_SIZE more may wait, and requests expected to wait longer
+# than ADMISSION_DEADLINE_MS are refused. Beyond ADMISSION_DEGRADE_MS of
+# expected wait, requests skip tiling and annotation (0 never degrades).
+app.config['ADMISSION_MAX_CONCURRENT'] = int(os.environ.get('ADMISSION_MAX_CONCURRENT', 0))
+app.config['ADMISSION_QUEUE_SIZE'] = int(os.environ.get('ADMISSION_QUEUE_SIZE', 32))
+app.config['ADMISSION_DEADLINE_MS'] = float(os.environ.get('ADMISSION_DEADLINE_MS', 2000))
+app.config['ADMISSION_DEGRADE_MS'] = float(os.environ.get('ADMISSION_DEGRADE_MS', 500))
+
+# Detect requests the asyncio server (asgi.py) runs at once in its executor
+# (0 allows as many as the admission controller can run and queue)
+app.config['ASGI_EXECUTOR_THREADS'] = int(os.environ.get('ASGI_EXECUTOR_THREADS', 0))
+
+# Asynchronous jobs: uploads wait in a bounded queue for JOB_WORKERS threads
+# and finished results are kept for JOB_TTL_SECONDS
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+app.config['JOB_QUEUE_SIZE'] = int(os.environ.get('JOB_QUEUE_SIZE', 32))
+app.config['JOB_TTL_SECONDS'] = float(os.environ.get('JOB_TTL_SECONDS', 600))
+
+# Streaming sessions are closed after this many idle seconds
+app.config['STREAM_MAX_SESSIONS'] = int(os.environ.get('STREAM_MAX_SESSIONS', 8))
+app.config['STREAM_IDLE_SECONDS'] = float(os.environ.get('STREAM_IDLE_SECONDS', 60))
+
+# When disabled, uploads are never written to disk and annotated images are
+# kept in a bounded in-memory store instead
+app.config['SAVE_UPLOADS'] = os.environ.get('SAVE_UPLOADS', '1') != '0'
+app.config['MEMORY_IMAGE_LIMIT'] = int(os.environ.get('MEMORY_IMAGE_LIMIT', 100))
+
+# Stored uploads and annotated images are trimmed to this size, least recently
+# used first; files not requested for STORAGE_MAX_AGE_HOURS are removed (0 keeps them)
+app.config['STORAGE_MAX_MB'] = int(os.environ.get('STORAGE_MAX_MB', 1024))
+app.config['STORAGE_MAX_AGE_HOURS'] = float(os.environ.get('STORAGE_MAX_AGE_HOURS', 0))
+app.config['STORAGE_SWEEP_SECONDS'] = float(os.environ.get('STORAGE_SWEEP_SECONDS', 60))
+
+# Annotated images are drawn when their URL is first requested; this many
+# not-yet-requested images are remembered. With SAVE_UPLOADS disabled they
+# hold the upload bytes, which are also capped in total, oldest dropped first
+app.config['ANNOTATION_PENDING_LIMIT'] = int(os.environ.get('ANNOTATION_PENDING_LIMIT', 500))
+app.config['ANNOTATION_PENDING_MAX_MB'] = int(os.environ.get('ANNOTATION_PENDING_MAX_MB', 128))
+
+# JPEG uploads are decoded straight at 1/2, 1/4 or 1/8 scale when that still
+# covers the model input, and boxes are mapped back to the upload's pixels
+# (tiled inference always decodes at full resolution)
+app.config['REDUCED_DECODE'] = os.environ.get('REDUCED_DECODE', '1') != '0'
+
+# Annotated images are drawn at most ANNOTATED_MAX_SIDE pixels on the long
+# side (0 keeps the upload's size) and encoded as ANNOTATED_FORMAT (jpeg or
+# webp) at ANNOTATED_QUALITY, with a THUMBNAIL_SIZE thumbnail (0 disables)
+app.config['ANNOTATED_MAX_SIDE'] = int(os.environ.get('ANNOTATED_MAX_SIDE', 1280))
+app.config['ANNOTATED_FORMAT'] = os.environ.get('ANNOTATED_FORMAT', 'jpeg').lower()
+app.config['ANNOTATED_QUALITY'] = int(os.environ.get('ANNOTATED_QUALITY', 80))
+app.config['THUMBNAIL_SIZE'] = int(os.environ.get('THUMBNAIL_SIZE', 256))
+
+# File extension of each annotated image format, and the types images are served as
+ANNOTATED_EXTENSIONS = {'jpeg': 'jpg', 'webp': 'webp'}
+IMAGE_MIMETYPES = {'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp'}
+if app.config['ANNOTATED_FORMAT'] not in ANNOTATED_EXTENSIONS:
+    raise ValueError(f"ANNOTATED_FORMAT must be one of: {', '.join(ANNOTATED_EXTENSIONS)}")
+
+# Weights to serve; a .onnx file runs through ONNX Runtime instead of ultralytics,
+# a .json file describes a stub model for benchmarking and a directory of
+# exported variants serves the one its export report selected
+app.config['MODEL_PATH'] = os.environ.get('MODEL_PATH', 'model/best.pt')
+app.config['ONNX_THREADS'] = int(os.environ.get('ONNX_THREADS', 0)) or None
+
+# Several models can be served side by side as comma-separated name=path
+# pairs, listed fastest first (defaults to MODEL_PATH under the name
+# "default"). Requests pick one with ?model= or ?latency_budget_ms=.
+app.config['MODELS'] = os.environ.get('MODELS', '')
+app.config['DEFAULT_MODEL'] = os.environ.get('DEFAULT_MODEL', '') or None
+
+# Weights files are checked this often and reloaded when they change (0 disables)
+app.config['MODEL_WATCH_SECONDS'] = float(os.environ.get('MODEL_WATCH_SECONDS', 0))
+
+# Allows models to be reloaded through /api/models/<name>/reload
+app.config['MODEL_ADMIN_ENABLED'] = os.environ.get('MODEL_ADMIN_ENABLED', '0') == '1'
+
+# Set to 0 to fail at startup instead of downloading stock YOLOv8n weights
+# when MODEL_PATH is missing
+app.config['ALLOW_MODEL_DOWNLOAD'] = os.environ.get('ALLOW_MODEL_DOWNLOAD', '1') != '0'
+
+# Inferences on a blank image at the serving resolution before /api/ready
+# reports ready, so the first request does not pay for initialization
+app.config['WARMUP_RUNS'] = int(os.environ.get('WARMUP_RUNS', 2))
+
+# Worker-pool mode: run inference in this many separate processes, each
+# limited to INFERENCE_THREADS threads (0 runs inference in this process)
+app.config['INFERENCE_WORKERS'] = int(os.environ.get('INFERENCE_WORKERS', 0))
+app.config['INFERENCE_THREADS'] = int(os.environ.get('INFERENCE_THREADS', 1))
+
+# Catalog of recycling suggestions and reuse ideas by class keyword
+app.config['SUGGESTIONS_PATH'] = os.environ.get(
+    'SUGGESTIONS_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'suggestions.json')
+)
+
+# Allows the sampling profiler to be switched on through /api/profiler
+app.config['PROFILER_ENABLED'] = os.environ.get('PROFILER_ENABLED', '0') == '1'
+
+app.config['CONF_THRESHOLD'] = float(os.environ.get('CONF_THRESHOLD', 0.25))
+
+# Tiled inference for high-resolution photos: images larger than TILE_SIZE
+# pixels are split into overlapping tiles (0 disables tiling)
+app.config['TILE_SIZE'] = int(os.environ.get('TILE_SIZE', 0)) or None
+app.config['TILE_OVERLAP'] = float(os.environ.get('TILE_OVERLAP', 0.2))
+
+# Result cache for repeated uploads; a size of 0 disables the in-memory tier
+# and an empty directory disables the on-disk tier
+app.config['RESULT_CACHE_SIZE'] = int(os.environ.get('RESULT_CACHE_SIZE', 256))
+app.config['RESULT_CACHE_MAX_MB'] = int(os.environ.get('RESULT_CACHE_MAX_MB', 64))
+app.config['RESULT_CACHE_DIR'] = os.environ.get('RESULT_CACHE_DIR', '')
+
+# Micro-batching: a batch size of 1 sends every request straight to the model
+app.config['INFERENCE_BATCH_SIZE'] = int(os.environ.get('INFERENCE_BATCH_SIZE', 8))
+app.config['INFERENCE_BATCH_WAIT_MS'] = float(os.environ.get('INFERENCE_BATCH_WAIT_MS', 10))
+
+# Content-addressed store behind /api/images
+with startup_phase('storage'):
+    image_store = ImageStore(
+        UPLOAD_FOLDER,
+        max_bytes=app.config['STORAGE_MAX_MB'] * 1024 * 1024,
+        max_age=app.config['STORAGE_MAX_AGE_HOURS'] * 3600 or None,
+        sweep_interval=app.config['STORAGE_SWEEP_SECONDS']
+    )
+
+# Stored images never change under a given name, so clients may cache them for a year
+IMAGE_MAX_AGE = 365 * 24 * 3600
+
+# Detection statistics are persisted here so they survive restarts (empty disables)
+app.config['STATS_DB'] = os.environ.get('STATS_DB', 'stats.db')
+app.config['STATS_FLUSH_SECONDS'] = float(os.environ.get('STATS_FLUSH_SECONDS', 1))
+
+def parse_models(spec, default_path):
+    """Parse the MODELS setting into an ordered list of (name, path) pairs"""
+    if not spec.strip():
+        return [('default', default_path)]
+    pairs = []
+    for item in spec.split(','):
+        name, sep, path = item.strip().partition('=')
+        if not sep or not name.strip() or not path.strip():
+            raise ValueError(f"Invalid MODELS entry {item!r}, expected name=path")
+        pairs.append((name.strip(), path.strip()))
+    return pairs
+
+# All models share one set of statistics
+detection_stats = DetectionStats()
+
+# Pick up the counters of earlier runs and persist new records in the background
+if app.config['STATS_DB']:
+    with startup_phase('stats_restore'):
+        stats_store = StatsStore(app.config['STATS_DB'], flush_interval=app.config['STATS_FLUSH_SECONDS'])
+        detection_stats.restore(stats_store.get_totals())
+        detection_stats.sink = stats_store
+    atexit.register(stats_store.close)
+else:
+    stats_store = None
+
+# Suggestions are looked up per class name; each model's classes are
+# resolved against the catalog when it loads
+suggestion_index = SuggestionIndex.load(app.config['SUGGESTIONS_PATH'])
+
+def load_model(path, warmup=True):
+    """
+    Load one set of weights the way this server is configured to run them
+
+    Args:
+        path: Weights file
+        warmup: Whether to warm up an in-process model before returning
+            (worker processes always warm up while they start)
+
+    Returns:
+        Tuple of the detector and the object requests call detect on
+    """
+    backend_options = {}
+    if resolve_weights(path).lower().endswith('.onnx') and app.config['ONNX_THREADS']:
+        backend_options['num_threads'] = app.config['ONNX_THREADS']
+
+    if app.config['INFERENCE_WORKERS'] > 0:
+        detector = DetectorPool(
+            model_path=path,
+            workers=app.config['INFERENCE_WORKERS'],
+            threads_per_worker=app.config['INFERENCE_THREADS'],
+            warmup_runs=app.config['WARMUP_RUNS'],
+            allow_download=app.config['ALLOW_MODEL_DOWNLOAD'],
+            **backend_options
+        )
+    else:
+        detector = EwasteDetector(
+            model_path=path,
+            allow_download=app.config['ALLOW_MODEL_DOWNLOAD'],
+            **backend_options
+        )
+        if warmup and app.config['WARMUP_RUNS'] > 0:
+            detector.warmup(app.config['WARMUP_RUNS'])
+    detector.stats = detection_stats
+    suggestion_index.prime(detector.class_names())
+
+    # Concurrent requests are gathered into batches for a single predict call;
+    # with a worker pool, one batch per worker can be in flight
+    if app.config['INFERENCE_BATCH_SIZE'] > 1:
+        inference = BatchScheduler(
+            detector,
+            max_batch_size=app.config['INFERENCE_BATCH_SIZE'],
+            max_wait_ms=app.config['INFERENCE_BATCH_WAIT_MS'],
+            workers=max(1, app.config['INFERENCE_WORKERS'])
+        )
+    else:
+        inference = detector
+    return detector, inference
+
+# Load every configured model; in-process models are warmed up in the background below
+models = ModelRegistry(
+    load_model,
+    default=app.config['DEFAULT_MODEL'],
+    watch_interval=app.config['MODEL_WATCH_SECONDS']
+)
+with startup_phase('model_load'):
+    for model_name, model_path in parse_models(app.config['MODELS'], app.config['MODEL_PATH']):
+        models.add(model_name, model_path, warmup=False)
+    models.get()  # Fail at startup when DEFAULT_MODEL names no configured model
+model_load_seconds = startup_phases['model_load']
+atexit.register(models.close)
+
+if app.config['RESULT_CACHE_SIZE'] > 0 or app.config['RESULT_CACHE_DIR']:
+    result_cache = ResultCache(
+        max_entries=app.config['RESULT_CACHE_SIZE'],
+        max_bytes=app.config['RESULT_CACHE_MAX_MB'] * 1024 * 1024,
+        disk_dir=app.config['RESULT_CACHE_DIR'] or None,
+        image_extension=ANNOTATED_EXTENSIONS[app.config['ANNOTATED_FORMAT']]
+    )
+else:
+    result_cache = None
+
+admission = AdmissionController(
+    max_concurrent=app.config['ADMISSION_MAX_CONCURRENT'] or
+        max(1, app.config['INFERENCE_BATCH_SIZE']) * max(1, app.config['INFERENCE_WORKERS']),
+    max_queue=app.config['ADMISSION_QUEUE_SIZE'],
+    deadline=app.config['ADMISSION_DEADLINE_MS'] / 1000.0,
+    degrade_after=app.config['ADMISSION_DEGRADE_MS'] / 1000.0 or None
+)
+
+job_queue = JobQueue(
+    workers=app.config['JOB_WORKERS'],
+    max_queued=app.config['JOB_QUEUE_SIZE'],
+    ttl=app.config['JOB_TTL_SECONDS']
+)
+
+def warm_up():
+    """Warm up the in-process models, then mark the server ready"""
+    try:
+        with startup_phase('warmup'):
+            for entry in models.entries():
+                if isinstance(entry.detector, EwasteDetector) and app.config['WARMUP_RUNS'] > 0:
+                    entry.detector.warmup(app.config['WARMUP_RUNS'])
+    except Exception as e:
+        startup_status.update(state='failed', error=str(e))
+        print(f"Warning: Model warm-up failed: {e}")
+        return
+    startup_status['state'] = 'ready'
+    print(f"Startup: ready after {time.perf_counter() - startup_begin:.2f}s")
+
+# The server answers liveness checks while the warm-up runs
+threading.Thread(target=warm_up, name='warmup', daemon=True).start()
+
+# Prometheus metrics served at /metrics
+metrics = MetricsRegistry()
+REQUESTS = metrics.counter(
+    'trashify_http_requests_total', 'HTTP requests by endpoint, method and status',
+    ('endpoint', 'method', 'status')
+)
+REQUEST_SECONDS = metrics.histogram(
+    'trashify_http_request_duration_seconds', 'HTTP request latency by endpoint', ('endpoint',)
+)
+STAGE_SECONDS = metrics.histogram(
+    'trashify_detect_stage_duration_seconds', 'Time spent in each stage of /api/detect', ('stage',)
+)
+CACHE_HITS = metrics.counter('trashify_detect_cache_hits_total', 'Detect requests served from the result cache')
+metrics.callback_counter(
+    'trashify_images_processed_total', 'Images run through the model',
+    lambda: detection_stats.get_processed_count()
+)
+metrics.callback_counter(
+    'trashify_detections_total', 'Detections by class',
+    lambda: {(name,): count for name, count in detection_stats.get_detection_breakdown().items()},
+    ('class',)
+)
+metrics.gauge(
+    'trashify_inference_queue_depth', 'Requests waiting for a batch slot',
+    lambda: sum(entry.inference.get_queue_depth() for entry in models.entries()
+                if isinstance(entry.inference, BatchScheduler))
+)
+metrics.gauge(
+    'trashify_admission_in_flight', 'Detect requests holding an admission slot',
+    lambda: admission.in_flight
+)
+metrics.gauge(
+    'trashify_admission_queue_depth', 'Detect requests waiting for an admission slot',
+    lambda: admission.waiting
+)
+ADMISSION_REJECTED = metrics.counter(
+    'trashify_admission_rejected_total', 'Detect requests refused by admission control', ('reason',)
+)
+ADMISSION_DEGRADED = metrics.counter(
+    'trashify_admission_degraded_total', 'Detect requests served in degraded mode'
+)
+metrics.gauge(
+    'trashify_job_queue_depth', 'Jobs waiting for a job worker',
+    lambda: job_queue.get_stats()['queued']
+)
+metrics.gauge('trashify_model_load_seconds', 'Time taken to load the model at startup', lambda: model_load_seconds)
+metrics.gauge(
+    'trashify_startup_phase_seconds', 'Time taken by each startup phase',
+    lambda: {(phase,): seconds for phase, seconds in list(startup_phases.items())},
+    ('phase',)
+)
+metrics.gauge('trashify_ready', 'Whether the model is loaded and warmed up', lambda: int(startup_status['state'] == 'ready'))
+
+profiler = SamplingProfiler()
+
+# Active frame streams by session id
+streams = {}
+streams_lock = threading.Lock()
+
+# Annotated images produced while SAVE_UPLOADS is disabled
+memory_images = OrderedDict()
+memory_images_lock = threading.Lock()
+
+# Annotated images waiting for their first request:
+# output filename -> (upload path or bytes, detections, result cache key)
+pending_annotations = OrderedDict()
+pending_annotations_lock = threading.Lock()
+# Upload bytes held in pending_annotations
+pending_annotations_size = {'bytes': 0}
+
+def tile_options():
+    """Tiling arguments for detect calls and the matching cache key suffix"""
+    options = (app.config['TILE_SIZE'], app.config['TILE_OVERLAP'])
+    return options, pipeline_key(options)
+
+def pipeline_key(tiling):
+    """
+    Cache key suffix for the settings, besides the image, model and threshold,
+    that shape a result and its annotated image
+    """
+    if tiling[0]:
+        decode = f"tile={tiling[0]}:{tiling[1]:.3f}"
+    else:
+        decode = f"reduced={int(app.config['REDUCED_DECODE'])}"
+    display = (f"display={app.config['ANNOTATED_MAX_SIDE']}:{app.config['ANNOTATED_FORMAT']}:"
+               f"{app.config['ANNOTATED_QUALITY']}:{app.config['THUMBNAIL_SIZE']}")
+    return f"{decode},{display}"
+
+def decode_upload(data, model, tiling):
+    """
+    Decode an upload for inference
+    
+    Without tiling, JPEGs are decoded at reduced size, down to the model input.
+    
+    Returns:
+        Tuple of the BGR array and the (x, y) factors that map boxes found in
+        it back onto the upload
+    """
+    if app.config['REDUCED_DECODE'] and not tiling[0]:
+        return decode_reduced(data, model.input_size)
+    return decode_image(data), (1.0, 1.0)
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def store_memory_image(filename, data):
+    """Keep encoded image bytes in memory, dropping the oldest beyond the limit"""
+    with memory_images_lock:
+        memory_images[filename] = data
+        while len(memory_images) > app.config['MEMORY_IMAGE_LIMIT']:
+            memory_images.popitem(last=False)
+
+def add_suggestions(results, compact=False):
+    """
+    Attach recycling suggestions and reuse ideas to each detection
+    
+    Args:
+        results: Detections from the model
+        compact: Reference suggestions by catalog keyword; the lists are then
+            returned once for the whole response
+        
+    Returns:
+        Tuple of the processed detections and the referenced suggestion
+        lists by section (None unless compact)
+    """
+    return suggestion_index.annotate(results, compact)
+
+def merge_suggestions(target, suggestions):
+    """Fold one image's referenced suggestion lists into a response-wide set"""
+    for section, entries in suggestions.items():
+        target.setdefault(section, {}).update(entries)
+
+def upload_filename(filename, data):
+    """Content-addressed name for an upload, keeping its extension"""
+    extension = filename.rsplit('.', 1)[-1].lower()
+    return ImageStore.content_name(data, extension if extension in ALLOWED_EXTENSIONS else 'jpg')
+
+def save_upload(upload_name, data):
+    """Store the original upload when SAVE_UPLOADS is enabled"""
+    if not app.config['SAVE_UPLOADS']:
+        return None
+    return image_store.put(upload_name, data)
+
+def read_zip_images(file):
+    """Extract the image entries of an uploaded zip archive"""
+    items = []
+    try:
+        archive = zipfile.ZipFile(file.stream)
+    except zipfile.BadZipFile:
+        return [{'filename': secure_filename(file.filename), 'error': 'Invalid zip archive'}]
+    
+    with archive:
+        total_bytes = 0
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            filename = secure_filename(os.path.basename(info.filename))
+            if not allowed_file(filename):
+                continue
+            
+            # Check sizes before extracting so an archive cannot expand unbounded
+            total_bytes += info.file_size
+            if info.file_size > MAX_IMAGE_BYTES or total_bytes > app.config['BATCH_MAX_BYTES']:
+                items.append({'filename': filename, 'error': 'File too large'})
+                continue
+            items.append({'filename': filename, 'data': archive.read(info)})
+    return items
+
+def collect_batch_uploads():
+    """Gather the images of a batch request from files and zip archives"""
+    items = []
+    for file in request.files.getlist('files') + request.files.getlist('file'):
+        if file.filename == '':
+            continue
+        if file.filename.lower().endswith('.zip'):
+            items.extend(read_zip_images(file))
+        elif allowed_file(file.filename):
+            data = file.read()
+            if len(data) > MAX_IMAGE_BYTES:
+                items.append({'filename': secure_filename(file.filename), 'error': 'File too large'})
+            else:
+                items.append({'filename': secure_filename(file.filename), 'data': data})
+        else:
+            items.append({'filename': secure_filename(file.filename), 'error': 'File type not allowed'})
+    return items
+
+def parse_time(value, utc_offset, end=False):
+    """
+    Parse a query time given as a Unix timestamp or an ISO date/datetime
+    
+    Dates without a time are taken at local midnight of the caller (see
+    utc_offset); an end date covers that whole day.
+    """
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone(timedelta(minutes=utc_offset)))
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed.timestamp()
+
+def annotated_filename(cache_key):
+    """The annotated image is fully determined by the image and detection settings"""
+    return f"annotated_{cache_key[:32]}.{ANNOTATED_EXTENSIONS[app.config['ANNOTATED_FORMAT']]}"
+
+def thumbnail_filename(output_filename):
+    """Name of the thumbnail of an annotated image"""
+    return 'thumb_' + output_filename[len('annotated_'):]
+
+def annotated_urls(output_filename):
+    """Response fields linking to an annotated image and its thumbnail"""
+    return {
+        'annotated_image': f"/api/images/{output_filename}",
+        'thumbnail_image': f"/api/images/{thumbnail_filename(output_filename)}" if app.config['THUMBNAIL_SIZE'] else None
+    }
+
+def save_annotated(output_filename, annotated):
+    """Store an encoded annotated image and return its filename"""
+    if app.config['SAVE_UPLOADS']:
+        image_store.put(output_filename, annotated)
+    else:
+        store_memory_image(output_filename, annotated)
+    return output_filename
+
+def publish_annotated(cache_key, upload_name, data, detections, annotated=None):
+    """
+    Make the annotated image of an upload available under its output filename
+    
+    Already rendered images (e.g. from the result cache) are stored directly;
+    otherwise only what is needed to draw the image later is remembered and
+    the drawing happens on the first request for it.
+    
+    Returns:
+        Output filename of the annotated image
+    """
+    output_filename = annotated_filename(cache_key)
+    
+    # Repeat uploads find their annotated image already stored
+    if app.config['SAVE_UPLOADS']:
+        if image_store.touch(output_filename):
+            return output_filename
+    else:
+        with memory_images_lock:
+            if output_filename in memory_images:
+                return output_filename
+    
+    if annotated is not None:
+        return save_annotated(output_filename, annotated)
+    
+    # Reread the saved upload from disk rather than holding on to its bytes
+    if app.config['SAVE_UPLOADS']:
+        source = image_store.path(upload_name)
+    else:
+        source = data
+    max_bytes = app.config['ANNOTATION_PENDING_MAX_MB'] * 1024 * 1024
+    with pending_annotations_lock:
+        drop_pending_annotation(output_filename)
+        pending_annotations[output_filename] = (source, detections, cache_key)
+        if isinstance(source, bytes):
+            pending_annotations_size['bytes'] += len(source)
+        # The newest entry is kept even when it alone is over the byte limit
+        while len(pending_annotations) > app.config['ANNOTATION_PENDING_LIMIT'] or \
+                (len(pending_annotations) > 1 and pending_annotations_size['bytes'] > max_bytes):
+            drop_pending_annotation(next(iter(pending_annotations)))
+    return output_filename
+
+def drop_pending_annotation(output_filename):
+    """Forget a pending annotated image; the caller holds pending_annotations_lock"""
+    entry = pending_annotations.pop(output_filename, None)
+    if entry is not None and isinstance(entry[0], bytes):
+        pending_annotations_size['bytes'] -= len(entry[0])
+
+def encode_annotated(image):
+    """Encode an annotated image in the configured format"""
+    return encode_image(image, app.config['ANNOTATED_FORMAT'], app.config['ANNOTATED_QUALITY'])
+
+def render_pending_annotation(output_filename):
+    """
+    Draw a deferred annotated image and its thumbnail
+    
+    Returns:
+        Tuple of the encoded annotated image and thumbnail (None when
+        thumbnails are disabled), or None if the image is not pending
+    """
+    with pending_annotations_lock:
+        entry = pending_annotations.get(output_filename)
+    if entry is None:
+        return None
+    
+    source, detections, cache_key = entry
+    max_side = app.config['ANNOTATED_MAX_SIDE'] or None
+    stage_start = time.perf_counter()
+    try:
+        if not isinstance(source, bytes):
+            with open(source, 'rb') as f:
+                source = f.read()
+        
+        # Decode no larger than the display size and draw the boxes at that size
+        image, scale = decode_reduced(source, max_side)
+        annotated_image = draw_detections(
+            image, scale_detections(detections, (1 / scale[0], 1 / scale[1])), max_side
+        )
+    except (ValueError, OSError):
+        # The upload was evicted from the store before the image was requested
+        with pending_annotations_lock:
+            drop_pending_annotation(output_filename)
+        return None
+    annotated = encode_annotated(annotated_image)
+    thumbnail = None
+    if app.config['THUMBNAIL_SIZE']:
+        thumbnail = encode_annotated(resize_to_fit(annotated_image, app.config['THUMBNAIL_SIZE']))
+    elapsed = time.perf_counter() - stage_start
+    detection_stats.record_stage('draw', elapsed)
+    STAGE_SECONDS.observe(elapsed, 'draw')
+    
+    save_annotated(output_filename, annotated)
+    if thumbnail is not None:
+        save_annotated(thumbnail_filename(output_filename), thumbnail)
+    with pending_annotations_lock:
+        drop_pending_annotation(output_filename)
+    if result_cache is not None:
+        result_cache.put(cache_key, detections, annotated)
+    return annotated, thumbnail
+
+def render_thumbnail(filename):
+    """
+    Shrink a stored annotated image into its missing thumbnail (e.g. after a
+    result cache hit, or when only the thumbnail was evicted)
+    
+    Returns:
+        The encoded thumbnail, or None if the annotated image is not stored
+    """
+    output_filename = 'annotated_' + filename[len('thumb_'):]
+    with memory_images_lock:
+        annotated = memory_images.get(output_filename)
+    if annotated is None and app.config['SAVE_UPLOADS'] and image_store.touch(output_filename):
+        try:
+            with open(image_store.path(output_filename), 'rb') as f:
+                annotated = f.read()
+        except OSError:
+            return None
+    if annotated is None:
+        return None
+    
+    image, _ = decode_reduced(annotated, app.config['THUMBNAIL_SIZE'])
+    thumbnail = encode_annotated(resize_to_fit(image, app.config['THUMBNAIL_SIZE']))
+    save_annotated(filename, thumbnail)
+    return thumbnail
+
+def image_mimetype(filename):
+    return IMAGE_MIMETYPES.get(filename.rsplit('.', 1)[-1].lower(), 'application/octet-stream')
+
+def image_response(filename, data=None):
+    """
+    Serve a stored image with an ETag and long-lived cache headers
+    
+    Names are content-addressed, so the name itself serves as the ETag and
+    revalidation never needs to read the file.
+    """
+    etag = os.path.splitext(filename)[0]
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif data is not None:
+        response = Response(data, mimetype=image_mimetype(filename))
+    else:
+        response = send_from_directory(image_store.root, filename, etag=False, mimetype=image_mimetype(filename))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f"public, max-age={IMAGE_MAX_AGE}, immutable"
+    return response
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or 'unknown'
+    REQUESTS.inc(endpoint, request.method, str(response.status_code))
+    if 'request_start' in g:
+        REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, endpoint)
+    return response
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy', 'message': 'E-waste detection API is running'})
 
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    response = {
+        'status': startup_status['state'],
+        'phases': dict(startup_phases)
+    }
+    if startup_status['error']:
+        response['error'] = startup_status['error']
+    return jsonify(response), 200 if startup_status['state'] == 'ready' else 503
+
+def select_model(args):
+    """
+    Model picked by the request: named with ?model=, chosen to fit
+    ?latency_budget_ms=, or the default model
+    
+    Args:
+        args: Query parameters of the request
+    
+    Returns:
+        Tuple of the ModelEntry and an error (body, status), one of them None
+    """
+    name = args.get('model')
+    if name:
+        try:
+            return models.get(name), None
+        except KeyError:
+            return None, ({'error': f'Unknown model: {name}', 'models': models.names()}, 400)
+    
+    budget = args.get('latency_budget_ms')
+    if budget:
+        try:
+            return models.select(float(budget) / 1000.0), None
+        except ValueError:
+            return None, ({'error': 'latency_budget_ms must be a number'}, 400)
+    return models.get(), None
+
 @app.route('/api/detect', methods=['POST'])
 def detect_objects():
     # Check if image file is present in request
@@ -110,83 +786,641 @@ def detect_objects():
     if not allowed_file(file.filename):
         return jsonify({'error': f'File type not allowed. Allowed types: {", ".join(ALLOWED_EXTENSIONS)}'}), 400
     
+    model, error = select_model(request.args)
+    if error is not None:
+        return error
+    
+    # Clients that only want the JSON detections can skip annotation entirely
+    annotate = request.args.get('annotate', '1') != '0'
+    compact = request.args.get('compact', '0') == '1'
+    
+    with STAGE_SECONDS.time('upload_read'):
+        data = file.read()
+    body, status, headers = detect_upload(file.filename, data, model, annotate, compact)
+    with STAGE_SECONDS.time('serialize'):
+        return jsonify(body), status, headers
+
+def detect_upload(filename, data, model, annotate=True, compact=False):
+    """
+    Run one uploaded image through the detect pipeline
+    
+    Shared by the Flask route and the asyncio server (asgi.py). Everything
+    here blocks, so async callers run it in an executor.
+    
+    Args:
+        filename: Client-side filename of the upload
+        data: Encoded image bytes
+        model: ModelEntry to run
+        annotate: Whether to publish an annotated image URL
+        compact: Reference suggestions by catalog keyword
+    
+    Returns:
+        Tuple of the response body, status code and extra headers
+    """
     try:
-        # Save file temporarily
-        filename = secure_filename(file.filename)
         timestamp = int(time.time())
-        unique_filename = f"{timestamp}_{filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(filepath)
         
-        # Process image with YOLO model
-        results = detector.detect(filepath)
+        if len(data) > MAX_IMAGE_BYTES:
+            return {'error': 'File too large'}, 413, {}
+        upload_name = upload_filename(filename, data)
         
-        # Process results and generate suggestions
-        processed_results = []
-        for detection in results:
-            obj_class = detection['class']
-            confidence = detection['confidence']
-            
-            # Get suggestions based on object class
-            suggestions = []
-            reuses = []
-            
-            # Convert class name to lowercase for matching
-            obj_class_lower = obj_class.lower()
-            
-            # Find matching recycling suggestions
-            for key in recycling_suggestions:
-                if key in obj_class_lower:
-                    suggestions = recycling_suggestions[key]
-                    break
-            
-            # Find matching reuse ideas
-            for key in reuse_ideas:
-                if key in obj_class_lower:
-                    reuses = reuse_ideas[key]
-                    break
+        # Repeat uploads skip decoding and inference entirely
+        conf_threshold = app.config['CONF_THRESHOLD']
+        tiling, cache_extra = tile_options()
+        with STAGE_SECONDS.time('cache_lookup'):
+            cache_key = ResultCache.make_key(data, model.model_id, conf_threshold, cache_extra)
+            cached = result_cache.get(cache_key) if result_cache is not None else None
+        
+        degraded = False
+        if cached is not None:
+            results, annotated = cached
+            CACHE_HITS.inc()
+        else:
+            # Decoding and inference only start once a slot is free; under
+            # overload the request is refused early instead of timing out
+            wait_start = time.perf_counter()
+            try:
+                with admission.admit() as degraded:
+                    STAGE_SECONDS.observe(time.perf_counter() - wait_start, 'admission')
+                    
+                    # Degraded requests skip the extra work of tiling and annotation
+                    if degraded:
+                        ADMISSION_DEGRADED.inc()
+                        annotate = False
+                        tiling = (None, 0.0)
+                        cache_key = ResultCache.make_key(data, model.model_id, conf_threshold, pipeline_key(tiling))
+                    
+                    stage_start = time.perf_counter()
+                    try:
+                        image, scale = decode_upload(data, model, tiling)
+                    except ValueError:
+                        return {'error': 'Could not decode image'}, 400, {}
+                    elapsed = time.perf_counter() - stage_start
+                    detection_stats.record_stage('decode', elapsed)
+                    STAGE_SECONDS.observe(elapsed, 'decode')
+                    
+                    # Process image with YOLO model
+                    # Holding the model keeps a hot reload from shutting it down mid-request
+                    with STAGE_SECONDS.time('detect'), models.hold(model) as held:
+                        results = scale_detections(held.detect(image, conf_threshold, *tiling), scale)
+            except OverloadedError as e:
+                ADMISSION_REJECTED.inc(e.reason)
+                return {'error': str(e), 'retry_after': e.retry_after}, 503, {'Retry-After': str(e.retry_after)}
             
-            processed_results.append({
-                'class': obj_class,
-                'confidence': confidence,
-                'bbox': detection['bbox'],
-                'recycling_suggestions': suggestions,
-                'reuse_ideas': reuses
-            })
+            # The annotated image is drawn later, when its URL is requested
+            annotated = None
+            if result_cache is not None:
+                result_cache.put(cache_key, results, None)
         
-        # Generate image with bounding boxes
-        output_img_path = os.path.join(app.config['UPLOAD_FOLDER'], f"output_{unique_filename}")
-        detector.draw_boxes(filepath, output_img_path, results)
+        with STAGE_SECONDS.time('upload_save'):
+            save_upload(upload_name, data)
+        
+        # Process results and generate suggestions
+        with STAGE_SECONDS.time('suggestions'):
+            processed_results, suggestions = add_suggestions(results, compact)
+        
+        # Publish the annotated image and thumbnail URLs
+        urls = {'annotated_image': None, 'thumbnail_image': None}
+        if annotate:
+            with STAGE_SECONDS.time('output_save'):
+                output_filename = publish_annotated(cache_key, upload_name, data, results, annotated)
+            urls = annotated_urls(output_filename)
         
         # Create response with URLs
         response = {
-            'original_image': f"/api/images/{unique_filename}",
-            'annotated_image': f"/api/images/output_{unique_filename}",
+            'original_image': f"/api/images/{upload_name}" if app.config['SAVE_UPLOADS'] else None,
+            **urls,
             'detections': processed_results,
+            'model': model.name,
             'timestamp': timestamp
         }
+        if compact:
+            response['suggestions'] = suggestions
+        if degraded:
+            response['degraded'] = True
+        
+        return response, 200, {}
+        
+    except Exception as e:
+        return {'error': str(e)}, 500, {}
+
+def detect_chunk(chunk, model, conf_threshold, tiling):
+    """
+    Decode one slice of a batch and run it through the model
+    
+    The decoded images are dropped on return, so a batch never holds more
+    than one slice of pixels at a time.
+    
+    Args:
+        chunk: Upload dicts from collect_batch_uploads; each gets its
+            detections, or an error when it cannot be decoded
+        model: ModelEntry to run
+        conf_threshold: Confidence threshold for detections
+        tiling: Tile size and overlap
+    """
+    decoded = []
+    with STAGE_SECONDS.time('decode'):
+        for item in chunk:
+            try:
+                image, scale = decode_upload(item['data'], model, tiling)
+            except ValueError:
+                item['error'] = 'Could not decode image'
+                continue
+            decoded.append((item, image, scale))
+    if not decoded:
+        return
+    
+    with STAGE_SECONDS.time('detect'), models.hold(model) as held:
+        batch_results = held.detector.detect_batch([image for _, image, _ in decoded], conf_threshold, *tiling)
+    for (item, _, scale), results in zip(decoded, batch_results):
+        item['detections'] = results = scale_detections(results, scale)
+        if result_cache is not None:
+            result_cache.put(item['cache_key'], results, None)
+
+def process_batch(items, annotate, model_name=None, progress=None, compact=False, queued=False):
+    """
+    Run a list of uploads through the cache and the model
+    
+    Args:
+        items: Upload dicts from collect_batch_uploads
+        annotate: Whether to include annotated image URLs
+        model_name: Model to use (None for the default); looked up when the
+            batch runs so queued jobs use the current version of the model
+        progress: Optional callback receiving the number of finished images
+        compact: Reference suggestions by keyword and list them once for
+            the whole batch
+        queued: Whether the batch runs on the job queue, which bounds its
+            own concurrency; other batches take an admission slot for each
+            slice of INFERENCE_BATCH_SIZE images
         
-        return jsonify(response)
+    Returns:
+        Response dict with per-image results and an aggregated summary
+    
+    Raises:
+        OverloadedError: When admission control refuses a slice; the slices
+            already run stay cached, so a retry only runs the rest
+    """
+    model = models.get(model_name)
+    conf_threshold = app.config['CONF_THRESHOLD']
+    tiling, cache_extra = tile_options()
+    timestamp = int(time.time())
+    
+    # Serve what we can from the cache; the rest is decoded slice by slice
+    pending = []
+    for item in items:
+        if 'error' in item:
+            continue
+        item['upload_name'] = upload_filename(item['filename'], item['data'])
+        item['cache_key'] = cache_key = ResultCache.make_key(
+            item['data'], model.model_id, conf_threshold, cache_extra
+        )
+        cached = result_cache.get(cache_key) if result_cache is not None else None
+        if cached is not None:
+            item['detections'], item['annotated'] = cached
+            CACHE_HITS.inc()
+            continue
+        pending.append(item)
+    
+    completed = len(items) - len(pending)
+    if progress is not None:
+        progress(completed)
+    
+    # Run the remaining images through the model in real batches
+    chunk_size = max(1, app.config['INFERENCE_BATCH_SIZE'])
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        if queued:
+            detect_chunk(chunk, model, conf_threshold, tiling)
+        else:
+            wait_start = time.perf_counter()
+            with admission.admit() as degraded:
+                STAGE_SECONDS.observe(time.perf_counter() - wait_start, 'admission')
+                
+                # Degraded slices skip tiling, as single detect requests do
+                chunk_tiling = tiling
+                if degraded:
+                    ADMISSION_DEGRADED.inc()
+                    chunk_tiling = (None, 0.0)
+                    for item in chunk:
+                        item['cache_key'] = ResultCache.make_key(
+                            item['data'], model.model_id, conf_threshold, pipeline_key(chunk_tiling)
+                        )
+                detect_chunk(chunk, model, conf_threshold, chunk_tiling)
+        
+        completed += len(chunk)
+        if progress is not None:
+            progress(completed)
+    
+    # Build the per-image results and the aggregated breakdown
+    images = []
+    breakdown = Counter()
+    batch_suggestions = {}
+    for item in items:
+        if 'error' in item:
+            images.append({'filename': item['filename'], 'error': item['error']})
+            continue
         
+        detections, suggestions = add_suggestions(item['detections'], compact)
+        if compact:
+            merge_suggestions(batch_suggestions, suggestions)
+        entry = {
+            'filename': item['filename'],
+            'original_image': None,
+            'detections': detections
+        }
+        data = item.pop('data')
+        saved = save_upload(item['upload_name'], data)
+        if saved:
+            entry['original_image'] = f"/api/images/{saved}"
+        if annotate:
+            output_filename = publish_annotated(
+                item['cache_key'], item['upload_name'], data, item['detections'], item.get('annotated')
+            )
+            entry.update(annotated_urls(output_filename))
+        breakdown.update(det['class'] for det in item['detections'])
+        images.append(entry)
+    
+    response = {
+        'images': images,
+        'summary': {
+            'total_images': len(items),
+            'failed_images': sum(1 for entry in images if 'error' in entry),
+            'total_detections': sum(breakdown.values()),
+            'detection_breakdown': dict(breakdown)
+        },
+        'model': model.name,
+        'timestamp': timestamp
+    }
+    if compact:
+        response['suggestions'] = batch_suggestions
+    return response
+
+def validate_batch(items):
+    """Return an error response for an unusable batch, or None"""
+    if not items:
+        return jsonify({'error': 'No image files in request'}), 400
+    if len(items) > app.config['BATCH_MAX_IMAGES']:
+        return jsonify({'error': f"Too many images. Maximum per batch: {app.config['BATCH_MAX_IMAGES']}"}), 400
+    return None
+
+@app.route('/api/detect/batch', methods=['POST'])
+def detect_batch():
+    items = collect_batch_uploads()
+    error = validate_batch(items)
+    if error is not None:
+        return error
+    
+    # Annotated image URLs are only included on request; most batch clients want JSON
+    annotate = request.args.get('annotate', '0') == '1'
+    compact = request.args.get('compact', '0') == '1'
+    model, error = select_model(request.args)
+    if error is not None:
+        return error
+    
+    try:
+        return jsonify(process_batch(items, annotate, model.name, compact=compact))
+    except OverloadedError as e:
+        ADMISSION_REJECTED.inc(e.reason)
+        response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    items = collect_batch_uploads()
+    error = validate_batch(items)
+    if error is not None:
+        return error
+    
+    annotate = request.args.get('annotate', '1') != '0'
+    compact = request.args.get('compact', '0') == '1'
+    model, error = select_model(request.args)
+    if error is not None:
+        return error
+    
+    try:
+        job = job_queue.submit(
+            lambda progress: process_batch(items, annotate, model.name, progress, compact, queued=True),
+            total=len(items)
+        )
+    except QueueFullError as e:
+        response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    
+    response = jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f"/api/jobs/{job.id}",
+        'events_url': f"/api/jobs/{job.id}/events"
+    })
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response, 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    
+    # Server-sent events: a progress event on every change, then the result
+    def generate():
+        version = None
+        while True:
+            if job.finished:
+                yield f"event: {job.status}\ndata: {json.dumps(job.to_dict())}\n\n"
+                return
+            if version != job.version:
+                version = job.version
+                yield f"event: progress\ndata: {json.dumps(job.to_dict(include_result=False))}\n\n"
+            elif job_queue.wait(job, version, timeout=15) == version and not job.finished:
+                # Keep proxies from closing an idle connection
+                yield ": keepalive\n\n"
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def close_idle_streams():
+    """Close and forget streams that have not received frames recently"""
+    cutoff = time.time() - app.config['STREAM_IDLE_SECONDS']
+    with streams_lock:
+        for stream_id, stream in list(streams.items()):
+            if stream.closed or stream.last_activity < cutoff:
+                stream.close()
+                del streams[stream_id]
+
+def get_stream(stream_id):
+    """Active stream by id; idle streams are closed first and count as missing"""
+    close_idle_streams()
+    with streams_lock:
+        return streams.get(stream_id)
+
+def reap_idle_streams():
+    """Close streams abandoned by their clients, even when no requests arrive"""
+    interval = max(1.0, app.config['STREAM_IDLE_SECONDS'] / 2)
+    while not streams_stop.wait(interval):
+        close_idle_streams()
+
+streams_stop = threading.Event()
+threading.Thread(target=reap_idle_streams, name='stream-reaper', daemon=True).start()
+atexit.register(streams_stop.set)
+
+@app.route('/api/stream', methods=['POST'])
+def create_stream():
+    close_idle_streams()
+    model, error = select_model(request.args)
+    if error is not None:
+        return error
+    
+    try:
+        skip_frames = int(request.args.get('skip_frames', 0))
+    except ValueError:
+        return jsonify({'error': 'skip_frames must be an integer'}), 400
+    if skip_frames < 0:
+        return jsonify({'error': 'skip_frames must not be negative'}), 400
+    
+    change_threshold = request.args.get('change_threshold')
+    if change_threshold:
+        try:
+            change_threshold = float(change_threshold)
+        except ValueError:
+            return jsonify({'error': 'change_threshold must be a number'}), 400
+        if not 0 <= change_threshold < float('inf'):
+            return jsonify({'error': 'change_threshold must be a finite, non-negative number'}), 400
+    else:
+        change_threshold = None
+    
+    # Frames go through the proxy so a reloaded model is picked up mid-stream
+    stream = FrameStream(
+        ModelProxy(models, model.name),
+        conf_threshold=app.config['CONF_THRESHOLD'],
+        skip_frames=skip_frames,
+        change_threshold=change_threshold
+    )
+    
+    with streams_lock:
+        if len(streams) >= app.config['STREAM_MAX_SESSIONS']:
+            stream.close()
+            return jsonify({'error': 'Too many active streams'}), 429
+        stream_id = uuid.uuid4().hex
+        streams[stream_id] = stream
+    
+    return jsonify({
+        'stream_id': stream_id,
+        'frames_url': f"/api/stream/{stream_id}/frames",
+        'results_url': f"/api/stream/{stream_id}/results"
+    }), 201
+
+@app.route('/api/stream/<stream_id>/frames', methods=['POST'])
+def push_stream_frame(stream_id):
+    stream = get_stream(stream_id)
+    if stream is None:
+        return jsonify({'error': 'Unknown stream'}), 404
+    
+    # Frames come either as a multipart file or as the raw request body
+    file = request.files.get('file')
+    data = file.read() if file is not None else request.get_data()
+    received_at = time.time()
+    try:
+        frame = decode_image(data)
+    except ValueError:
+        return jsonify({'error': 'Could not decode frame'}), 400
+    
+    try:
+        seq = stream.submit(frame, received_at)
+    except RuntimeError:
+        return jsonify({'error': 'Stream is closed'}), 410
+    return jsonify({'frame': seq}), 202
+
+@app.route('/api/stream/<stream_id>/results', methods=['GET'])
+def stream_results(stream_id):
+    stream = get_stream(stream_id)
+    if stream is None:
+        return jsonify({'error': 'Unknown stream'}), 404
+    
+    # Chunked newline-delimited JSON, one line per processed frame
+    def generate():
+        for result in stream.results(timeout=app.config['STREAM_IDLE_SECONDS']):
+            yield json.dumps(result) + '\n'
+        yield json.dumps({'stats': stream.get_stats()}) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/api/stream/<stream_id>', methods=['GET', 'DELETE'])
+def stream_status(stream_id):
+    stream = get_stream(stream_id)
+    if stream is None:
+        return jsonify({'error': 'Unknown stream'}), 404
+    if request.method == 'DELETE':
+        stream.close()
+        with streams_lock:
+            streams.pop(stream_id, None)
+    return jsonify(stream.get_stats())
+
+def find_image(filename):
+    """
+    Bytes of an image that is not served from the store: kept in memory, or
+    an annotated image drawn now because this is its first request
+    
+    Returns:
+        The encoded image, or None when it should be read from the store
+        (which is touched so it counts as recently used)
+    """
+    with memory_images_lock:
+        data = memory_images.get(filename)
+    if data is not None:
+        return data
+    
+    # Annotated images and their thumbnails are drawn the first time either is requested
+    is_thumbnail = filename.startswith('thumb_')
+    rendered = render_pending_annotation(
+        'annotated_' + filename[len('thumb_'):] if is_thumbnail else filename
+    )
+    if rendered is not None:
+        return rendered[1] if is_thumbnail else rendered[0]
+    
+    if image_store.touch(filename):
+        return None
+    if is_thumbnail and app.config['THUMBNAIL_SIZE']:
+        return render_thumbnail(filename)
+    return None
+
 @app.route('/api/images/<filename>', methods=['GET'])
 def get_image(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return image_response(filename, find_image(filename))
+
+def collect_stats():
+    """Body of /api/stats"""
+    # Totals are restored from the SQLite stats store at startup, when enabled
+    total_detections = detection_stats.get_total_detections()
+    
+    stats = {
+        'total_processed_images': detection_stats.get_processed_count(),
+        'total_detections': total_detections,
+        'detection_breakdown': detection_stats.get_detection_breakdown(),
+        'processing_time_avg': detection_stats.get_avg_processing_time(),
+        'latency': detection_stats.get_latency_summary()
+    }
+    
+    default_model = models.get()
+    if isinstance(default_model.inference, BatchScheduler):
+        stats['batching'] = default_model.inference.get_batch_stats()
+    
+    stats['models'] = models.get_stats()
+    stats['suggestions'] = suggestion_index.get_stats()
+    
+    if result_cache is not None:
+        stats['cache'] = result_cache.get_stats()
+    
+    if app.config['SAVE_UPLOADS']:
+        stats['storage'] = image_store.get_stats()
+    
+    if stats_store is not None:
+        stats['stats_store'] = stats_store.get_stats()
+    
+    stats['admission'] = admission.get_stats()
+    stats['jobs'] = job_queue.get_stats()
+    return stats
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
-    # Calculate statistics based on processed images
-    # In a real app, this would likely use a database
-    total_detections = detector.get_total_detections()
+    return jsonify(collect_stats())
+
+@app.route('/api/stats/history', methods=['GET'])
+def get_stats_history():
+    if stats_store is None:
+        return jsonify({'error': 'Statistics history is disabled'}), 404
+    
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in ('hour', 'day'):
+        return jsonify({'error': "bucket must be 'hour' or 'day'"}), 400
+    
+    try:
+        utc_offset = int(request.args.get('utc_offset', 0))
+        end = parse_time(request.args['end'], utc_offset, end=True) if 'end' in request.args else time.time()
+        default_span = 7 * 86400 if bucket == 'day' else 86400
+        start = parse_time(request.args['start'], utc_offset) if 'start' in request.args else end - default_span
+    except ValueError:
+        return jsonify({'error': 'Invalid time range'}), 400
+    if end <= start:
+        return jsonify({'error': 'end must be after start'}), 400
+    
+    buckets = stats_store.get_history(start, end, bucket, utc_offset)
+    breakdown = Counter()
+    for entry in buckets:
+        breakdown.update({name: values['count'] for name, values in entry['classes'].items()})
     
     return jsonify({
-        'total_processed_images': detector.get_processed_count(),
-        'total_detections': total_detections,
-        'detection_breakdown': detector.get_detection_breakdown(),
-        'processing_time_avg': detector.get_avg_processing_time()
+        'start': start,
+        'end': end,
+        'bucket': bucket,
+        'buckets': buckets,
+        'total_images': sum(entry['images'] for entry in buckets),
+        'total_detections': sum(entry['detections'] for entry in buckets),
+        'detection_breakdown': dict(breakdown)
     })
 
+@app.route('/api/models', methods=['GET'])
+def list_models():
+    return jsonify(models.get_stats())
+
+@app.route('/api/models/<name>/reload', methods=['POST'])
+def reload_model(name):
+    if not app.config['MODEL_ADMIN_ENABLED']:
+        return jsonify({'error': 'Model administration is disabled'}), 403
+    if name not in models.names():
+        return jsonify({'error': f'Unknown model: {name}'}), 404
+    
+    # Optional new weights file; the current one is reloaded otherwise
+    body = request.get_json(silent=True) or {}
+    path = body.get('path')
+    if path is not None and not os.path.isfile(path):
+        return jsonify({'error': f'Weights file not found: {path}'}), 400
+    
+    if not models.reload(name, path):
+        return jsonify({'error': f'Model {name} is already reloading'}), 409
+    return jsonify({'status': 'reloading', 'model': name, 'status_url': '/api/models'}), 202
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/profiler', methods=['GET', 'POST'])
+def control_profiler():
+    if not app.config['PROFILER_ENABLED']:
+        return jsonify({'error': 'Profiler is disabled'}), 404
+    
+    if request.method == 'POST':
+        action = request.args.get('action', 'start')
+        if action == 'start':
+            try:
+                interval_ms = float(request.args.get('interval_ms', 10))
+            except ValueError:
+                return jsonify({'error': 'interval_ms must be a number'}), 400
+            if not 0 < interval_ms < float('inf'):
+                return jsonify({'error': 'interval_ms must be a finite, positive number'}), 400
+            profiler.start(interval_ms=interval_ms)
+        elif action == 'stop':
+            profiler.stop()
+        else:
+            return jsonify({'error': f'Unknown action: {action}'}), 400
+        return jsonify(profiler.status())
+    
+    # Collapsed stacks, ready for flamegraph tools
+    if request.args.get('format') == 'collapsed':
+        return Response(profiler.collapsed(), mimetype='text/plain')
+    return jsonify(profiler.status())
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=int(os.environ.get('PORT', 5000))) 
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=int(os.environ.get('PORT', 5000))) 
@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.responses import JSONResponse as StarletteJSONResponse
+from starlette.routing import Mount, Route
+from werkzeug.security import safe_join
+
+# Importing the Flask app loads the models, stores and queues; this server
+# shares all of them and only replaces the request handling
+import app as server
+
+# asyncio serving mode: uploads are received and responses sent on the event
+# loop, so slow clients only cost a connection, while blocking work runs in
+# threads. Detect requests get their own bounded executor; at most
+# ASGI_EXECUTOR_THREADS of them are in flight and further ones get 503 straight
+# away (0 sizes it to the admission controller's running and waiting slots).
+# Routes without an async handler here are served by the Flask app.
+executor_threads = server.app.config['ASGI_EXECUTOR_THREADS'] or \
+    server.admission.max_concurrent + server.admission.max_queue
+detect_executor = ThreadPoolExecutor(max_workers=executor_threads, thread_name_prefix='detect')
+executor_stats = {'threads': executor_threads, 'in_flight': 0, 'rejected': 0}
+
+
+class JSONResponse(StarletteJSONResponse):
+    """JSON response that, like Flask's jsonify, allows NaN in the output"""
+
+    def render(self, content):
+        return json.dumps(content, separators=(',', ':')).encode('utf-8')
+
+
+class BodyTooLarge(Exception):
+    """Raised while receiving a request body that is over the upload limit"""
+
+
+def error_response(message, status_code, headers=None):
+    return JSONResponse({'error': message}, status_code, headers)
+
+
+def limit_body(request, limit):
+    """
+    Same request, but receiving more than `limit` body bytes raises BodyTooLarge
+
+    Chunked uploads and uploads with a wrong Content-Length are cut off as
+    they arrive, before multipart parsing has buffered them.
+    """
+    received = 0
+
+    async def receive():
+        nonlocal received
+        message = await request.receive()
+        if message['type'] == 'http.request':
+            received += len(message.get('body', b''))
+            if received > limit:
+                raise BodyTooLarge()
+        return message
+
+    return Request(request.scope, receive)
+
+
+def timed(handler):
+    """Record request counts and latency under the Flask endpoint of the same name"""
+    @functools.wraps(handler)
+    async def wrapper(request):
+        start = time.perf_counter()
+        response = await handler(request)
+        server.REQUESTS.inc(handler.__name__, request.method, str(response.status_code))
+        server.REQUEST_SECONDS.observe(time.perf_counter() - start, handler.__name__)
+        return response
+    return wrapper
+
+
+def etag_matches(header, etag):
+    """Whether an If-None-Match header lists the ETag"""
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or any((tag[2:] if tag.startswith('W/') else tag).strip('"') == etag for tag in tags)
+
+
+@timed
+async def health_check(request):
+    return JSONResponse({'status': 'healthy', 'message': 'E-waste detection API is running'})
+
+
+@timed
+async def readiness_check(request):
+    response = {
+        'status': server.startup_status['state'],
+        'phases': dict(server.startup_phases)
+    }
+    if server.startup_status['error']:
+        response['error'] = server.startup_status['error']
+    return JSONResponse(response, 200 if server.startup_status['state'] == 'ready' else 503)
+
+
+@timed
+async def detect_objects(request):
+    # One image plus its multipart framing; bodies declared larger are
+    # refused before reading them, the rest are counted as they arrive
+    max_length = server.MAX_IMAGE_BYTES + server.MULTIPART_OVERHEAD_BYTES
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > max_length:
+        return error_response('File too large', 413)
+
+    model, error = server.select_model(request.query_params)
+    if error is not None:
+        return JSONResponse(*error)
+
+    annotate = request.query_params.get('annotate', '1') != '0'
+    compact = request.query_params.get('compact', '0') == '1'
+
+    read_start = time.perf_counter()
+    try:
+        form = await limit_body(request, max_length).form()
+    except BodyTooLarge:
+        return error_response('File too large', 413)
+    try:
+        file = form.get('file')
+        if not isinstance(file, UploadFile):
+            return error_response('No file part', 400)
+        if file.filename == '':
+            return error_response('No selected file', 400)
+        if not server.allowed_file(file.filename):
+            return error_response(
+                f'File type not allowed. Allowed types: {", ".join(server.ALLOWED_EXTENSIONS)}', 400
+            )
+        data = await file.read()
+        filename = file.filename
+    finally:
+        await form.close()
+    server.STAGE_SECONDS.observe(time.perf_counter() - read_start, 'upload_read')
+
+    # Every thread busy means the admission queue is full as well
+    if executor_stats['in_flight'] >= executor_threads:
+        executor_stats['rejected'] += 1
+        server.ADMISSION_REJECTED.inc('executor_full')
+        return error_response('Server overloaded (executor_full)', 503, {'Retry-After': '1'})
+
+    executor_stats['in_flight'] += 1
+    try:
+        body, status, headers = await asyncio.get_running_loop().run_in_executor(
+            detect_executor,
+            functools.partial(server.detect_upload, filename, data, model, annotate, compact)
+        )
+    finally:
+        executor_stats['in_flight'] -= 1
+
+    with server.STAGE_SECONDS.time('serialize'):
+        return JSONResponse(body, status, headers)
+
+
+def locate_image(filename):
+    """Bytes of an in-memory or newly drawn image, else whether it is on disk"""
+    data = server.find_image(filename)
+    if data is not None:
+        return data, True
+    return None, server.image_store.exists(filename)
+
+
+@timed
+async def get_image(request):
+    filename = request.path_params['filename']
+    path = safe_join(server.image_store.root, filename)
+    if path is None:
+        return error_response('Not found', 404)
+
+    # Drawing a pending annotated image and touching the store both block
+    data, found = await run_in_threadpool(locate_image, filename)
+    if not found:
+        return error_response('Not found', 404)
+
+    # Names are content-addressed, so the name itself serves as the ETag
+    etag = os.path.splitext(filename)[0]
+    headers = {
+        'ETag': f'"{etag}"',
+        'Cache-Control': f"public, max-age={server.IMAGE_MAX_AGE}, immutable"
+    }
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+    if data is not None:
+        return Response(data, media_type=server.image_mimetype(filename), headers=headers)
+    # Streamed from disk in chunks without blocking the event loop
+    return FileResponse(path, media_type=server.image_mimetype(filename), headers=headers)
+
+
+@timed
+async def get_stats(request):
+    stats = await run_in_threadpool(server.collect_stats)
+    stats['executor'] = dict(executor_stats)
+    return JSONResponse(stats)
+
+
+routes = [
+    Route('/api/health', health_check, methods=['GET']),
+    Route('/api/ready', readiness_check, methods=['GET']),
+    Route('/api/detect', detect_objects, methods=['POST']),
+    Route('/api/images/{filename}', get_image, methods=['GET']),
+    Route('/api/stats', get_stats, methods=['GET']),
+    # Everything else (batch, jobs, streams, history, models, metrics) runs in Flask
+    Mount('/', app=WSGIMiddleware(server.app))
+]
+
+app = Starlette(
+    routes=routes,
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    on_shutdown=[lambda: detect_executor.shutdown(wait=False)]
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
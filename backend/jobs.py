@@ -0,0 +1,192 @@
+import math
+import time
+import uuid
+import queue
+import threading
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+    def __init__(self, retry_after):
+        super().__init__("Job queue is full")
+        self.retry_after = retry_after
+
+
+class Job:
+    """State of one queued unit of work"""
+
+    def __init__(self, job_id, total):
+        self.id = job_id
+        self.status = 'queued'
+        self.completed = 0
+        self.total = total
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+        # Bumped on every change so watchers can wait for the next update
+        self.version = 0
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def to_dict(self, include_result=True):
+        data = {
+            'id': self.id,
+            'status': self.status,
+            'progress': {'completed': self.completed, 'total': self.total},
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+        if self.error is not None:
+            data['error'] = self.error
+        if include_result and self.result is not None:
+            data['result'] = self.result
+        return data
+
+
+class JobQueue:
+    """
+    Bounded queue of background jobs run by a fixed set of worker threads.
+
+    Submitting returns immediately with a Job that can be polled or watched
+    for progress. When the queue is full, submit raises QueueFullError with
+    an estimate of when to retry. Finished jobs are kept for `ttl` seconds
+    and then forgotten.
+    """
+
+    def __init__(self, workers=2, max_queued=32, ttl=600):
+        """
+        Args:
+            workers: Number of jobs run at the same time
+            max_queued: Jobs waiting to start before submissions are refused
+            ttl: Seconds a finished job's result stays available
+        """
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.ttl = ttl
+
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = {}
+        self._cond = threading.Condition()
+
+        # Queue statistics
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+        self._avg_duration = None
+
+        self._threads = [
+            threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn, total=1):
+        """
+        Queue a job
+
+        Args:
+            fn: Callable taking a progress(completed) callback and returning
+                the job result (anything JSON-serializable)
+            total: Number of units of work, reported as progress
+
+        Returns:
+            The new Job
+        """
+        self.expire()
+        job = Job(uuid.uuid4().hex, total)
+        with self._cond:
+            try:
+                self._queue.put_nowait((job, fn))
+            except queue.Full:
+                self.rejected += 1
+                raise QueueFullError(self.retry_after())
+            self._jobs[job.id] = job
+            self.submitted += 1
+        return job
+
+    def retry_after(self):
+        """Seconds until a queue slot is likely to free up"""
+        # A slot opens whenever any worker finishes its current job
+        duration = self._avg_duration or 1.0
+        return max(1, math.ceil(duration / self.workers))
+
+    def get(self, job_id):
+        self.expire()
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def wait(self, job, version, timeout=None):
+        """
+        Block until the job changes after `version` or finishes
+
+        Returns:
+            The job's current version
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: job.version != version or job.finished, timeout)
+            return job.version
+
+    def _update(self, job, **changes):
+        with self._cond:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.version += 1
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            job, fn = self._queue.get()
+            self._update(job, status='running', started_at=time.time())
+            try:
+                result = fn(lambda completed: self._update(job, completed=completed))
+            except Exception as e:
+                self._update(job, status='failed', error=str(e), finished_at=time.time())
+                self.failed += 1
+            else:
+                self._update(job, status='done', result=result, completed=job.total, finished_at=time.time())
+                self.completed += 1
+
+            # Smoothed job duration for Retry-After estimates
+            duration = job.finished_at - job.started_at
+            if self._avg_duration is None:
+                self._avg_duration = duration
+            else:
+                self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+
+    def expire(self, now=None):
+        """Forget finished jobs older than the TTL"""
+        cutoff = (time.time() if now is None else now) - self.ttl
+        with self._cond:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+            self.expired += len(expired)
+
+    def get_stats(self):
+        """Get queue depth and job counters"""
+        with self._cond:
+            running = sum(1 for job in self._jobs.values() if job.status == 'running')
+            return {
+                'queued': self._queue.qsize(),
+                'running': running,
+                'max_queued': self.max_queued,
+                'workers': self.workers,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'failed': self.failed,
+                'expired': self.expired,
+                'retained': len(self._jobs),
+                'avg_duration': self._avg_duration or 0
+            }
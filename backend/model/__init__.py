@@ -1,5 +1,20 @@
 # Import the EwasteDetector class
-from .model import EwasteDetector
+from .model import (
+    EwasteDetector, BatchScheduler, DetectionStats, decode_image, decode_reduced, scale_detections,
+    draw_detections, encode_image, render_detections
+)
+from .cache import ResultCache
+from .backends import UltralyticsBackend, OnnxBackend, load_backend
+from .pool import DetectorPool
+from .metrics import RollingWindow, LatencyTracker
+from .stream import FrameStream
+from .tiling import make_tiles, merge_tile_outputs
+from .registry import ModelRegistry, ModelEntry, ModelProxy
 
 # This can be expanded in the future to include other classes or functions
-__all__ = ['EwasteDetector'] 
\ No newline at end of file
+__all__ = ['EwasteDetector', 'BatchScheduler', 'DetectionStats', 'decode_image', 'decode_reduced',
+           'scale_detections', 'draw_detections', 'encode_image', 'render_detections',
+           'ResultCache', 'UltralyticsBackend', 'OnnxBackend', 'load_backend', 'DetectorPool',
+           'RollingWindow', 'LatencyTracker', 'FrameStream',
+           'make_tiles', 'merge_tile_outputs',
+           'ModelRegistry', 'ModelEntry', 'ModelProxy'] 
\ No newline at end of file
@@ -0,0 +1,296 @@
+import os
+import ast
+import json
+import time
+import numpy as np
+
+from .ops import nms, xywh_to_xyxy
+
+
+class UltralyticsBackend:
+    """Runs YOLOv8 .pt weights through ultralytics"""
+
+    def __init__(self, model_path):
+        """
+        Args:
+            model_path: Path to the .pt weights (or a name ultralytics can download)
+        """
+        from ultralytics import YOLO
+
+        self.model = YOLO(model_path)
+        names = getattr(self.model, 'names', None)
+        self.names = dict(names) if hasattr(names, 'items') else {}
+
+        # Input size the weights were trained at; predict letterboxes to it
+        size = getattr(self.model, 'overrides', {}).get('imgsz') or 640
+        self.imgsz = tuple(size) if isinstance(size, (list, tuple)) else (int(size), int(size))
+
+    def predict(self, images, conf_threshold=0.25):
+        """
+        Run inference on a batch of images
+
+        Args:
+            images: List of image paths or decoded BGR arrays
+            conf_threshold: Confidence threshold for detections
+
+        Returns:
+            List of (boxes, scores, class_ids) tuples, one per image, with boxes
+            in original image x1, y1, x2, y2 pixel coordinates
+        """
+        results = self.model.predict(list(images), conf=conf_threshold)
+
+        outputs = []
+        for result in results:
+            if hasattr(result.names, 'items'):
+                self.names = dict(result.names)
+            boxes = result.boxes
+            outputs.append((
+                boxes.xyxy.cpu().numpy().reshape(-1, 4),
+                boxes.conf.cpu().numpy().reshape(-1),
+                boxes.cls.cpu().numpy().reshape(-1).astype(np.int64)
+            ))
+        return outputs
+
+
+class OnnxBackend:
+    """
+    Runs an exported YOLOv8 .onnx model through ONNX Runtime on CPU.
+
+    Letterboxing, decoding of the raw output and NMS are done in NumPy so the
+    heavy ultralytics/torch stack is not needed at serving time.
+    """
+
+    def __init__(self, model_path, imgsz=None, iou_threshold=0.7, max_det=300, num_threads=None):
+        """
+        Args:
+            model_path: Path to the .onnx model
+            imgsz: Input size; read from the model when it has a fixed shape
+            iou_threshold: IoU threshold for non-maximum suppression
+            max_det: Maximum detections per image
+            num_threads: Intra-op threads for ONNX Runtime (None uses its default)
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = int(num_threads)
+
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        self.iou_threshold = iou_threshold
+        self.max_det = max_det
+
+        # Fixed dimensions are ints, dynamic ones are strings or None
+        batch_dim, _, height, width = self.session.get_inputs()[0].shape
+        self.fixed_batch = batch_dim if isinstance(batch_dim, int) else None
+        if isinstance(height, int) and isinstance(width, int):
+            self.imgsz = (height, width)
+        else:
+            size = int(imgsz or 640)
+            self.imgsz = (size, size)
+
+        # ultralytics stores the class names in the model metadata
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        try:
+            self.names = {int(k): v for k, v in ast.literal_eval(metadata.get('names', '{}')).items()}
+        except (ValueError, SyntaxError):
+            self.names = {}
+
+    def _letterbox(self, image):
+        """Resize keeping the aspect ratio and pad to the model input size"""
+        import cv2
+
+        height, width = image.shape[:2]
+        target_h, target_w = self.imgsz
+        ratio = min(target_h / height, target_w / width)
+        new_w, new_h = int(round(width * ratio)), int(round(height * ratio))
+        pad_x, pad_y = (target_w - new_w) / 2, (target_h - new_h) / 2
+
+        if (new_w, new_h) != (width, height):
+            image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+        bottom, right = target_h - new_h - top, target_w - new_w - left
+        image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+        return image, ratio, (left, top)
+
+    def preprocess(self, images):
+        """
+        Letterbox a list of BGR images (or image paths) into a normalized
+        NCHW RGB batch, as fed to the model
+
+        Returns:
+            Tuple of the batch and the per-image transforms needed to map
+            boxes back to image coordinates
+        """
+        import cv2
+
+        letterboxed, transforms = [], []
+        for image in images:
+            if not isinstance(image, np.ndarray):
+                path = image
+                image = cv2.imread(path)
+                if image is None:
+                    raise ValueError(f"Could not read image at {path}")
+            padded, ratio, pad = self._letterbox(image)
+            letterboxed.append(padded)
+            transforms.append((ratio, pad, image.shape[:2]))
+
+        batch = np.stack(letterboxed)[..., ::-1].transpose(0, 3, 1, 2)
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        batch /= 255.0
+        return batch, transforms
+
+    def _postprocess(self, output, transform, conf_threshold):
+        """Decode one image's raw (4 + classes, anchors) output into boxes"""
+        predictions = output.T
+        class_scores = predictions[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+
+        mask = scores > conf_threshold
+        boxes = xywh_to_xyxy(predictions[mask, :4])
+        scores, class_ids = scores[mask], class_ids[mask]
+
+        keep = nms(boxes, scores, class_ids, self.iou_threshold, self.max_det)
+        boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+
+        # Undo the letterbox transform
+        ratio, (left, top), (height, width) = transform
+        boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - left) / ratio, 0, width)
+        boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - top) / ratio, 0, height)
+        return boxes, scores, class_ids.astype(np.int64)
+
+    def predict(self, images, conf_threshold=0.25):
+        """
+        Run inference on a batch of images
+
+        Args:
+            images: List of image paths or decoded BGR arrays
+            conf_threshold: Confidence threshold for detections
+
+        Returns:
+            List of (boxes, scores, class_ids) tuples, one per image, with boxes
+            in original image x1, y1, x2, y2 pixel coordinates
+        """
+        batch, transforms = self.preprocess(images)
+
+        # Models exported with a fixed batch size are fed in chunks of that size
+        step = self.fixed_batch or len(batch)
+        outputs = []
+        for start in range(0, len(batch), step):
+            chunk = batch[start:start + step]
+            if len(chunk) < step:
+                padding = np.zeros((step - len(chunk),) + chunk.shape[1:], dtype=chunk.dtype)
+                raw = self.session.run(None, {self.input_name: np.concatenate([chunk, padding])})[0][:len(chunk)]
+            else:
+                raw = self.session.run(None, {self.input_name: chunk})[0]
+            outputs.extend(raw)
+
+        return [
+            self._postprocess(output, transform, conf_threshold)
+            for output, transform in zip(outputs, transforms)
+        ]
+
+
+class StubBackend:
+    """
+    Synthetic model described by a JSON file, for benchmarking the service
+    without real weights.
+
+    It sleeps for a fixed time per batch and per image and returns the same
+    boxes, at fixed positions relative to the image size, for every image.
+    """
+
+    def __init__(self, model_path):
+        """
+        Args:
+            model_path: JSON file with optional keys latency_ms (per batch),
+                per_image_ms, boxes (per image), imgsz, names and seed
+        """
+        with open(model_path) as f:
+            spec = json.load(f)
+
+        self.latency = spec.get('latency_ms', 20) / 1000.0
+        self.per_image = spec.get('per_image_ms', 0) / 1000.0
+        self.names = {int(k): v for k, v in spec.get('names', {'0': 'battery', '1': 'mobile'}).items()}
+        size = int(spec.get('imgsz', 640))
+        self.imgsz = (size, size)
+
+        # Relative x1, y1, x2, y2 boxes with their scores and classes
+        rng = np.random.default_rng(spec.get('seed', 0))
+        count = int(spec.get('boxes', 3))
+        corners = rng.uniform(0.0, 0.7, size=(count, 2))
+        sizes = rng.uniform(0.1, 0.3, size=(count, 2))
+        self._boxes = np.concatenate([corners, corners + sizes], axis=1).astype(np.float32)
+        self._scores = rng.uniform(0.3, 0.95, size=count).astype(np.float32)
+        self._class_ids = np.arange(count, dtype=np.int64) % max(1, len(self.names))
+
+    def predict(self, images, conf_threshold=0.25):
+        """Return the fixed boxes scaled to each image after the configured delay"""
+        import cv2
+
+        time.sleep(self.latency + self.per_image * len(images))
+
+        keep = self._scores > conf_threshold
+        outputs = []
+        for image in images:
+            if not isinstance(image, np.ndarray):
+                path = image
+                image = cv2.imread(path)
+                if image is None:
+                    raise ValueError(f"Could not read image at {path}")
+            height, width = image.shape[:2]
+            scale = np.array([width, height, width, height], dtype=np.float32)
+            outputs.append((self._boxes[keep] * scale, self._scores[keep], self._class_ids[keep]))
+        return outputs
+
+
+# Written next to the exported variants by scripts/model/export_variants.py
+EXPORT_REPORT = 'export_report.json'
+
+
+def resolve_weights(model_path):
+    """
+    Weights file to load for a model path
+
+    A directory of exported deployment variants resolves to the variant
+    selected in its export report; any other path is returned unchanged.
+
+    Raises:
+        FileNotFoundError: If the directory has no report or nothing was selected
+    """
+    if not os.path.isdir(model_path):
+        return model_path
+
+    report_path = os.path.join(model_path, EXPORT_REPORT)
+    try:
+        with open(report_path) as f:
+            report = json.load(f)
+    except (OSError, ValueError) as e:
+        raise FileNotFoundError(f"No readable {EXPORT_REPORT} in {model_path}: {e}")
+
+    selected = report.get('selected')
+    variants = {variant['name']: variant for variant in report.get('variants', [])}
+    if selected not in variants:
+        raise FileNotFoundError(f"No variant selected in {report_path}")
+    return os.path.join(model_path, variants[selected]['file'])
+
+
+def load_backend(model_path, **kwargs):
+    """
+    Create the inference backend matching the weights file
+
+    Args:
+        model_path: Path to .pt or .onnx weights, or a .json stub model
+        **kwargs: Extra options passed to the ONNX backend
+
+    Returns:
+        Backend instance with a predict(images, conf_threshold) method
+    """
+    extension = os.path.splitext(model_path)[1].lower()
+    if extension == '.onnx':
+        return OnnxBackend(model_path, **kwargs)
+    if extension == '.json':
+        return StubBackend(model_path)
+    return UltralyticsBackend(model_path)
@@ -0,0 +1,206 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    LRU cache of detection results keyed by image content and detection settings.
+
+    Entries hold the detections returned by EwasteDetector.detect together with
+    the encoded annotated image, which may be None until it has been rendered.
+
+    The in-memory tier is bounded by entry count and total bytes; an optional
+    on-disk tier keeps entries that were evicted from memory and survives
+    restarts.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, disk_dir=None, disk_max_entries=4096,
+                 image_extension='jpg'):
+        """
+        Args:
+            max_entries: Maximum number of entries kept in memory
+            max_bytes: Maximum total size of the cached annotated images in memory
+            disk_dir: Directory for the on-disk tier (None disables it)
+            disk_max_entries: Maximum number of entries kept on disk
+            image_extension: File extension of the annotated images on disk,
+                matching the format they are encoded in
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries
+        self.image_extension = image_extension
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Cache statistics
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # Index of on-disk entries, oldest first
+        self._disk_keys = OrderedDict()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            entries = []
+            for name in os.listdir(disk_dir):
+                if name.endswith('.json'):
+                    path = os.path.join(disk_dir, name)
+                    entries.append((os.path.getmtime(path), name[:-len('.json')]))
+            for _, key in sorted(entries):
+                self._disk_keys[key] = None
+
+    @staticmethod
+    def make_key(data, model_id, conf_threshold, extra=''):
+        """
+        Build a cache key from the image bytes and the detection settings
+
+        Args:
+            data: Encoded image file contents
+            model_id: Identifier of the model weights
+            conf_threshold: Confidence threshold used for detection
+            extra: Any other settings that change the result (e.g. tiling)
+
+        Returns:
+            Hex digest identifying the result
+        """
+        digest = hashlib.sha256(data)
+        digest.update(f"|{model_id}|{conf_threshold:.4f}|{extra}".encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Look up a cached result
+
+        Returns:
+            Tuple of (detections, annotated image bytes), or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            on_disk = key in self._disk_keys
+
+        entry = self._read_disk(key) if on_disk else None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+
+        # Promote the entry back into memory
+        self._put_memory(key, entry)
+        return entry
+
+    def put(self, key, detections, annotated):
+        """
+        Store a result
+
+        Args:
+            key: Key from make_key
+            detections: List of detections
+            annotated: Encoded annotated image bytes, or None if not rendered yet
+        """
+        entry = (detections, annotated)
+        self._put_memory(key, entry)
+        if self.disk_dir:
+            self._write_disk(key, entry)
+
+    @staticmethod
+    def _entry_size(entry):
+        return len(entry[1]) if entry[1] is not None else 0
+
+    def _put_memory(self, key, entry):
+        size = self._entry_size(entry)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= self._entry_size(previous)
+            self._entries[key] = entry
+            self._bytes += size
+
+            # Evict least recently used entries
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._entry_size(evicted)
+                self.evictions += 1
+
+    def _disk_paths(self, key):
+        return (os.path.join(self.disk_dir, f"{key}.json"),
+                os.path.join(self.disk_dir, f"{key}.{self.image_extension}"))
+
+    def _read_disk(self, key):
+        json_path, image_path = self._disk_paths(key)
+        try:
+            with open(json_path, 'r') as f:
+                detections = json.load(f)
+            annotated = None
+            if os.path.exists(image_path):
+                with open(image_path, 'rb') as f:
+                    annotated = f.read()
+        except (OSError, ValueError):
+            with self._lock:
+                self._disk_keys.pop(key, None)
+            return None
+
+        with self._lock:
+            if key in self._disk_keys:
+                self._disk_keys.move_to_end(key)
+        return detections, annotated
+
+    def _write_disk(self, key, entry):
+        json_path, image_path = self._disk_paths(key)
+        detections, annotated = entry
+        try:
+            # The image is written first so a present .json implies a complete entry
+            if annotated is not None:
+                with open(image_path, 'wb') as f:
+                    f.write(annotated)
+            with open(json_path, 'w') as f:
+                json.dump(detections, f)
+        except OSError as e:
+            print(f"Warning: Could not write cache entry {key}: {e}")
+            return
+
+        with self._lock:
+            self._disk_keys[key] = None
+            self._disk_keys.move_to_end(key)
+            evicted = []
+            while len(self._disk_keys) > self.disk_max_entries:
+                old_key, _ = self._disk_keys.popitem(last=False)
+                evicted.append(old_key)
+                self.evictions += 1
+
+        for old_key in evicted:
+            for path in self._disk_paths(old_key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def get_stats(self):
+        """Get cache hit, miss and eviction counts"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'disk_entries': len(self._disk_keys),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0
+            }
@@ -0,0 +1,135 @@
+import time
+import threading
+import numpy as np
+
+
+class RollingWindow:
+    """
+    Fixed-memory record of recent latency samples.
+
+    The most recent `capacity` samples are kept in a ring buffer for
+    percentiles, and a per-second ring of counters covering `horizon` seconds
+    gives exact throughput even when the sample buffer has wrapped. The lock
+    only guards a few array stores, so recording stays cheap under contention.
+    """
+
+    def __init__(self, capacity=4096, horizon=900):
+        """
+        Args:
+            capacity: Number of latency samples kept
+            horizon: Number of seconds covered by the throughput counters
+        """
+        self.capacity = int(capacity)
+        self.horizon = int(horizon)
+
+        self._values = np.zeros(self.capacity, dtype=np.float64)
+        self._times = np.zeros(self.capacity, dtype=np.float64)
+        self._next = 0
+
+        self._second_counts = np.zeros(self.horizon, dtype=np.int64)
+        self._second_ids = np.full(self.horizon, -1, dtype=np.int64)
+
+        self._lock = threading.Lock()
+
+    def record(self, value, now=None):
+        """Add one sample (in seconds)"""
+        now = time.time() if now is None else now
+        second = int(now)
+        slot = second % self.horizon
+        with self._lock:
+            i = self._next % self.capacity
+            self._values[i] = value
+            self._times[i] = now
+            self._next += 1
+
+            if self._second_ids[slot] != second:
+                self._second_ids[slot] = second
+                self._second_counts[slot] = 0
+            self._second_counts[slot] += 1
+
+    def _snapshot(self, window, now):
+        with self._lock:
+            filled = min(self._next, self.capacity)
+            values = self._values[:filled].copy()
+            times = self._times[:filled].copy()
+            second_ids = self._second_ids.copy()
+            second_counts = self._second_counts.copy()
+
+        if window is not None:
+            recent = times >= now - window
+            values = values[recent]
+            second_counts = second_counts[second_ids > int(now) - window]
+        else:
+            second_counts = second_counts[second_ids >= 0]
+        return values, int(second_counts.sum())
+
+    def summary(self, window=None, now=None):
+        """
+        Summarize the samples recorded in the last `window` seconds
+
+        Args:
+            window: Window length in seconds (None uses everything retained)
+
+        Returns:
+            Dict with count, min, max, mean, p50, p90, p99 and throughput
+        """
+        now = time.time() if now is None else now
+        values, events = self._snapshot(window, now)
+        span = min(window or self.horizon, self.horizon)
+
+        if len(values) == 0:
+            return {'count': 0, 'min': 0, 'max': 0, 'mean': 0, 'p50': 0, 'p90': 0, 'p99': 0, 'throughput': 0}
+
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        return {
+            'count': events,
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'mean': float(values.mean()),
+            'p50': float(p50),
+            'p90': float(p90),
+            'p99': float(p99),
+            'throughput': events / span
+        }
+
+
+class LatencyTracker:
+    """Rolling latency windows for the whole request and for each stage"""
+
+    STAGES = ('decode', 'inference', 'postprocess', 'draw')
+
+    def __init__(self, capacity=4096, horizon=900):
+        self._capacity = capacity
+        self._horizon = horizon
+        self.total = RollingWindow(capacity, horizon)
+        self.stages = {stage: RollingWindow(capacity, horizon) for stage in self.STAGES}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        """Add a sample for a stage; unknown stages get their own window"""
+        window = self.stages.get(stage)
+        if window is None:
+            with self._lock:
+                window = self.stages.setdefault(stage, RollingWindow(self._capacity, self._horizon))
+        window.record(seconds)
+
+    def summary(self, windows=(60, 300, 900)):
+        """
+        Summaries over several sliding windows
+
+        Args:
+            windows: Window lengths in seconds
+
+        Returns:
+            Dict with the overall processing time per window and a per-stage
+            breakdown per window
+        """
+        now = time.time()
+        return {
+            'windows': list(windows),
+            'processing_time': {f"{w}s": self.total.summary(w, now) for w in windows},
+            'stages': {
+                stage: {f"{w}s": window.summary(w, now) for w in windows}
+                for stage, window in list(self.stages.items())
+            }
+        }
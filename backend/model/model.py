@@ -1,25 +1,391 @@
 import os
 import time
-import cv2
+import queue
+import threading
+from concurrent.futures import Future
 import numpy as np
-from ultralytics import YOLO
-from PIL import Image
 from collections import defaultdict, Counter
 
+from .backends import load_backend, resolve_weights
+from .metrics import LatencyTracker
+from .tiling import make_tiles, merge_tile_outputs
+
+
+def decode_image(data):
+    """
+    Decode encoded image bytes into a BGR array
+    
+    Args:
+        data: Encoded image file contents (JPEG, PNG, ...)
+        
+    Returns:
+        Decoded image as a NumPy array in BGR channel order
+    """
+    import cv2
+    
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image data")
+    return image
+
+
+# Scale factors libjpeg can decode at directly, each with its
+# cv2.IMREAD_REDUCED_COLOR_<factor> imdecode flag
+REDUCED_DECODE_FACTORS = (8, 4, 2)
+
+# JPEG start-of-frame markers, which carry the image size
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(data):
+    """
+    Width and height of a JPEG from its header, without decoding it
+    
+    Returns:
+        Tuple of (width, height), or None when data is not a JPEG
+    """
+    if data[:2] != b'\xff\xd8':
+        return None
+    offset = 2
+    while offset + 9 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            offset += 1
+            continue
+        length = int.from_bytes(data[offset + 2:offset + 4], 'big')
+        if marker in JPEG_SOF_MARKERS:
+            height = int.from_bytes(data[offset + 5:offset + 7], 'big')
+            width = int.from_bytes(data[offset + 7:offset + 9], 'big')
+            return width, height
+        offset += 2 + length
+    return None
+
+
+def decode_reduced(data, min_side=None):
+    """
+    Decode image bytes at the smallest size that still covers min_side
+    
+    JPEGs are decoded straight at 1/2, 1/4 or 1/8 scale, picking the largest
+    reduction whose long side stays at least min_side, which saves most of
+    the decoding work and memory for large photos. Other formats, and JPEGs
+    too small to reduce, are decoded at full size.
+    
+    Args:
+        data: Encoded image file contents
+        min_side: Smallest acceptable long side in pixels (None decodes at
+            full size)
+        
+    Returns:
+        Tuple of the BGR array and the (x, y) factors that map its
+        coordinates back onto the full-size image
+    """
+    import cv2
+    
+    size = jpeg_size(data) if min_side else None
+    factor = next((f for f in REDUCED_DECODE_FACTORS if size and max(size) // f >= min_side), None)
+    if factor is None:
+        return decode_image(data), (1.0, 1.0)
+    
+    flag = getattr(cv2, f"IMREAD_REDUCED_COLOR_{factor}")
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+    if image is None:
+        raise ValueError("Could not decode image data")
+    
+    # The decoder applies the EXIF orientation, which may swap the axes
+    width, height = size
+    decoded_height, decoded_width = image.shape[:2]
+    if (decoded_width > decoded_height) != (width > height) and width != height:
+        width, height = height, width
+    return image, (width / decoded_width, height / decoded_height)
+
+
+def scale_detections(detections, scale):
+    """
+    Map detection boxes into another image frame
+    
+    Args:
+        detections: Detections with pixel bboxes
+        scale: (x, y) factors to multiply the coordinates by
+        
+    Returns:
+        New list of detections with scaled bboxes
+    """
+    scale_x, scale_y = scale
+    if scale_x == 1 and scale_y == 1:
+        return detections
+    return [
+        dict(det, bbox=[
+            int(round(det['bbox'][0] * scale_x)), int(round(det['bbox'][1] * scale_y)),
+            int(round(det['bbox'][2] * scale_x)), int(round(det['bbox'][3] * scale_y))
+        ])
+        for det in detections
+    ]
+
+
+def resize_to_fit(image, max_side):
+    """Shrink an image so its long side is at most max_side (never enlarges)"""
+    import cv2
+    
+    height, width = image.shape[:2]
+    if not max_side or max(height, width) <= max_side:
+        return image
+    factor = max_side / max(height, width)
+    size = (max(1, round(width * factor)), max(1, round(height * factor)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def encode_image(image, image_format='jpeg', quality=None):
+    """
+    Encode a BGR array as JPEG or WebP
+    
+    Args:
+        image: Image to encode
+        image_format: 'jpeg' or 'webp'
+        quality: Encoder quality from 1 to 100 (None uses the encoder default)
+        
+    Returns:
+        The encoded bytes
+    """
+    import cv2
+    
+    if image_format == 'webp':
+        extension, params = '.webp', [cv2.IMWRITE_WEBP_QUALITY, quality] if quality else []
+    else:
+        extension, params = '.jpg', [cv2.IMWRITE_JPEG_QUALITY, quality] if quality else []
+    ok, encoded = cv2.imencode(extension, image, params)
+    if not ok:
+        raise ValueError(f"Could not encode image as {image_format}")
+    return encoded.tobytes()
+
+
+def draw_detections(image, detections, max_side=None):
+    """
+    Draw detection boxes and labels on a copy of an image
+    
+    Args:
+        image: Decoded BGR array
+        detections: Detections in the coordinates of image
+        max_side: Shrink the image to this long side first, so the boxes
+            and labels are drawn at the size they are displayed at
+        
+    Returns:
+        The annotated BGR array
+    """
+    import cv2
+    
+    resized = resize_to_fit(image, max_side)
+    if resized is image:
+        # Draw on a copy so the caller's array is left untouched
+        image = image.copy()
+    else:
+        factor = resized.shape[1] / image.shape[1]
+        image = resized
+        detections = scale_detections(detections, (factor, factor))
+    
+    # Draw boxes and labels
+    for det in detections:
+        x1, y1, x2, y2 = det['bbox']
+        class_name = det['class']
+        confidence = det['confidence']
+        
+        # Generate random color for this class (consistent for same class)
+        color_hash = hash(class_name) % 255
+        color = (color_hash, 255 - color_hash, 127 + color_hash // 2)
+        
+        # Draw bounding box
+        cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
+        
+        # Prepare label text
+        label = f"{class_name} {confidence:.2f}"
+        
+        # Determine text size and background
+        (label_width, label_height), baseline = cv2.getTextSize(
+            label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1
+        )
+        
+        # Ensure label is within image bounds
+        y1 = max(y1, label_height + 5)
+        
+        # Draw label background
+        cv2.rectangle(
+            image, 
+            (x1, y1 - label_height - 5), 
+            (x1 + label_width, y1), 
+            color, 
+            -1
+        )
+        
+        # Draw label text
+        cv2.putText(
+            image, 
+            label, 
+            (x1, y1 - 5), 
+            cv2.FONT_HERSHEY_SIMPLEX, 
+            0.5, 
+            (255, 255, 255), 
+            1
+        )
+    
+    return image
+
+
+def render_detections(image_path, detections, output_path=None):
+    """
+    Draw detection boxes and labels onto an image
+    
+    Args:
+        image_path: Path to the input image or a decoded BGR array
+        detections: List of detections to draw
+        output_path: Path to save the output image (if None, the
+            JPEG-encoded bytes are returned instead)
+        
+    Returns:
+        Path to the output image, or the encoded bytes
+    """
+    import cv2
+    
+    if isinstance(image_path, np.ndarray):
+        image = image_path
+    else:
+        image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError(f"Could not read image at {image_path}")
+    
+    image = draw_detections(image, detections)
+    
+    # Return the encoded image when no output path is given
+    if output_path is None:
+        return encode_image(image)
+    
+    # Save the output image
+    cv2.imwrite(output_path, image)
+    
+    return output_path
+
+
+def weights_id(model_path):
+    """Identify a weights file for cache keys; changes when the file is replaced"""
+    if not os.path.exists(model_path):
+        return os.path.basename(model_path)
+    stat = os.stat(model_path)
+    return f"{os.path.basename(model_path)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+class DetectionStats:
+    """
+    Thread-safe counters behind the /api/stats endpoint
+    
+    Memory use is fixed: the all-time average is kept as a running sum and
+    recent latencies live in bounded rolling windows. A sink (such as
+    StatsStore) can be attached to persist every record.
+    """
+    
+    def __init__(self, sink=None):
+        self.sink = sink
+        self.processed_count = 0
+        self.detection_counts = defaultdict(int)
+        self.processing_time_total = 0.0
+        self.total_detections = 0
+        self.latency = LatencyTracker()
+        self._lock = threading.Lock()
+    
+    def record(self, detections, processing_time, stage_times=None):
+        """
+        Update the counters for one processed image
+        
+        Args:
+            detections: Detections found in the image
+            processing_time: Seconds spent on the image
+            stage_times: Optional dict of stage name to seconds
+        """
+        with self._lock:
+            for det in detections:
+                self.detection_counts[det['class']] += 1
+            self.total_detections += len(detections)
+            self.processing_time_total += processing_time
+            self.processed_count += 1
+        
+        if self.sink is not None:
+            self.sink.record(detections, processing_time)
+        
+        self.latency.total.record(processing_time)
+        for stage, seconds in (stage_times or {}).items():
+            self.latency.record(stage, seconds)
+    
+    def restore(self, totals):
+        """
+        Continue counting from totals saved by a previous run
+        
+        Args:
+            totals: Dict as returned by StatsStore.get_totals
+        """
+        with self._lock:
+            self.processed_count += totals['processed_count']
+            self.total_detections += totals['total_detections']
+            self.processing_time_total += totals['processing_time_total']
+            for class_name, count in totals['detection_counts'].items():
+                self.detection_counts[class_name] += count
+    
+    def record_stage(self, stage, seconds):
+        """Record the time spent in a stage outside of detection (decode, draw)"""
+        self.latency.record(stage, seconds)
+    
+    def get_processed_count(self):
+        """Get the number of processed images"""
+        return self.processed_count
+    
+    def get_total_detections(self):
+        """Get the total number of detections"""
+        return self.total_detections
+    
+    def get_detection_breakdown(self):
+        """Get breakdown of detections by class"""
+        with self._lock:
+            return dict(self.detection_counts)
+    
+    def get_avg_processing_time(self):
+        """Get average processing time in seconds"""
+        with self._lock:
+            if not self.processed_count:
+                return 0
+            return self.processing_time_total / self.processed_count
+    
+    def get_latency_summary(self):
+        """Get latency percentiles and throughput over sliding windows"""
+        return self.latency.summary()
+
+
 class EwasteDetector:
-    def __init__(self, model_path='best.pt'):
+    def __init__(self, model_path='best.pt', allow_download=True, **backend_options):
         """
         Initialize the E-waste detector with YOLOv8 model
         
         Args:
-            model_path: Path to the YOLOv8 model weights
+            model_path: Path to the YOLOv8 model weights (.pt, or an exported
+                .onnx model to run through ONNX Runtime, or a .json stub
+                model for benchmarks), or a directory of exported variants
+                to load the one selected by the export stage
+            allow_download: Fall back to the stock YOLOv8n weights (downloaded
+                on first use) when model_path does not exist
+            **backend_options: Extra options for the ONNX backend
+                (imgsz, iou_threshold, max_det, num_threads)
         """
+        # A directory of exported variants loads the selected one
+        model_path = resolve_weights(model_path)
+        
         # Check if model file exists, if not, use a default YOLOv8n model
         if not os.path.exists(model_path):
+            if not allow_download:
+                raise FileNotFoundError(f"Model not found at {model_path}")
             print(f"Warning: Model not found at {model_path}. Using YOLOv8n model.")
-            self.model = YOLO('yolov8n.pt')
+            self.backend = load_backend('yolov8n.pt')
+            self.model_id = weights_id('yolov8n.pt')
         else:
-            self.model = YOLO(model_path)
+            self.backend = load_backend(model_path, **backend_options)
+            self.model_id = weights_id(model_path)
         
         # Labels for e-waste (will be overridden if custom model is loaded)
         self.labels = [
@@ -28,37 +394,157 @@ class EwasteDetector:
         ]
         
         # Statistics tracking
-        self.processed_count = 0
-        self.detection_counts = defaultdict(int)
-        self.processing_times = []
-        self.total_detections = 0
+        self.stats = DetectionStats()
+        
+        # The model is not safe to call from several threads at once
+        self._model_lock = threading.Lock()
     
-    def detect(self, image_path, conf_threshold=0.25):
+    def warmup(self, runs=1):
+        """
+        Run the model on blank images at the serving resolution so the first
+        request does not pay for lazy initialization (graph optimization,
+        kernel selection, buffer allocation, image codecs)
+        
+        Args:
+            runs: Number of warm-up inferences
+            
+        Returns:
+            Seconds spent warming up
+        """
+        start = time.perf_counter()
+        height, width = getattr(self.backend, 'imgsz', (640, 640))
+        blank = np.full((height, width, 3), 114, dtype=np.uint8)
+        for _ in range(runs):
+            with self._model_lock:
+                self.backend.predict([blank], 0.25)
+        
+        # Load the JPEG encoder used for annotated images as well
+        render_detections(blank, [])
+        return time.perf_counter() - start
+    
+    def detect(self, image_path, conf_threshold=0.25, tile_size=None, tile_overlap=0.2):
         """
         Detect e-waste objects in the image
         
         Args:
-            image_path: Path to the image
+            image_path: Path to the image or a decoded BGR array
             conf_threshold: Confidence threshold for detections
+            tile_size: If set, images larger than this are split into
+                overlapping tiles of this size (see detect_batch)
+            tile_overlap: Fraction of each tile shared with its neighbours
             
         Returns:
             List of detections with class, confidence, and bounding box
         """
-        start_time = time.time()
+        return self.detect_batch([image_path], conf_threshold, tile_size, tile_overlap)[0]
+    
+    def detect_batch(self, image_paths, conf_threshold=0.25, tile_size=None, tile_overlap=0.2):
+        """
+        Detect e-waste objects in several images with a single predict call
+        
+        With tile_size set, every image larger than a tile is cut into
+        overlapping tiles at full resolution, so small items survive the
+        resize to the model input. The tiles of all images, plus each full
+        image for large objects, run as one batch and the boxes are merged
+        back into image coordinates with cross-tile NMS.
+        
+        Args:
+            image_paths: List of image paths or decoded BGR arrays
+            conf_threshold: Confidence threshold for detections
+            tile_size: Tile side length in pixels (None disables tiling)
+            tile_overlap: Fraction of each tile shared with its neighbours
+            
+        Returns:
+            List of detection lists, one per input image
+        """
+        if not image_paths:
+            return []
+        
+        batch_detections, stage_times = self._infer(image_paths, conf_threshold, tile_size, tile_overlap)
+        processing_time = sum(stage_times.values())
+        for detections in batch_detections:
+            self.stats.record(detections, processing_time, stage_times)
+        
+        return batch_detections
+    
+    def _prepare_tiles(self, image_paths, tile_size, tile_overlap):
+        """
+        Expand images into model inputs, splitting large ones into tiles
         
-        # Run inference
-        results = self.model.predict(image_path, conf=conf_threshold)[0]
+        Returns:
+            Tuple of (inputs, groups) where groups holds, per image, the index
+            of its first input and the tile offsets (None when not tiled)
+        """
+        import cv2
         
-        # Process results
+        inputs, groups = [], []
+        for image in image_paths:
+            if not isinstance(image, np.ndarray):
+                path = image
+                image = cv2.imread(path)
+                if image is None:
+                    raise ValueError(f"Could not read image at {path}")
+            
+            height, width = image.shape[:2]
+            if max(height, width) <= tile_size:
+                groups.append((len(inputs), None))
+                inputs.append(image)
+                continue
+            
+            tiles = make_tiles(height, width, tile_size, tile_overlap)
+            groups.append((len(inputs), np.vstack([[0, 0], tiles[:, :2]])))
+            inputs.append(image)
+            inputs.extend(image[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles)
+        return inputs, groups
+    
+    def _infer(self, image_paths, conf_threshold, tile_size=None, tile_overlap=0.2):
+        """
+        Run a batch without touching the statistics
+        
+        Returns:
+            Tuple of (detection lists, per-image seconds for each stage); each
+            image is charged an equal share of the batch time
+        """
+        start_time = time.perf_counter()
+        
+        if tile_size:
+            inputs, groups = self._prepare_tiles(image_paths, tile_size, tile_overlap)
+        else:
+            inputs, groups = list(image_paths), None
+        
+        # Run inference on the whole batch at once
+        with self._model_lock:
+            outputs = self.backend.predict(inputs, conf_threshold)
+        inference_time = time.perf_counter() - start_time
+        
+        if groups is not None:
+            outputs = [
+                outputs[start] if offsets is None
+                else merge_tile_outputs(outputs[start:start + len(offsets)], offsets)
+                for start, offsets in groups
+            ]
+        
+        batch_detections = [self._parse_result(*output) for output in outputs]
+        postprocess_time = time.perf_counter() - start_time - inference_time
+        
+        count = max(1, len(batch_detections))
+        return batch_detections, {
+            'inference': inference_time / count,
+            'postprocess': postprocess_time / count
+        }
+    
+    def _parse_result(self, boxes, scores, class_ids):
+        """Convert one image's backend output into detection dicts"""
+        names = self.backend.names
         detections = []
-        for box in results.boxes:
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            conf = float(box.conf[0])
-            class_id = int(box.cls[0])
+        for box, score, class_id in zip(boxes, scores, class_ids):
+            x1, y1, x2, y2 = map(int, box)
+            conf = float(score)
+            class_id = int(class_id)
             
             # Get class name based on model's names or default labels
-            if hasattr(results.names, 'get'):
-                class_name = results.names.get(class_id, f"class_{class_id}")
+            if names:
+                class_name = names.get(class_id, f"class_{class_id}")
             else:
                 class_name = self.labels[class_id] if class_id < len(self.labels) else f"class_{class_id}"
             
@@ -67,104 +553,181 @@ class EwasteDetector:
                 'confidence': round(conf, 2),
                 'bbox': [x1, y1, x2, y2]
             })
-            
-            # Update statistics
-            self.detection_counts[class_name] += 1
-            self.total_detections += 1
-        
-        # Update processing time statistics
-        end_time = time.time()
-        processing_time = end_time - start_time
-        self.processing_times.append(processing_time)
-        self.processed_count += 1
         
         return detections
     
-    def draw_boxes(self, image_path, output_path, detections=None):
+    def draw_boxes(self, image_path, output_path=None, detections=None):
         """
         Draw bounding boxes on the image and save it
         
         Args:
-            image_path: Path to the input image
-            output_path: Path to save the output image
+            image_path: Path to the input image or a decoded BGR array
+            output_path: Path to save the output image (if None, the
+                JPEG-encoded bytes are returned instead)
             detections: List of detections (if None, will run detection)
             
         Returns:
-            Path to the output image
+            Path to the output image, or the encoded bytes
         """
-        # Read image
-        image = cv2.imread(image_path)
-        if image is None:
-            raise ValueError(f"Could not read image at {image_path}")
-        
         # Run detection if not provided
         if detections is None:
             detections = self.detect(image_path)
         
-        # Draw boxes and labels
-        for det in detections:
-            x1, y1, x2, y2 = det['bbox']
-            class_name = det['class']
-            confidence = det['confidence']
-            
-            # Generate random color for this class (consistent for same class)
-            color_hash = hash(class_name) % 255
-            color = (color_hash, 255 - color_hash, 127 + color_hash // 2)
-            
-            # Draw bounding box
-            cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
-            
-            # Prepare label text
-            label = f"{class_name} {confidence:.2f}"
-            
-            # Determine text size and background
-            (label_width, label_height), baseline = cv2.getTextSize(
-                label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1
-            )
-            
-            # Ensure label is within image bounds
-            y1 = max(y1, label_height + 5)
-            
-            # Draw label background
-            cv2.rectangle(
-                image, 
-                (x1, y1 - label_height - 5), 
-                (x1 + label_width, y1), 
-                color, 
-                -1
-            )
-            
-            # Draw label text
-            cv2.putText(
-                image, 
-                label, 
-                (x1, y1 - 5), 
-                cv2.FONT_HERSHEY_SIMPLEX, 
-                0.5, 
-                (255, 255, 255), 
-                1
-            )
-        
-        # Save the output image
-        cv2.imwrite(output_path, image)
-        
-        return output_path
+        return render_detections(image_path, detections, output_path)
+    
+    def class_names(self):
+        """Names of the classes the model can report"""
+        if self.backend.names:
+            return [self.backend.names[class_id] for class_id in sorted(self.backend.names)]
+        return list(self.labels)
+    
+    def input_size(self):
+        """Long side of the model input; larger images are scaled down to it"""
+        return max(getattr(self.backend, 'imgsz', (640, 640)))
     
     # Statistics methods
     def get_processed_count(self):
         """Get the number of processed images"""
-        return self.processed_count
+        return self.stats.get_processed_count()
     
     def get_total_detections(self):
         """Get the total number of detections"""
-        return self.total_detections
+        return self.stats.get_total_detections()
     
     def get_detection_breakdown(self):
         """Get breakdown of detections by class"""
-        return dict(self.detection_counts)
+        return self.stats.get_detection_breakdown()
     
     def get_avg_processing_time(self):
         """Get average processing time in seconds"""
-        if not self.processing_times:
-            return 0
-        return sum(self.processing_times) / len(self.processing_times) 
\ No newline at end of file
+        return self.stats.get_avg_processing_time()
+    
+    def get_latency_summary(self):
+        """Get latency percentiles and throughput over sliding windows"""
+        return self.stats.get_latency_summary()
+
+
+class BatchScheduler:
+    """
+    Dynamic micro-batching front end for EwasteDetector.
+
+    Callers block in detect() while worker threads collect queued requests
+    into batches of up to max_batch_size, waiting at most max_wait_ms after
+    the first request arrives, and run one predict call per batch.
+    """
+    
+    def __init__(self, detector, max_batch_size=8, max_wait_ms=10, workers=1):
+        """
+        Args:
+            detector: EwasteDetector (or DetectorPool) used to run the batches
+            max_batch_size: Maximum number of images per predict call
+            max_wait_ms: Maximum time to wait for a batch to fill up
+            workers: Number of batches that may be in flight at once; only
+                useful when the detector can run batches in parallel
+        """
+        self.detector = detector
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        
+        self._queue = queue.Queue()
+        
+        # Batch fill statistics
+        self._stats_lock = threading.Lock()
+        self.batch_count = 0
+        self.batched_requests = 0
+        self.batch_sizes = Counter()
+        
+        self._workers = [
+            threading.Thread(target=self._run, name=f'batch-scheduler-{i}', daemon=True)
+            for i in range(max(1, int(workers)))
+        ]
+        for worker in self._workers:
+            worker.start()
+    
+    def detect(self, image_path, conf_threshold=0.25, tile_size=None, tile_overlap=0.2, timeout=None):
+        """
+        Queue an image for detection and wait for its result
+        
+        Args:
+            image_path: Path to the image or a decoded BGR array
+            conf_threshold: Confidence threshold for detections
+            tile_size: Tile side length for tiled inference (None disables it)
+            tile_overlap: Fraction of each tile shared with its neighbours
+            timeout: Seconds to wait for the result (None waits forever)
+            
+        Returns:
+            List of detections with class, confidence, and bounding box
+        """
+        future = Future()
+        self._queue.put((image_path, (conf_threshold, tile_size, tile_overlap), future))
+        return future.result(timeout)
+    
+    def close(self):
+        """Stop the worker threads once the queued requests are done"""
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+    
+    def _collect_batch(self, first):
+        """Gather queued requests until the batch is full or the wait expires"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the shutdown marker back for the main loop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+    
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = self._collect_batch(first)
+            
+            with self._stats_lock:
+                self.batch_count += 1
+                self.batched_requests += len(batch)
+                self.batch_sizes[len(batch)] += 1
+            
+            # A predict call takes a single set of options, so split by them
+            groups = defaultdict(list)
+            for image_path, options, future in batch:
+                groups[options].append((image_path, future))
+            
+            for options, items in groups.items():
+                try:
+                    results = self.detector.detect_batch([path for path, _ in items], *options)
+                except Exception as e:
+                    for _, future in items:
+                        future.set_exception(e)
+                    continue
+                for (_, future), detections in zip(items, results):
+                    future.set_result(detections)
+    
+    def get_queue_depth(self):
+        """Get the number of requests waiting to be batched"""
+        return self._queue.qsize()
+    
+    def get_batch_stats(self):
+        """Get batch fill statistics"""
+        with self._stats_lock:
+            avg_size = self.batched_requests / self.batch_count if self.batch_count else 0
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'batches': self.batch_count,
+                'requests': self.batched_requests,
+                'avg_batch_size': avg_size,
+                'avg_fill_ratio': avg_size / self.max_batch_size,
+                'batch_size_histogram': {str(size): count for size, count in sorted(self.batch_sizes.items())},
+                'queue_depth': self._queue.qsize()
+            }
@@ -0,0 +1,94 @@
+import numpy as np
+
+
+def box_iou(boxes_a, boxes_b):
+    """
+    Pairwise IoU between two sets of boxes
+
+    Args:
+        boxes_a: Array of shape (N, 4) in x1, y1, x2, y2 format
+        boxes_b: Array of shape (M, 4) in x1, y1, x2, y2 format
+
+    Returns:
+        Array of shape (N, M) with the IoU of every pair
+    """
+    boxes_a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    inter = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return inter / np.maximum(union, 1e-9)
+
+
+def nms(boxes, scores, class_ids=None, iou_threshold=0.45, max_det=300, metric='iou'):
+    """
+    Greedy non-maximum suppression
+
+    Boxes of different classes never suppress each other when class_ids is
+    given; this is done by shifting each class into its own coordinate range
+    so a single pass handles all classes.
+
+    Args:
+        boxes: Array of shape (N, 4) in x1, y1, x2, y2 format
+        scores: Array of shape (N,)
+        class_ids: Optional array of shape (N,) for class-aware suppression
+        iou_threshold: Boxes overlapping a kept box by more than this are dropped
+        max_det: Maximum number of boxes to keep
+        metric: 'iou' for intersection over union, or 'ios' for intersection
+            over the smaller box, which also removes fragments of an object
+            that was cut off at a tile border
+
+    Returns:
+        Indices of the kept boxes, highest score first
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    if class_ids is not None:
+        # The offset spans the full coordinate range, so it also separates
+        # classes when unclipped model output has negative coordinates
+        offset = float(boxes.max() - boxes.min()) + 1.0
+        boxes = boxes + (np.asarray(class_ids, dtype=np.float32) * offset)[:, None]
+
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores, kind='stable')
+
+    keep = []
+    while order.size > 0 and len(keep) < max_det:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        # IoU of the kept box against all remaining candidates at once
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        if metric == 'ios':
+            overlap = inter / np.maximum(np.minimum(areas[i], areas[rest]), 1e-9)
+        else:
+            overlap = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+
+        order = rest[overlap <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.int64)
+
+
+def xywh_to_xyxy(boxes):
+    """Convert center x, y, width, height boxes to corner format"""
+    boxes = np.asarray(boxes, dtype=np.float32)
+    out = np.empty_like(boxes)
+    half_w = boxes[..., 2] / 2
+    half_h = boxes[..., 3] / 2
+    out[..., 0] = boxes[..., 0] - half_w
+    out[..., 1] = boxes[..., 1] - half_h
+    out[..., 2] = boxes[..., 0] + half_w
+    out[..., 3] = boxes[..., 1] + half_h
+    return out
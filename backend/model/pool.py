@@ -0,0 +1,222 @@
+import os
+import sys
+import types
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .model import EwasteDetector, DetectionStats, render_detections, weights_id
+from .backends import resolve_weights
+
+# Detector owned by the current worker process
+_worker_detector = None
+
+
+def _init_worker(model_path, threads, warmup_runs, backend_options):
+    """Load and warm up the model in a worker process, pinned to a fixed number of threads"""
+    global _worker_detector
+
+    # Must be set before the inference libraries create their thread pools
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+
+    import cv2
+    cv2.setNumThreads(threads)
+
+    if 'num_threads' not in backend_options and model_path.lower().endswith('.onnx'):
+        backend_options = dict(backend_options, num_threads=threads)
+    _worker_detector = EwasteDetector(model_path=model_path, **backend_options)
+
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    if warmup_runs:
+        _worker_detector.warmup(warmup_runs)
+
+
+def _worker_ping():
+    return os.getpid()
+
+
+@contextlib.contextmanager
+def _hidden_main():
+    """
+    Keep newly started workers from re-running the main script
+
+    Children that are not forked import the parent's main module before they
+    run anything; when that is app.py, every worker would load all models and
+    stores again. The workers only need this module, so the main module is
+    swapped for an empty one while they start.
+    """
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main
+
+
+def _worker_class_names():
+    return _worker_detector.class_names()
+
+
+def _worker_input_size():
+    return _worker_detector.input_size()
+
+
+def _worker_detect_batch(images, conf_threshold, tile_size, tile_overlap):
+    """Run one batch in a worker; returns the detections and per-image stage times"""
+    return _worker_detector._infer(images, conf_threshold, tile_size, tile_overlap)
+
+
+class DetectorPool:
+    """
+    Pool of inference processes with the same interface as EwasteDetector.
+
+    Each worker process loads its own copy of the model and is limited to a
+    fixed number of threads, so N workers can use N * threads cores without
+    oversubscribing them. Statistics are recorded here in the parent from the
+    results the workers send back, so they cover all workers.
+    """
+
+    def __init__(self, model_path='best.pt', workers=2, threads_per_worker=1, warmup_runs=0,
+                 allow_download=True, **backend_options):
+        """
+        Args:
+            model_path: Path to the model weights (.pt or .onnx)
+            workers: Number of inference processes
+            threads_per_worker: Threads each process may use for inference
+            warmup_runs: Warm-up inferences each worker runs before it is
+                considered started
+            allow_download: Fall back to the stock YOLOv8n weights when
+                model_path does not exist
+            **backend_options: Extra options for the ONNX backend
+        """
+        model_path = resolve_weights(model_path)
+        if not allow_download and not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model not found at {model_path}")
+
+        self.workers = max(1, int(workers))
+        self.threads_per_worker = max(1, int(threads_per_worker))
+        self.model_id = weights_id(model_path if os.path.exists(model_path) else 'yolov8n.pt')
+        self.stats = DetectionStats()
+
+        # Pools are also created while the server's threads are running (the
+        # image store sweeper, stats writer, model watcher, request threads),
+        # and forking a threaded process can copy locks that are held. Workers
+        # are forked from a single-threaded forkserver instead, or spawned.
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['model.pool'])
+        else:
+            context = multiprocessing.get_context('spawn')
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(model_path, self.threads_per_worker, warmup_runs, backend_options)
+        )
+
+        # Start every worker now rather than on a later request; while none is
+        # idle, each submit starts another process, so one ping per worker
+        # starts them all
+        with _hidden_main():
+            pings = [self._executor.submit(_worker_ping) for _ in range(self.workers)]
+        for ping in pings:
+            ping.result()
+        print(f"Started {self.workers} inference worker processes")
+
+    def detect(self, image_path, conf_threshold=0.25, tile_size=None, tile_overlap=0.2):
+        """
+        Detect e-waste objects in the image using one of the workers
+
+        Args:
+            image_path: Path to the image or a decoded BGR array
+            conf_threshold: Confidence threshold for detections
+            tile_size: Tile side length for tiled inference (None disables it)
+            tile_overlap: Fraction of each tile shared with its neighbours
+
+        Returns:
+            List of detections with class, confidence, and bounding box
+        """
+        return self.detect_batch([image_path], conf_threshold, tile_size, tile_overlap)[0]
+
+    def detect_batch(self, image_paths, conf_threshold=0.25, tile_size=None, tile_overlap=0.2):
+        """
+        Detect e-waste objects in several images with a single predict call
+
+        Args:
+            image_paths: List of image paths or decoded BGR arrays
+            conf_threshold: Confidence threshold for detections
+            tile_size: Tile side length for tiled inference (None disables it)
+            tile_overlap: Fraction of each tile shared with its neighbours
+
+        Returns:
+            List of detection lists, one per input image
+        """
+        if not image_paths:
+            return []
+
+        future = self._executor.submit(
+            _worker_detect_batch, list(image_paths), conf_threshold, tile_size, tile_overlap
+        )
+        batch_detections, stage_times = future.result()
+
+        processing_time = sum(stage_times.values())
+        for detections in batch_detections:
+            self.stats.record(detections, processing_time, stage_times)
+        return batch_detections
+
+    def draw_boxes(self, image_path, output_path=None, detections=None):
+        """
+        Draw bounding boxes on the image and save it
+
+        Args:
+            image_path: Path to the input image or a decoded BGR array
+            output_path: Path to save the output image (if None, the
+                JPEG-encoded bytes are returned instead)
+            detections: List of detections (if None, will run detection)
+
+        Returns:
+            Path to the output image, or the encoded bytes
+        """
+        if detections is None:
+            detections = self.detect(image_path)
+        return render_detections(image_path, detections, output_path)
+
+    def class_names(self):
+        """Names of the classes the workers' model can report"""
+        return self._executor.submit(_worker_class_names).result()
+
+    def input_size(self):
+        """Long side of the workers' model input"""
+        return self._executor.submit(_worker_input_size).result()
+
+    def close(self):
+        """Shut down the worker processes"""
+        self._executor.shutdown(wait=True)
+
+    # Statistics methods
+    def get_processed_count(self):
+        """Get the number of processed images"""
+        return self.stats.get_processed_count()
+
+    def get_total_detections(self):
+        """Get the total number of detections"""
+        return self.stats.get_total_detections()
+
+    def get_detection_breakdown(self):
+        """Get breakdown of detections by class"""
+        return self.stats.get_detection_breakdown()
+
+    def get_avg_processing_time(self):
+        """Get average processing time in seconds"""
+        return self.stats.get_avg_processing_time()
+
+    def get_latency_summary(self):
+        """Get latency percentiles and throughput over sliding windows"""
+        return self.stats.get_latency_summary()
@@ -0,0 +1,309 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .metrics import RollingWindow
+
+
+def _rss_bytes():
+    """Resident memory of this process, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+class ModelEntry:
+    """One loaded model: its detector, the object requests go through, and its metrics"""
+
+    def __init__(self, name, path, detector, inference, load_seconds, memory_bytes, version=1):
+        self.name = name
+        self.path = path
+        self.detector = detector
+        self.inference = inference
+        self.model_id = detector.model_id
+        self.input_size = detector.input_size()
+        self.version = version
+        self.loaded_at = time.time()
+        self.load_seconds = load_seconds
+        self.memory_bytes = memory_bytes
+        self.mtime = _mtime(path)
+        self.latency = RollingWindow(capacity=2048, horizon=900)
+
+        # Requests currently using this version; once it has been replaced
+        # (retired) it is shut down when the last of them finishes
+        self.in_flight = 0
+        self.retired = False
+
+    def detect(self, image, conf_threshold=0.25, tile_size=None, tile_overlap=0.2):
+        """Run detection and record the latency against this model"""
+        start = time.perf_counter()
+        detections = self.inference.detect(image, conf_threshold, tile_size, tile_overlap)
+        self.latency.record(time.perf_counter() - start)
+        return detections
+
+    def get_stats(self):
+        return {
+            'name': self.name,
+            'path': self.path,
+            'model_id': self.model_id,
+            'version': self.version,
+            'loaded_at': self.loaded_at,
+            'load_seconds': self.load_seconds,
+            'weights_bytes': os.path.getsize(self.path) if os.path.exists(self.path) else None,
+            'memory_bytes': self.memory_bytes,
+            'in_flight': self.in_flight,
+            'latency': self.latency.summary(window=300)
+        }
+
+
+class ModelProxy:
+    """Detector-like handle that always uses the registry's current version of a model"""
+
+    def __init__(self, registry, name=None):
+        self.registry = registry
+        self.name = name
+
+    def detect(self, image, conf_threshold=0.25, tile_size=None, tile_overlap=0.2):
+        with self.registry.acquire(self.name) as entry:
+            return entry.detect(image, conf_threshold, tile_size, tile_overlap)
+
+
+class ModelRegistry:
+    """
+    Set of named models that can be swapped for new weights under live traffic.
+
+    Models are listed fastest first. Reloading builds and warms up the new
+    version in a background thread and then replaces the entry in a single
+    assignment, so requests see either the old or the new model and never a
+    half-loaded one. Requests run a model inside acquire() or hold(), which
+    count them against the version they use; the old version is shut down
+    once the last request using it has finished.
+    """
+
+    def __init__(self, factory, default=None, watch_interval=0):
+        """
+        Args:
+            factory: Callable taking a weights path and a warmup flag and
+                returning a loaded (detector, inference) pair; inference is
+                what requests call detect on (a BatchScheduler or the detector)
+            default: Name of the model used when a request names none
+                (defaults to the first model added)
+            watch_interval: Seconds between checks of the weights files for
+                changes, which trigger a reload (0 disables watching)
+        """
+        self._factory = factory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._reloading = set()
+        self.default = default
+        self.last_errors = {}
+
+        self._stop = threading.Event()
+        if watch_interval > 0:
+            self._watcher = threading.Thread(
+                target=self._watch, args=(watch_interval,), name='model-watcher', daemon=True
+            )
+            self._watcher.start()
+
+    def _load(self, name, path, version=1, warmup=True):
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        detector, inference = self._factory(path, warmup)
+        load_seconds = time.perf_counter() - start
+        rss_after = _rss_bytes()
+        memory = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        return ModelEntry(name, path, detector, inference, load_seconds, memory, version)
+
+    def add(self, name, path, warmup=True):
+        """
+        Load a model and make it available under `name` (blocks until loaded)
+
+        Args:
+            name: Name requests select the model by
+            path: Weights file
+            warmup: Whether to warm the model up before returning; pass False
+                when the caller warms it up separately
+        """
+        entry = self._load(name, path, warmup=warmup)
+        with self._lock:
+            self._entries[name] = entry
+            if self.default is None:
+                self.default = name
+        return entry
+
+    def names(self):
+        with self._lock:
+            return list(self._entries)
+
+    def get(self, name=None):
+        """
+        Current version of a model
+
+        Raises:
+            KeyError: If no model has that name
+        """
+        with self._lock:
+            return self._entries[name or self.default]
+
+    def entries(self):
+        with self._lock:
+            return list(self._entries.values())
+
+    @contextmanager
+    def acquire(self, name=None):
+        """
+        Current version of a model, kept open for the duration of the with-block
+
+        Raises:
+            KeyError: If no model has that name
+        """
+        with self._lock:
+            entry = self._entries[name or self.default]
+            entry.in_flight += 1
+        try:
+            yield entry
+        finally:
+            self._release(entry)
+
+    @contextmanager
+    def hold(self, entry):
+        """
+        Keep an entry obtained earlier open for the duration of the with-block
+
+        An entry that has been replaced since may already be shut down, so
+        the current version of the model is used instead.
+
+        Yields:
+            The entry to run the request on
+        """
+        with self._lock:
+            if entry.retired:
+                entry = self._entries[entry.name]
+            entry.in_flight += 1
+        try:
+            yield entry
+        finally:
+            self._release(entry)
+
+    def _release(self, entry):
+        with self._lock:
+            entry.in_flight -= 1
+            idle = entry.retired and entry.in_flight == 0
+        if idle:
+            self._retire(entry)
+
+    def select(self, latency_budget):
+        """
+        Most accurate model whose recent p90 latency fits the budget
+
+        Models without latency samples yet are only chosen when no measured
+        model fits, so traffic is not sent blindly to an unknown slow model.
+
+        Args:
+            latency_budget: Budget in seconds
+
+        Returns:
+            The chosen ModelEntry (the fastest model when none fits)
+        """
+        entries = self.entries()
+        unmeasured = None
+        for entry in reversed(entries):
+            summary = entry.latency.summary(window=300)
+            if not summary['count']:
+                unmeasured = unmeasured or entry
+            elif summary['p90'] <= latency_budget:
+                return entry
+        return unmeasured or entries[0]
+
+    def reload(self, name, path=None):
+        """
+        Load new weights for a model in the background and switch to them
+
+        Args:
+            name: Model to reload
+            path: New weights file (defaults to the current path)
+
+        Returns:
+            False if a reload of this model is already running
+        """
+        current = self.get(name)
+        with self._lock:
+            if name in self._reloading:
+                return False
+            self._reloading.add(name)
+
+        thread = threading.Thread(
+            target=self._reload, args=(current, path or current.path), name=f'model-reload-{name}', daemon=True
+        )
+        thread.start()
+        return True
+
+    def _reload(self, current, path):
+        try:
+            entry = self._load(current.name, path, current.version + 1)
+        except Exception as e:
+            self.last_errors[current.name] = str(e)
+            print(f"Warning: Could not reload model {current.name} from {path}: {e}")
+            # Do not retry the same broken file until it changes again
+            if path == current.path:
+                current.mtime = _mtime(path)
+            with self._lock:
+                self._reloading.discard(current.name)
+            return
+
+        with self._lock:
+            self._entries[current.name] = entry
+            self._reloading.discard(current.name)
+            # Requests still running on the old version finish on it
+            current.retired = True
+            idle = current.in_flight == 0
+        self.last_errors.pop(current.name, None)
+        print(f"Switched model {current.name} to {path} (version {entry.version}, loaded in {entry.load_seconds:.2f}s)")
+
+        if idle:
+            self._retire(current)
+
+    @staticmethod
+    def _retire(entry):
+        components = [entry.inference]
+        if entry.detector is not entry.inference:
+            components.append(entry.detector)
+        for component in components:
+            close = getattr(component, 'close', None)
+            if close is not None:
+                close()
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            for entry in self.entries():
+                mtime = _mtime(entry.path)
+                if mtime is not None and entry.mtime is not None and mtime != entry.mtime:
+                    # Wait for the file to stop changing before loading it
+                    if time.time() - mtime >= interval:
+                        self.reload(entry.name)
+
+    def close(self):
+        self._stop.set()
+
+    def get_stats(self):
+        """Get per-model load time, memory and recent latency"""
+        with self._lock:
+            entries = list(self._entries.values())
+            reloading = sorted(self._reloading)
+        return {
+            'default': self.default,
+            'reloading': reloading,
+            'errors': dict(self.last_errors),
+            'models': [entry.get_stats() for entry in entries]
+        }
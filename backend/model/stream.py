@@ -0,0 +1,189 @@
+import time
+import queue
+import threading
+import numpy as np
+
+from .metrics import RollingWindow
+
+
+class FrameStream:
+    """
+    Continuous detection over a stream of frames (camera feed or video).
+
+    Frames are handed to a single inference thread through a one-slot
+    mailbox: when a new frame arrives before the previous one was picked up,
+    the stale frame is dropped, so the stream never falls behind the source.
+    Every Nth frame can be skipped, and frames that barely differ from the
+    last processed one can reuse its detections instead of running the model.
+    """
+
+    def __init__(self, detector, conf_threshold=0.25, skip_frames=0, change_threshold=None, max_pending_results=256):
+        """
+        Args:
+            detector: EwasteDetector (or anything with a detect method)
+            conf_threshold: Confidence threshold for detections
+            skip_frames: Process one frame, then ignore this many
+            change_threshold: Mean absolute grey-level difference (0-255) on a
+                downscaled frame below which a frame counts as unchanged;
+                None processes every frame
+            max_pending_results: Results kept for a slow reader before the
+                oldest are discarded
+        """
+        self.detector = detector
+        self.conf_threshold = conf_threshold
+        self.skip_frames = max(0, int(skip_frames))
+        self.change_threshold = change_threshold
+
+        self._cond = threading.Condition()
+        self._slot = None
+        self._closed = False
+        self._results = queue.Queue(maxsize=max_pending_results)
+
+        self._last_signature = None
+        self._last_detections = []
+
+        # Counters
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.frames_skipped = 0
+        self.frames_unchanged = 0
+        self.frames_processed = 0
+        self.results_discarded = 0
+        self.latency = RollingWindow(capacity=1024, horizon=300)
+        self.started_at = time.time()
+        self.last_activity = self.started_at
+
+        self._worker = threading.Thread(target=self._run, name='frame-stream', daemon=True)
+        self._worker.start()
+
+    def submit(self, frame, received_at=None):
+        """
+        Offer a frame for detection
+
+        Args:
+            frame: Decoded BGR image
+            received_at: Time the frame was captured or received (defaults to now)
+
+        Returns:
+            Sequence number assigned to the frame
+        """
+        received_at = time.time() if received_at is None else received_at
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Stream is closed")
+            seq = self.frames_received
+            self.frames_received += 1
+            self.last_activity = received_at
+
+            if self.skip_frames and seq % (self.skip_frames + 1):
+                self.frames_skipped += 1
+                return seq
+
+            # A frame still waiting in the slot is stale now
+            if self._slot is not None:
+                self.frames_dropped += 1
+            self._slot = (seq, frame, received_at)
+            self._cond.notify()
+        return seq
+
+    def _signature(self, frame):
+        """Small greyscale thumbnail used to detect unchanged frames"""
+        import cv2
+
+        small = cv2.resize(frame, (64, 64), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+    def _emit(self, result):
+        while True:
+            try:
+                self._results.put_nowait(result)
+                return
+            except queue.Full:
+                try:
+                    self._results.get_nowait()
+                    self.results_discarded += 1
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._slot is None and not self._closed:
+                    self._cond.wait()
+                if self._slot is None:
+                    break
+                seq, frame, received_at = self._slot
+                self._slot = None
+
+            reused = False
+            if self.change_threshold is not None:
+                signature = self._signature(frame)
+                if (self._last_signature is not None and
+                        np.abs(signature - self._last_signature).mean() < self.change_threshold):
+                    reused = True
+                else:
+                    self._last_signature = signature
+
+            if reused:
+                detections = self._last_detections
+                self.frames_unchanged += 1
+            else:
+                try:
+                    detections = self.detector.detect(frame, self.conf_threshold)
+                except Exception as e:
+                    self._emit({'frame': seq, 'error': str(e)})
+                    continue
+                self._last_detections = detections
+                self.frames_processed += 1
+
+            latency = time.time() - received_at
+            self.latency.record(latency)
+            self._emit({
+                'frame': seq,
+                'detections': detections,
+                'reused': reused,
+                'latency': latency
+            })
+
+        # Wake up readers waiting for more results
+        self._emit(None)
+
+    def results(self, timeout=None):
+        """
+        Yield results as they become available until the stream is closed
+
+        Args:
+            timeout: Seconds to wait for a result before giving up (None waits forever)
+        """
+        while True:
+            try:
+                result = self._results.get(timeout=timeout)
+            except queue.Empty:
+                return
+            if result is None:
+                return
+            yield result
+
+    def close(self):
+        """Stop accepting frames; frames already in the slot are still processed"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def get_stats(self):
+        """Get frame counters, processing rate and end-to-end latency"""
+        elapsed = max(1e-9, time.time() - self.started_at)
+        return {
+            'frames_received': self.frames_received,
+            'frames_processed': self.frames_processed,
+            'frames_dropped': self.frames_dropped,
+            'frames_skipped': self.frames_skipped,
+            'frames_unchanged': self.frames_unchanged,
+            'results_discarded': self.results_discarded,
+            'processed_fps': self.frames_processed / elapsed,
+            'latency': self.latency.summary(window=60)
+        }
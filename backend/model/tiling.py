@@ -0,0 +1,66 @@
+import numpy as np
+
+from .ops import nms
+
+
+def make_tiles(height, width, tile_size=640, overlap=0.2):
+    """
+    Split an image into overlapping square tiles
+
+    Tiles step by tile_size * (1 - overlap); the last row and column are
+    aligned with the image edge so every pixel is covered without padding.
+
+    Args:
+        height: Image height in pixels
+        width: Image width in pixels
+        tile_size: Tile side length in pixels
+        overlap: Fraction of the tile shared with its neighbour (0 to <1)
+
+    Returns:
+        Integer array of shape (N, 4) with x1, y1, x2, y2 for each tile
+    """
+    tile_size = int(tile_size)
+    stride = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return np.zeros(1, dtype=np.int64)
+        positions = np.arange(0, length - tile_size, stride, dtype=np.int64)
+        return np.append(positions, length - tile_size)
+
+    xs, ys = np.meshgrid(starts(width), starts(height))
+    x1, y1 = xs.ravel(), ys.ravel()
+    return np.stack([
+        x1, y1,
+        np.minimum(x1 + tile_size, width),
+        np.minimum(y1 + tile_size, height)
+    ], axis=1)
+
+
+def merge_tile_outputs(outputs, offsets, iou_threshold=0.5, max_det=300):
+    """
+    Merge per-tile detections into full-image coordinates
+
+    Args:
+        outputs: List of (boxes, scores, class_ids) tuples, one per tile
+        offsets: Array of shape (N, 2) with the x, y origin of each tile
+        iou_threshold: Overlap (over the smaller box) above which boxes of
+            the same class from different tiles are merged
+        max_det: Maximum number of detections kept
+
+    Returns:
+        Tuple of (boxes, scores, class_ids) for the whole image
+    """
+    offsets = np.asarray(offsets, dtype=np.float32).reshape(-1, 2)
+    counts = [len(scores) for _, scores, _ in outputs]
+    if not sum(counts):
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+    # Shift every box by its tile origin in one operation
+    boxes = np.concatenate([np.asarray(b, dtype=np.float32).reshape(-1, 4) for b, _, _ in outputs])
+    boxes += np.tile(np.repeat(offsets, counts, axis=0), 2)
+    scores = np.concatenate([np.asarray(s, dtype=np.float32).reshape(-1) for _, s, _ in outputs])
+    class_ids = np.concatenate([np.asarray(c, dtype=np.int64).reshape(-1) for _, _, c in outputs])
+
+    keep = nms(boxes, scores, class_ids, iou_threshold, max_det, metric='ios')
+    return boxes[keep], scores[keep], class_ids[keep]
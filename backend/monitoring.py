@@ -0,0 +1,246 @@
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    """Escape a label value for the text exposition format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class CounterMetric:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[tuple(labelvalues)] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, labelvalues)} {value}")
+        return lines
+
+
+class GaugeMetric:
+    """Gauge whose value is read from a callback at scrape time"""
+
+    def __init__(self, name, help_text, callback, labelnames=()):
+        """
+        Args:
+            callback: Returns a number, or a dict of label value tuples to
+                numbers when labelnames is given
+        """
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+
+    def render(self, metric_type='gauge'):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {metric_type}"]
+        value = self.callback()
+        if self.labelnames:
+            for labelvalues, v in sorted(value.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labelvalues)} {v}")
+        else:
+            lines.append(f"{self.name} {value}")
+        return lines
+
+
+class CallbackCounterMetric(GaugeMetric):
+    """Counter whose value is read from a callback at scrape time"""
+
+    def render(self):
+        return super().render('counter')
+
+
+class HistogramMetric:
+    """Cumulative histogram with fixed buckets and optional labels"""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        key = tuple(labelvalues)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labelvalues):
+        """Observe the duration of the with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        for labelvalues, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                labels = _labels(self.labelnames, labelvalues, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labelvalues)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together for a /metrics scrape"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(CounterMetric(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(HistogramMetric(name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, callback, labelnames=()):
+        return self.register(GaugeMetric(name, help_text, callback, labelnames))
+
+    def callback_counter(self, name, help_text, callback, labelnames=()):
+        return self.register(CallbackCounterMetric(name, help_text, callback, labelnames))
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler that can be switched on at runtime.
+
+    A background thread periodically samples the stacks of all other threads
+    and counts them in collapsed-stack form (frames joined by ';'), which can
+    be fed straight to flamegraph tools.
+    """
+
+    def __init__(self, max_stacks=5000, max_depth=64):
+        """
+        Args:
+            max_stacks: Maximum number of distinct stacks kept; further new
+                stacks are counted under a single overflow entry
+            max_depth: Maximum number of frames recorded per stack
+        """
+        self.max_stacks = max_stacks
+        self.max_depth = max_depth
+        self.interval = 0.01
+        self.samples = 0
+        self.started_at = None
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms=10):
+        """Start sampling every interval_ms milliseconds, clearing earlier samples"""
+        if self.running:
+            return False
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+        self.interval = max(1.0, float(interval_ms)) / 1000.0
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Stop sampling; collected stacks are kept until the next start"""
+        if not self.running:
+            return False
+        self._stop.set()
+        self._thread.join()
+        return True
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                self.samples += 1
+                for thread_id, frame in frames.items():
+                    if thread_id == own_id:
+                        continue
+                    # Walk the frames directly; traceback helpers read source lines
+                    names = []
+                    while frame is not None and len(names) < self.max_depth:
+                        code = frame.f_code
+                        names.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                        frame = frame.f_back
+                    key = ';'.join(reversed(names))
+                    if key in self._stacks or len(self._stacks) < self.max_stacks:
+                        self._stacks[key] += 1
+                    else:
+                        self._stacks['[other]'] += 1
+
+    def collapsed(self):
+        """Get the collected samples in collapsed-stack text format"""
+        with self._lock:
+            items = self._stacks.most_common()
+        return '\n'.join(f"{stack} {count}" for stack, count in items) + '\n'
+
+    def status(self):
+        return {
+            'running': self.running,
+            'interval_ms': self.interval * 1000.0,
+            'samples': self.samples,
+            'distinct_stacks': len(self._stacks),
+            'started_at': self.started_at
+        }
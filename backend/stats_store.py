@@ -0,0 +1,238 @@
+import os
+import time
+import queue
+import sqlite3
+import threading
+from collections import Counter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hourly_images (
+    hour INTEGER PRIMARY KEY,
+    images INTEGER NOT NULL,
+    detections INTEGER NOT NULL,
+    processing_time REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hourly_detections (
+    hour INTEGER NOT NULL,
+    class TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    confidence_sum REAL NOT NULL,
+    PRIMARY KEY (hour, class)
+) WITHOUT ROWID;
+"""
+
+
+class StatsStore:
+    """
+    Persistent detection statistics in a local SQLite database.
+
+    Detections are aggregated into hourly buckets per class, so the database
+    grows with time and the number of classes rather than with traffic, and
+    range queries stay fast however many detections were recorded. Records
+    are queued and written by a background thread in batched transactions,
+    so recording never waits on disk. The database runs in WAL mode, which
+    lets queries read while the writer commits.
+    """
+
+    def __init__(self, path, flush_interval=1.0, max_pending=10000):
+        """
+        Args:
+            path: Database file
+            flush_interval: Longest time a record waits before it is written
+            max_pending: Records queued before new ones are dropped
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._local = threading.local()
+
+        # Store statistics
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._run, name='stats-writer', daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        """Connection for the calling thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def record(self, detections, processing_time, timestamp=None):
+        """
+        Queue one processed image; never blocks
+
+        Args:
+            detections: Detections found in the image
+            processing_time: Seconds spent on the image
+            timestamp: Time the image was processed (defaults to now)
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        classes = [(det['class'], det['confidence']) for det in detections]
+        try:
+            self._queue.put_nowait((timestamp, processing_time, classes))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            # Give other records a moment to arrive so they share a transaction
+            time.sleep(min(self.flush_interval, 0.25))
+            batch = [first]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._write(batch)
+            except sqlite3.Error as e:
+                print(f"Warning: Could not write {len(batch)} stats records: {e}")
+
+    def _write(self, batch):
+        """Fold a batch into per-hour sums and upsert them in one transaction"""
+        images = {}
+        classes = Counter()
+        confidences = Counter()
+        for timestamp, processing_time, detections in batch:
+            hour = int(timestamp // 3600)
+            row = images.setdefault(hour, [0, 0, 0.0])
+            row[0] += 1
+            row[1] += len(detections)
+            row[2] += processing_time
+            for class_name, confidence in detections:
+                classes[(hour, class_name)] += 1
+                confidences[(hour, class_name)] += confidence
+
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                """INSERT INTO hourly_images (hour, images, detections, processing_time)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT(hour) DO UPDATE SET
+                       images = images + excluded.images,
+                       detections = detections + excluded.detections,
+                       processing_time = processing_time + excluded.processing_time""",
+                [(hour, *row) for hour, row in images.items()]
+            )
+            conn.executemany(
+                """INSERT INTO hourly_detections (hour, class, count, confidence_sum)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT(hour, class) DO UPDATE SET
+                       count = count + excluded.count,
+                       confidence_sum = confidence_sum + excluded.confidence_sum""",
+                [(hour, name, count, confidences[(hour, name)]) for (hour, name), count in classes.items()]
+            )
+        self.written += len(batch)
+        self.flushes += 1
+
+    def get_totals(self):
+        """
+        All-time totals
+
+        Returns:
+            Dict with processed_count, total_detections, processing_time_total
+            and the per-class detection_counts
+        """
+        conn = self._connect()
+        images, detections, processing_time = conn.execute(
+            'SELECT COALESCE(SUM(images), 0), COALESCE(SUM(detections), 0), '
+            'COALESCE(SUM(processing_time), 0) FROM hourly_images'
+        ).fetchone()
+        breakdown = dict(conn.execute(
+            'SELECT class, SUM(count) FROM hourly_detections GROUP BY class ORDER BY class'
+        ).fetchall())
+        return {
+            'processed_count': images,
+            'total_detections': detections,
+            'processing_time_total': processing_time,
+            'detection_counts': breakdown
+        }
+
+    def get_history(self, start, end, bucket='day', utc_offset=0):
+        """
+        Aggregates over a time range
+
+        Args:
+            start: Range start as a Unix timestamp (inclusive)
+            end: Range end as a Unix timestamp (exclusive)
+            bucket: 'hour' or 'day'
+            utc_offset: Offset of the caller's time zone in minutes, so days
+                start at local midnight
+
+        Returns:
+            List of buckets in time order, each with its start timestamp,
+            image and detection counts, average processing time and per-class
+            counts; buckets without traffic are omitted
+        """
+        size = 86400 if bucket == 'day' else 3600
+        shift = int(utc_offset) * 60
+
+        conn = self._connect()
+        first_hour, last_hour = int(start // 3600), int(-(-end // 3600))
+        # Group hours into buckets in SQL so only one row per bucket comes back
+        bucket_expr = f'((hour * 3600 + {shift}) / {size}) * {size} - {shift}'
+        rows = conn.execute(
+            f"""SELECT {bucket_expr} AS bucket, SUM(images), SUM(detections), SUM(processing_time)
+                FROM hourly_images WHERE hour >= ? AND hour < ?
+                GROUP BY bucket ORDER BY bucket""",
+            (first_hour, last_hour)
+        ).fetchall()
+        class_rows = conn.execute(
+            f"""SELECT {bucket_expr} AS bucket, class, SUM(count), SUM(confidence_sum)
+                FROM hourly_detections WHERE hour >= ? AND hour < ?
+                GROUP BY bucket, class""",
+            (first_hour, last_hour)
+        ).fetchall()
+
+        per_class = {}
+        for bucket_start, class_name, count, confidence_sum in class_rows:
+            per_class.setdefault(bucket_start, {})[class_name] = {
+                'count': count,
+                'avg_confidence': confidence_sum / count if count else 0
+            }
+
+        return [{
+            'start': bucket_start,
+            'images': images,
+            'detections': detections,
+            'avg_processing_time': processing_time / images if images else 0,
+            'classes': per_class.get(bucket_start, {})
+        } for bucket_start, images, detections, processing_time in rows]
+
+    def close(self, timeout=5.0):
+        """Write out queued records and stop the writer"""
+        deadline = time.time() + timeout
+        while not self._queue.empty() and time.time() < deadline:
+            time.sleep(0.05)
+        self._stop.set()
+        self._writer.join(timeout=max(0.0, deadline - time.time()))
+
+    def get_stats(self):
+        """Get write and drop counters"""
+        return {
+            'path': self.path,
+            'pending': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'flushes': self.flushes
+        }
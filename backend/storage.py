@@ -0,0 +1,201 @@
+import os
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class ImageStore:
+    """
+    Content-addressed file store for uploads and annotated images.
+
+    Files are named after the hash of what they contain (or of what they were
+    derived from), so the same upload is only ever stored once and a name
+    always refers to the same bytes, which lets clients cache them forever.
+    An index ordered by last access is kept in memory; a background sweep
+    removes files past the age limit and evicts the least recently used ones
+    while the store is over its size limit.
+    """
+
+    # Access times are written back to disk at most this often per file
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, root, max_bytes=1024 * 1024 * 1024, max_age=None, sweep_interval=60):
+        """
+        Args:
+            root: Directory holding the files
+            max_bytes: Total size the store is trimmed down to
+            max_age: Seconds since last access after which a file is removed
+                (None keeps files until they are evicted for space)
+            sweep_interval: Seconds between background eviction passes
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+
+        # name -> [size, last access time], least recently used first
+        self._index = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Store statistics
+        self.writes = 0
+        self.duplicates = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+
+        self._stop = threading.Event()
+        self._sweeper = threading.Thread(target=self._run_sweeper, name='image-store-sweeper', daemon=True)
+        self._sweeper.start()
+
+    @staticmethod
+    def content_name(data, extension):
+        """
+        Name for a file from its contents
+
+        Args:
+            data: File contents
+            extension: File extension without the dot
+
+        Returns:
+            File name made of the content hash and the extension
+        """
+        return f"{hashlib.sha256(data).hexdigest()[:32]}.{extension.lower()}"
+
+    def _load_index(self):
+        """Rebuild the index from the files on disk, ordered by modification time"""
+        entries = []
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if not entry.is_file() or entry.name.startswith('.'):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+
+        for mtime, name, size in sorted(entries):
+            self._index[name] = [size, mtime]
+            self._bytes += size
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def exists(self, name):
+        with self._lock:
+            return name in self._index
+
+    def put(self, name, data):
+        """
+        Store a file unless a file of the same name is already present
+
+        Returns:
+            The file name
+        """
+        with self._lock:
+            if name in self._index:
+                self.duplicates += 1
+                self._touch_locked(name)
+                return name
+
+        # Write to a temporary file first so a half-written file is never served
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self.path(name))
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            previous = self._index.pop(name, None)
+            if previous is not None:
+                self._bytes -= previous[0]
+            self._index[name] = [len(data), time.time()]
+            self._bytes += len(data)
+            self.writes += 1
+        return name
+
+    def touch(self, name):
+        """Mark a file as recently used; returns False if it is not in the store"""
+        with self._lock:
+            if name not in self._index:
+                return False
+            self._touch_locked(name)
+            return True
+
+    def _touch_locked(self, name):
+        entry = self._index[name]
+        self._index.move_to_end(name)
+        now = time.time()
+        if now - entry[1] > self.TOUCH_INTERVAL:
+            # Persist recency so the eviction order survives restarts
+            try:
+                os.utime(self.path(name), (now, now))
+            except OSError:
+                pass
+        entry[1] = now
+
+    def sweep(self, now=None):
+        """
+        Remove expired files, then evict least recently used files over the size limit
+
+        Returns:
+            Number of files removed
+        """
+        now = time.time() if now is None else now
+        victims = []
+        with self._lock:
+            if self.max_age:
+                for name, (size, accessed) in self._index.items():
+                    if now - accessed <= self.max_age:
+                        break
+                    victims.append(name)
+                self.expirations += len(victims)
+
+            for name in victims:
+                self._bytes -= self._index.pop(name)[0]
+
+            while self._bytes > self.max_bytes and self._index:
+                name, (size, _) = self._index.popitem(last=False)
+                self._bytes -= size
+                victims.append(name)
+                self.evictions += 1
+
+        for name in victims:
+            try:
+                os.remove(self.path(name))
+            except OSError:
+                pass
+        return len(victims)
+
+    def _run_sweeper(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Warning: Image store sweep failed: {e}")
+
+    def close(self):
+        self._stop.set()
+
+    def get_stats(self):
+        """Get file count, size and eviction counters"""
+        with self._lock:
+            return {
+                'files': len(self._index),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'max_age': self.max_age,
+                'writes': self.writes,
+                'duplicates': self.duplicates,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
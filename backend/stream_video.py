@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import cv2
+
+from model.model import EwasteDetector
+from model.stream import FrameStream
+
+def setup_args():
+    parser = argparse.ArgumentParser(description='Run e-waste detection on a video file or camera feed')
+    parser.add_argument('--source', type=str, required=True, help='Video file path or camera index (e.g. 0)')
+    parser.add_argument('--model', type=str, default='model/best.pt', help='Path to the model weights (.pt or .onnx)')
+    parser.add_argument('--conf', type=float, default=0.25, help='Confidence threshold')
+    parser.add_argument('--skip-frames', type=int, default=0, help='Frames to ignore after each processed frame')
+    parser.add_argument('--change-threshold', type=float, default=None,
+                        help='Reuse the previous detections when a frame differs by less than this (0-255)')
+    parser.add_argument('--no-realtime', action='store_true',
+                        help='Feed video files as fast as they decode instead of at their native frame rate')
+    return parser.parse_args()
+
+def main():
+    args = setup_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    if isinstance(source, str) and not os.path.exists(source):
+        print(f"Error: Video not found at {source}", file=sys.stderr)
+        sys.exit(1)
+
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        print(f"Error: Could not open video source {args.source}", file=sys.stderr)
+        sys.exit(1)
+
+    detector = EwasteDetector(model_path=args.model)
+    stream = FrameStream(
+        detector,
+        conf_threshold=args.conf,
+        skip_frames=args.skip_frames,
+        change_threshold=args.change_threshold
+    )
+
+    # Print results as newline-delimited JSON while frames are being fed
+    def print_results():
+        for result in stream.results():
+            print(json.dumps(result), flush=True)
+
+    printer = threading.Thread(target=print_results, daemon=True)
+    printer.start()
+
+    # Pace video files at their own frame rate so frame dropping behaves like a live feed
+    fps = capture.get(cv2.CAP_PROP_FPS) or 0
+    frame_interval = 1.0 / fps if fps > 0 and isinstance(source, str) and not args.no_realtime else 0
+
+    try:
+        next_frame_at = time.time()
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            stream.submit(frame)
+            if frame_interval:
+                next_frame_at += frame_interval
+                time.sleep(max(0.0, next_frame_at - time.time()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        capture.release()
+        stream.close()
+        printer.join()
+
+    print(json.dumps({'stats': stream.get_stats()}), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
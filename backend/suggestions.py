@@ -0,0 +1,103 @@
+import json
+import threading
+
+# Catalog sections and the per-detection fields they fill in the full format
+SECTIONS = (('recycling', 'recycling_suggestions'), ('reuse', 'reuse_ideas'))
+
+
+class SuggestionIndex:
+    """
+    Recycling suggestions and reuse ideas for detected classes.
+
+    The catalog maps keywords to suggestion lists in two sections, recycling
+    and reuse. A class gets the lists of the first keyword that equals or is
+    contained in its lower-cased name. Matching scans the catalog, so each
+    class name is resolved once and then answered from a dict. The model's
+    class names are resolved when it loads, and anything else is resolved on
+    first sight.
+    """
+
+    def __init__(self, catalog):
+        """
+        Args:
+            catalog: Dict with 'recycling' and 'reuse' sections, each mapping
+                a keyword to a list of suggestions, in matching order
+        """
+        self.catalog = {section: dict(catalog.get(section, {})) for section, _ in SECTIONS}
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        """Read the catalog from a JSON file"""
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _match(self, class_name):
+        name = class_name.lower()
+        keys = []
+        for section, _ in SECTIONS:
+            entries = self.catalog[section]
+            if name in entries:
+                keys.append(name)
+                continue
+            keys.append(next((key for key in entries if key in name), None))
+        return tuple(keys)
+
+    def prime(self, class_names):
+        """Resolve a model's class names up front"""
+        resolved = {name: self._match(name) for name in class_names}
+        with self._lock:
+            self._keys.update(resolved)
+
+    def lookup(self, class_name):
+        """
+        Catalog keys for a class
+
+        Returns:
+            Tuple of the recycling and reuse keyword (None where nothing matches)
+        """
+        keys = self._keys.get(class_name)
+        if keys is None:
+            keys = self._match(class_name)
+            with self._lock:
+                self._keys[class_name] = keys
+        return keys
+
+    def annotate(self, detections, compact=False):
+        """
+        Attach suggestions to detections
+
+        Args:
+            detections: Detections from the model
+            compact: Reference catalog entries by keyword instead of copying
+                the lists into every detection
+
+        Returns:
+            Tuple of the annotated detections and, in compact mode, the catalog
+            entries they reference (None otherwise)
+        """
+        annotated = []
+        used = {section: {} for section, _ in SECTIONS} if compact else None
+        for detection in detections:
+            entry = {
+                'class': detection['class'],
+                'confidence': detection['confidence'],
+                'bbox': detection['bbox']
+            }
+            for (section, field), key in zip(SECTIONS, self.lookup(detection['class'])):
+                if compact:
+                    entry[section] = key
+                    if key is not None:
+                        used[section][key] = self.catalog[section][key]
+                else:
+                    entry[field] = self.catalog[section][key] if key is not None else []
+            annotated.append(entry)
+        return annotated, used
+
+    def get_stats(self):
+        return {
+            'recycling_keys': len(self.catalog['recycling']),
+            'reuse_keys': len(self.catalog['reuse']),
+            'resolved_classes': len(self._keys)
+        }
@@ -0,0 +1,102 @@
+import numpy as np
+
+from model.backends import OnnxBackend
+from model.ops import box_iou, nms, xywh_to_xyxy
+
+
+def make_backend(imgsz):
+    """OnnxBackend with only the input size set, enough for letterboxing"""
+    backend = OnnxBackend.__new__(OnnxBackend)
+    backend.imgsz = imgsz
+    return backend
+
+
+def test_xywh_to_xyxy():
+    boxes = np.array([[50, 40, 20, 10], [0, 0, 4, 6]], dtype=np.float32)
+    expected = np.array([[40, 35, 60, 45], [-2, -3, 2, 3]], dtype=np.float32)
+    np.testing.assert_allclose(xywh_to_xyxy(boxes), expected)
+
+
+def test_xywh_to_xyxy_keeps_leading_dimensions():
+    boxes = np.zeros((2, 3, 4), dtype=np.float32)
+    boxes[..., 2:] = 2
+    out = xywh_to_xyxy(boxes)
+    assert out.shape == (2, 3, 4)
+    np.testing.assert_allclose(out[0, 0], [-1, -1, 1, 1])
+
+
+def test_box_iou():
+    iou = box_iou([[0, 0, 10, 10]], [[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]])
+    np.testing.assert_allclose(iou, [[1.0, 50 / 150, 0.0]], rtol=1e-6)
+
+
+def test_nms_suppresses_overlaps_highest_score_first():
+    boxes = [[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60]]
+    scores = [0.8, 0.9, 0.7]
+    np.testing.assert_array_equal(nms(boxes, scores, iou_threshold=0.5), [1, 2])
+
+
+def test_nms_keeps_other_classes():
+    boxes = [[0, 0, 10, 10], [1, 1, 11, 11]]
+    keep = nms(boxes, [0.9, 0.8], class_ids=[0, 1], iou_threshold=0.5)
+    np.testing.assert_array_equal(keep, [0, 1])
+
+
+def test_nms_keeps_other_classes_with_negative_coordinates():
+    # Unclipped output: an offset of max() + 1 is zero here and would let
+    # class 1 be suppressed by the identical class 0 box
+    boxes = [[-11, -11, -1, -1], [-10, -10, -2, -2], [-11, -11, -1, -1]]
+    keep = nms(boxes, [0.9, 0.8, 0.7], class_ids=[0, 0, 1], iou_threshold=0.5)
+    np.testing.assert_array_equal(keep, [0, 2])
+
+
+def test_nms_ios_removes_fragments():
+    # A fragment fully inside a larger box has low IoU but IoS of 1
+    boxes = [[0, 0, 100, 100], [0, 0, 20, 100]]
+    np.testing.assert_array_equal(nms(boxes, [0.9, 0.8], iou_threshold=0.5), [0, 1])
+    np.testing.assert_array_equal(nms(boxes, [0.9, 0.8], iou_threshold=0.5, metric='ios'), [0])
+
+
+def test_nms_max_det_and_empty():
+    boxes = [[i * 20, 0, i * 20 + 10, 10] for i in range(5)]
+    assert len(nms(boxes, np.linspace(1, 0.5, 5), max_det=3)) == 3
+    assert nms(np.zeros((0, 4)), np.zeros(0)).shape == (0,)
+
+
+def test_letterbox_pads_to_input_size():
+    image = np.full((100, 200, 3), 255, dtype=np.uint8)
+    padded, ratio, (left, top) = make_backend((320, 320))._letterbox(image)
+
+    assert padded.shape == (320, 320, 3)
+    assert ratio == 1.6
+    assert (left, top) == (0, 80)
+    # Image rows are kept, the padding rows are grey
+    assert (padded[top:top + 160] == 255).all()
+    assert (padded[:top] == 114).all() and (padded[top + 160:] == 114).all()
+
+
+def test_postprocess_returns_boxes_in_original_pixels():
+    backend = make_backend((320, 320))
+    backend.iou_threshold = 0.5
+    backend.max_det = 300
+    _, ratio, pad = backend._letterbox(np.zeros((100, 200, 3), dtype=np.uint8))
+    transform = (ratio, pad, (100, 200))
+
+    # Raw output: (4 box values + 2 class scores, anchors), boxes as center
+    # x, y, width, height in letterboxed pixels (ratio 1.6, 80 rows of padding)
+    output = np.zeros((6, 4), dtype=np.float32)
+    output[:4, 0] = [64, 128, 64, 64]     # original 20, 10, 60, 50
+    output[5, 0] = 0.9
+    output[:4, 1] = [66, 130, 64, 64]     # duplicate of the first box
+    output[5, 1] = 0.8
+    output[:4, 2] = [160, 160, 32, 32]    # below the threshold
+    output[4, 2] = 0.1
+    output[:4, 3] = [320, 240, 64, 64]    # original 180, 80, 220, 120, past the edge
+    output[4, 3] = 0.7
+
+    boxes, scores, class_ids = backend._postprocess(output, transform, 0.25)
+
+    np.testing.assert_allclose(boxes, [[20, 10, 60, 50], [180, 80, 200, 100]], atol=1e-4)
+    np.testing.assert_allclose(scores, [0.9, 0.7])
+    np.testing.assert_array_equal(class_ids, [1, 0])
+    assert class_ids.dtype == np.int64
@@ -0,0 +1,44 @@
+import os
+import sys
+import glob
+
+import pytest
+
+# Weights and images are not part of the repository; point these at a
+# trained model, its ONNX export and a directory of test images
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+WEIGHTS = os.environ.get('PARITY_WEIGHTS', os.path.join(BACKEND_DIR, 'model', 'best.pt'))
+ONNX = os.environ.get('PARITY_ONNX', os.path.splitext(WEIGHTS)[0] + '.onnx')
+IMAGES = os.environ.get('PARITY_IMAGES', '')
+IMAGE_LIMIT = 20
+
+# The matching rules are shared with the command-line check
+sys.path.insert(0, os.path.join(BACKEND_DIR, '..', 'scripts', 'model'))
+
+
+def test_onnx_matches_pytorch():
+    pytest.importorskip('ultralytics')
+    pytest.importorskip('onnxruntime')
+    if not os.path.exists(WEIGHTS) or not os.path.exists(ONNX):
+        pytest.skip(f"Weights not found ({WEIGHTS}, {ONNX})")
+    images = sorted(
+        path for path in glob.glob(os.path.join(IMAGES, '*'))
+        if path.lower().endswith(('.jpg', '.jpeg', '.png'))
+    )[:IMAGE_LIMIT] if IMAGES else []
+    if not images:
+        pytest.skip("Set PARITY_IMAGES to a directory of test images")
+
+    from check_onnx_parity import compare
+    from model.backends import UltralyticsBackend, OnnxBackend
+
+    reference = UltralyticsBackend(WEIGHTS)
+    candidate = OnnxBackend(ONNX)
+    mismatched = []
+    for path in images:
+        unmatched, _ = compare(
+            reference.predict([path], 0.25)[0], candidate.predict([path], 0.25)[0],
+            iou_threshold=0.9, conf_tolerance=0.02
+        )
+        if unmatched:
+            mismatched.append(path)
+    assert not mismatched
@@ -0,0 +1,77 @@
+import numpy as np
+
+from model.tiling import make_tiles, merge_tile_outputs
+
+
+def empty_output():
+    return np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=np.int64)
+
+
+def test_small_image_is_one_tile():
+    np.testing.assert_array_equal(make_tiles(300, 500, tile_size=640), [[0, 0, 500, 300]])
+
+
+def test_tiles_cover_every_pixel():
+    height, width = 1000, 1500
+    tiles = make_tiles(height, width, tile_size=640, overlap=0.2)
+
+    covered = np.zeros((height, width), dtype=bool)
+    for x1, y1, x2, y2 in tiles:
+        covered[y1:y2, x1:x2] = True
+    assert covered.all()
+    assert (tiles[:, 2] - tiles[:, 0] == 640).all() and (tiles[:, 3] - tiles[:, 1] == 640).all()
+
+
+def test_edge_tiles_end_at_the_image_border():
+    tiles = make_tiles(700, 1000, tile_size=640, overlap=0.25)
+
+    # Stride 480: columns at 0 and 360 (aligned right), rows at 0 and 60 (aligned bottom)
+    np.testing.assert_array_equal(np.unique(tiles[:, 0]), [0, 360])
+    np.testing.assert_array_equal(np.unique(tiles[:, 1]), [0, 60])
+    assert tiles[:, 2].max() == 1000 and tiles[:, 3].max() == 700
+    assert len(tiles) == 4
+
+
+def test_merge_shifts_boxes_by_tile_origin():
+    outputs = [
+        (np.array([[10, 20, 30, 40]]), np.array([0.9]), np.array([1])),
+        empty_output(),
+        (np.array([[0, 0, 5, 5]]), np.array([0.8]), np.array([0]))
+    ]
+    offsets = [[0, 0], [512, 0], [100, 200]]
+    boxes, scores, class_ids = merge_tile_outputs(outputs, offsets)
+
+    np.testing.assert_allclose(boxes, [[10, 20, 30, 40], [100, 200, 105, 205]])
+    np.testing.assert_allclose(scores, [0.9, 0.8])
+    np.testing.assert_array_equal(class_ids, [1, 0])
+
+
+def test_merge_suppresses_fragments_across_a_tile_border():
+    # Tiles at x=0 and x=480 overlap on 480..640. An object at 600..700 is
+    # cut off at the left tile's edge, which only sees 600..640; the right
+    # tile sees all of it (120..220 in its own coordinates). The IoU of the
+    # two boxes is 0.4, so only intersection over the smaller box drops it.
+    outputs = [
+        (np.array([[600, 100, 640, 200]]), np.array([0.6]), np.array([2])),
+        (np.array([[120, 100, 220, 200]]), np.array([0.9]), np.array([2]))
+    ]
+    boxes, scores, class_ids = merge_tile_outputs(outputs, [[0, 0], [480, 0]], iou_threshold=0.5)
+
+    np.testing.assert_allclose(boxes, [[600, 100, 700, 200]])
+    np.testing.assert_allclose(scores, [0.9])
+    np.testing.assert_array_equal(class_ids, [2])
+
+
+def test_merge_keeps_fragments_of_other_classes():
+    outputs = [
+        (np.array([[600, 100, 640, 200]]), np.array([0.6]), np.array([3])),
+        (np.array([[120, 100, 220, 200]]), np.array([0.9]), np.array([2]))
+    ]
+    boxes, _, class_ids = merge_tile_outputs(outputs, [[0, 0], [480, 0]], iou_threshold=0.5)
+    assert len(boxes) == 2
+    np.testing.assert_array_equal(class_ids, [2, 3])
+
+
+def test_merge_without_detections():
+    boxes, scores, class_ids = merge_tile_outputs([empty_output(), empty_output()], [[0, 0], [480, 0]])
+    assert boxes.shape == (0, 4) and scores.shape == (0,) and class_ids.shape == (0,)
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { 
   AppBar, Toolbar, Typography, Container, Box, Paper, Button, 
   Card, CardContent, CardMedia, List, ListItem, ListItemText,
-  Divider, Chip, CircularProgress, Grid, Tab, Tabs
+  Divider, Chip, CircularProgress, Grid, Tab, Tabs, TextField, MenuItem
 } from '@mui/material';
 import { styled } from '@mui/material/styles';
 import CloudUploadIcon from '@mui/icons-material/CloudUpload';
@@ -99,6 +99,20 @@ const ImageUpload = ({ onImageUpload, loading }) => (
   </UploadCard>
 );
 
+// Compact responses list each suggestion block once and detections refer to
+// it by keyword; copy the lists back onto the detections for display
+const expandSuggestions = (data) => {
+  const { recycling = {}, reuse = {} } = data.suggestions || {};
+  return {
+    ...data,
+    detections: (data.detections || []).map((item) => ({
+      ...item,
+      recycling_suggestions: item.recycling ? recycling[item.recycling] || [] : [],
+      reuse_ideas: item.reuse ? reuse[item.reuse] || [] : []
+    }))
+  };
+};
+
 const ResultsView = ({ results }) => {
   if (!results) return null;
   
@@ -309,6 +323,137 @@ const ResultsView = ({ results }) => {
   );
 };
 
+// Date as YYYY-MM-DD in the browser's time zone
+const toDateInput = (date) => {
+  const local = new Date(date.getTime() - date.getTimezoneOffset() * 60000);
+  return local.toISOString().slice(0, 10);
+};
+
+const StatsHistory = () => {
+  const [range, setRange] = useState(() => {
+    const end = new Date();
+    const start = new Date(end.getTime() - 6 * 86400000);
+    return { start: toDateInput(start), end: toDateInput(end) };
+  });
+  const [bucket, setBucket] = useState('day');
+  const [history, setHistory] = useState(null);
+  const [error, setError] = useState(null);
+
+  // Reload whenever the range or bucket size changes, ignoring stale responses
+  useEffect(() => {
+    let cancelled = false;
+    const params = new URLSearchParams({
+      start: range.start,
+      end: range.end,
+      bucket,
+      utc_offset: -new Date().getTimezoneOffset()
+    });
+
+    fetch(`http://localhost:5000/api/stats/history?${params}`)
+      .then((response) => {
+        if (!response.ok) {
+          throw new Error(`Error: ${response.status} ${response.statusText}`);
+        }
+        return response.json();
+      })
+      .then((data) => {
+        if (!cancelled) {
+          setHistory(data);
+          setError(null);
+        }
+      })
+      .catch((err) => {
+        if (!cancelled) {
+          setError(err.message);
+        }
+      });
+
+    return () => {
+      cancelled = true;
+    };
+  }, [range, bucket]);
+
+  const formatBucket = (start) => {
+    const date = new Date(start * 1000);
+    return bucket === 'day'
+      ? date.toLocaleDateString()
+      : date.toLocaleString([], { month: 'short', day: 'numeric', hour: '2-digit', minute: '2-digit' });
+  };
+
+  const maxDetections = history ? Math.max(1, ...history.buckets.map((entry) => entry.detections)) : 1;
+
+  return (
+    <Paper sx={{ p: 3, mb: 4 }}>
+      <Box sx={{ display: 'flex', flexWrap: 'wrap', gap: 2, mb: 3 }}>
+        <TextField
+          label="From"
+          type="date"
+          size="small"
+          value={range.start}
+          onChange={(e) => setRange({ ...range, start: e.target.value })}
+          InputLabelProps={{ shrink: true }}
+        />
+        <TextField
+          label="To"
+          type="date"
+          size="small"
+          value={range.end}
+          onChange={(e) => setRange({ ...range, end: e.target.value })}
+          InputLabelProps={{ shrink: true }}
+        />
+        <TextField
+          select
+          label="Group by"
+          size="small"
+          value={bucket}
+          onChange={(e) => setBucket(e.target.value)}
+          sx={{ minWidth: 120 }}
+        >
+          <MenuItem value="day">Day</MenuItem>
+          <MenuItem value="hour">Hour</MenuItem>
+        </TextField>
+      </Box>
+
+      {error && (
+        <Typography variant="body2" color="error">{error}</Typography>
+      )}
+
+      {!history && !error && (
+        <Box sx={{ display: 'flex', justifyContent: 'center', my: 2 }}>
+          <CircularProgress size={24} />
+        </Box>
+      )}
+
+      {history && history.buckets.length === 0 && (
+        <Typography variant="body2" color="text.secondary">No detections in this period.</Typography>
+      )}
+
+      {history && history.buckets.length > 0 && (
+        <>
+          <Typography variant="body2" color="text.secondary" paragraph>
+            {history.total_images} images, {history.total_detections} items detected
+          </Typography>
+          {history.buckets.map((entry) => (
+            <Box key={entry.start} sx={{ mb: 1.5 }}>
+              <Box sx={{ display: 'flex', justifyContent: 'space-between' }}>
+                <Typography variant="body2">{formatBucket(entry.start)}</Typography>
+                <Typography variant="body2" color="primary">
+                  {entry.detections} items / {entry.images} images
+                </Typography>
+              </Box>
+              <LinearProgress
+                variant="determinate"
+                value={(entry.detections / maxDetections) * 100}
+                sx={{ height: 8, borderRadius: 4, my: 0.5 }}
+              />
+            </Box>
+          ))}
+        </>
+      )}
+    </Paper>
+  );
+};
+
 const StatsView = ({ stats }) => {
   if (!stats) {
     return (
@@ -405,6 +550,11 @@ const StatsView = ({ stats }) => {
         </Grid>
       </Paper>
 
+      <Typography variant="h5" component="h3" gutterBottom sx={{ mt: 5 }}>
+        Detection History
+      </Typography>
+      <StatsHistory />
+
       <Typography variant="h5" component="h3" gutterBottom sx={{ mt: 5 }}>
         Environmental Impact Estimation
       </Typography>
@@ -529,7 +679,7 @@ function App() {
     formData.append('file', file);
 
     try {
-      const response = await fetch('http://localhost:5000/api/detect', {
+      const response = await fetch('http://localhost:5000/api/detect?compact=1', {
         method: 'POST',
         body: formData
       });
@@ -538,7 +688,7 @@ function App() {
         throw new Error(`Error: ${response.status} ${response.statusText}`);
       }
       
-      const data = await response.json();
+      const data = expandSuggestions(await response.json());
       console.log("Detection results:", data);
       setResults(data);
       
@@ -0,0 +1,93 @@
+import os
+import sys
+import argparse
+import tempfile
+
+from common import REPO_ROOT, BACKEND_DIR, write_stub_model, make_test_image, time_call, rss_bytes, write_report
+
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts', 'data'))
+
+from model.model import EwasteDetector, decode_image, decode_reduced
+from suggestions import SuggestionIndex
+from prepare_dataset import convert_annotation_to_yolo
+
+def setup_args():
+    parser = argparse.ArgumentParser(description='Micro-benchmarks for the detection pipeline building blocks')
+    parser.add_argument('--weights', type=str, default=None,
+                        help='Model weights (.pt, .onnx or a .json stub); a stub model is generated when omitted')
+    parser.add_argument('--stub-latency-ms', type=float, default=20, help='Simulated inference time of the generated stub')
+    parser.add_argument('--width', type=int, default=1280, help='Test image width')
+    parser.add_argument('--height', type=int, default=960, help='Test image height')
+    parser.add_argument('--iterations', type=int, default=50, help='Timed calls per benchmark')
+    parser.add_argument('--output', type=str, default=None, help='Optional path for a JSON report')
+    return parser.parse_args()
+
+def make_annotations(count=20):
+    """Dataset-style annotations with a mix of known and unknown classes"""
+    classes = ['battery', 'circuit board', 'mobile', 'charger', 'laptop', 'unknown thing']
+    return [{
+        'x': 10 * i, 'y': 5 * i, 'width': 50 + i, 'height': 40 + i,
+        'class': classes[i % len(classes)]
+    } for i in range(count)]
+
+def main():
+    args = setup_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        weights = args.weights or write_stub_model(
+            os.path.join(tmp, 'stub.json'), latency_ms=args.stub_latency_ms
+        )
+        rss_before = rss_bytes()
+        detector = EwasteDetector(model_path=weights, allow_download=False)
+        model_rss = rss_bytes()
+
+        image, jpeg = make_test_image(args.width, args.height)
+        detections = detector.detect(image)
+
+        index = SuggestionIndex.load(os.path.join(BACKEND_DIR, 'data', 'suggestions.json'))
+        index.prime(detector.class_names())
+        many = detections * 10 or [{'class': 'battery', 'confidence': 0.5, 'bbox': [0, 0, 10, 10]}] * 30
+
+        annotations = make_annotations()
+        class_mapping = {'battery': 0, 'circuit_board': 1, 'mobile': 2, 'charger': 3, 'laptop': 4}
+
+        # Silence the unknown-class warnings convert_annotation_to_yolo prints
+        def convert():
+            stdout = sys.stdout
+            sys.stdout = open(os.devnull, 'w')
+            try:
+                convert_annotation_to_yolo(annotations, args.width, args.height, class_mapping)
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+
+        benchmarks = [
+            ('decode', lambda: decode_image(jpeg)),
+            ('decode_reduced', lambda: decode_reduced(jpeg, detector.input_size())),
+            ('detect', lambda: detector.detect(image)),
+            ('draw_boxes', lambda: detector.draw_boxes(image, None, detections)),
+            ('convert_annotation_to_yolo', convert),
+            ('suggestions_full', lambda: index.annotate(many)),
+            ('suggestions_compact', lambda: index.annotate(many, compact=True))
+        ]
+
+        results = {}
+        for name, fn in benchmarks:
+            results[name] = time_call(fn, args.iterations)
+            print(f"{name:<28}{results[name]['mean_ms']:>10.3f} ms mean{results[name]['p99_ms']:>10.3f} ms p99")
+
+        results['memory'] = {
+            'model_rss_bytes': model_rss - rss_before if rss_before is not None and model_rss is not None else None,
+            'rss_bytes': rss_bytes()
+        }
+
+    if args.output:
+        write_report(args.output, 'micro', results, {
+            'weights': args.weights or f'stub ({args.stub_latency_ms} ms)',
+            'image_size': [args.width, args.height],
+            'iterations': args.iterations,
+            'detections_per_image': len(detections)
+        })
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import math
+import time
+import platform
+import subprocess
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+BACKEND_DIR = os.path.join(REPO_ROOT, 'backend')
+
+# Make the backend modules importable
+sys.path.insert(0, BACKEND_DIR)
+
+def write_stub_model(path, latency_ms=20, per_image_ms=2, boxes=3, names=None):
+    """
+    Write a stub model description that the backend serves like real weights
+
+    Args:
+        path: Output .json file
+        latency_ms: Simulated time per predict call
+        per_image_ms: Additional simulated time per image in a batch
+        boxes: Detections returned for every image
+        names: Class names by id (defaults to a few e-waste classes)
+
+    Returns:
+        The path
+    """
+    names = names or {0: 'battery', 1: 'mobile', 2: 'charger', 3: 'circuit board'}
+    with open(path, 'w') as f:
+        json.dump({
+            'latency_ms': latency_ms,
+            'per_image_ms': per_image_ms,
+            'boxes': boxes,
+            'names': {str(k): v for k, v in names.items()}
+        }, f, indent=2)
+    return path
+
+def make_test_image(width=1280, height=960, seed=0):
+    """
+    JPEG-encoded synthetic photo with some structure, so it compresses and
+    decodes like a real upload rather than a flat color
+
+    Returns:
+        Tuple of (decoded BGR array, JPEG bytes)
+    """
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), 90, dtype=np.uint8)
+    for _ in range(40):
+        x1, y1 = int(rng.integers(0, width)), int(rng.integers(0, height))
+        x2, y2 = x1 + int(rng.integers(20, width // 4)), y1 + int(rng.integers(20, height // 4))
+        color = tuple(int(c) for c in rng.integers(0, 255, size=3))
+        cv2.rectangle(image, (x1, y1), (x2, y2), color, -1)
+    noise = rng.integers(0, 24, size=image.shape, dtype=np.uint8)
+    image = cv2.add(image, noise)
+    ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    if not ok:
+        raise RuntimeError("Could not encode test image")
+    return image, encoded.tobytes()
+
+def rss_bytes(pid=None):
+    """Resident memory of a process (this one by default), or None where /proc is unavailable"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def percentiles(samples, points=(50, 90, 99)):
+    """Nearest-rank percentiles of a list of seconds, in milliseconds"""
+    if not samples:
+        return {f"p{p}_ms": None for p in points}
+    ordered = sorted(samples)
+    result = {}
+    for p in points:
+        index = min(len(ordered) - 1, max(0, math.ceil(p / 100.0 * len(ordered)) - 1))
+        result[f"p{p}_ms"] = ordered[index] * 1000
+    return result
+
+def time_call(fn, iterations, warmup=2):
+    """
+    Time repeated calls of fn
+
+    Returns:
+        Dict with the iteration count, mean and percentile latencies in ms
+        and calls per second
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    total = sum(samples)
+    result = {
+        'iterations': iterations,
+        'mean_ms': total / iterations * 1000,
+        'per_second': iterations / total if total else None
+    }
+    result.update(percentiles(samples))
+    return result
+
+def environment():
+    """Details of the machine and code under test, stored with every report"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count()
+    }
+
+def write_report(path, kind, results, settings):
+    """Save a benchmark report as JSON"""
+    report = {'kind': kind, 'environment': environment(), 'settings': settings, 'results': results}
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {path}")
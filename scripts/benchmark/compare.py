@@ -0,0 +1,66 @@
+import sys
+import json
+import argparse
+
+def setup_args():
+    parser = argparse.ArgumentParser(description='Compare two benchmark reports and flag regressions')
+    parser.add_argument('baseline', type=str, help='Report from the reference commit')
+    parser.add_argument('candidate', type=str, help='Report from the commit under test')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative change counted as a regression (default: 0.10 = 10%%)')
+    return parser.parse_args()
+
+def metrics(report):
+    """
+    Flatten a report into comparable numbers
+
+    Returns:
+        Dict of metric name -> (value, True when higher is better)
+    """
+    results = report['results']
+    values = {}
+    if report['kind'] == 'micro':
+        for name, result in results.items():
+            if 'mean_ms' in result:
+                values[f"{name} mean_ms"] = (result['mean_ms'], False)
+                values[f"{name} p99_ms"] = (result['p99_ms'], False)
+    else:
+        for level in results['levels']:
+            prefix = f"c={level['concurrency']}"
+            values[f"{prefix} req/s"] = (level['requests_per_second'], True)
+            values[f"{prefix} p50_ms"] = (level['p50_ms'], False)
+            values[f"{prefix} p99_ms"] = (level['p99_ms'], False)
+            values[f"{prefix} rss_mb"] = (
+                level['server_rss_bytes'] / 2 ** 20 if level.get('server_rss_bytes') else None, False
+            )
+    return values
+
+def main():
+    args = setup_args()
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    if baseline['kind'] != candidate['kind']:
+        print(f"Error: Cannot compare a {baseline['kind']} report with a {candidate['kind']} report", file=sys.stderr)
+        sys.exit(2)
+
+    print(f"baseline {baseline['environment'].get('commit')} vs candidate {candidate['environment'].get('commit')}")
+    before, after = metrics(baseline), metrics(candidate)
+    regressions = 0
+    for name, (old, higher_is_better) in before.items():
+        new = after.get(name, (None, higher_is_better))[0]
+        if old is None or new is None or old == 0:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        flag = 'REGRESSION' if worse > args.threshold else ''
+        regressions += bool(flag)
+        print(f"{name:<36}{old:>12.2f}{new:>12.2f}{change * 100:>+9.1f}%  {flag}")
+
+    if regressions:
+        print(f"{regressions} metric(s) regressed by more than {args.threshold * 100:.0f}%")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
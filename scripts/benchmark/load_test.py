@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.request
+import urllib.error
+from collections import Counter
+
+from common import BACKEND_DIR, write_stub_model, make_test_image, rss_bytes, percentiles, write_report
+
+def setup_args():
+    parser = argparse.ArgumentParser(description='Load test /api/detect at fixed concurrency levels')
+    parser.add_argument('--url', type=str, default=None,
+                        help='Base URL of a running server; a local server is started when omitted')
+    parser.add_argument('--server-pid', type=int, default=None, help='PID of the running server, for RSS readings')
+    parser.add_argument('--weights', type=str, default=None,
+                        help='Weights for the started server; a stub model is generated when omitted')
+    parser.add_argument('--stub-latency-ms', type=float, default=20, help='Simulated inference time of the generated stub')
+    parser.add_argument('--port', type=int, default=5055, help='Port for the started server')
+    parser.add_argument('--env', type=str, nargs='*', default=[],
+                        help='Extra KEY=VALUE settings for the started server')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16], help='Concurrent clients per level')
+    parser.add_argument('--duration', type=float, default=15, help='Seconds to run each level')
+    parser.add_argument('--images', type=int, default=16,
+                        help='Distinct test images to cycle through (repeats may be served from the result cache)')
+    parser.add_argument('--width', type=int, default=1280, help='Test image width')
+    parser.add_argument('--height', type=int, default=960, help='Test image height')
+    parser.add_argument('--query', type=str, default='', help='Query string for /api/detect, e.g. annotate=0')
+    parser.add_argument('--output', type=str, default=None, help='Optional path for a JSON report')
+    return parser.parse_args()
+
+def encode_multipart(filename, data):
+    """Multipart form body with a single file field"""
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f"Content-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+def start_server(args, weights):
+    """Start the backend in a subprocess and wait until it reports ready"""
+    env = dict(os.environ)
+    env.update({
+        'MODEL_PATH': weights,
+        'ALLOW_MODEL_DOWNLOAD': '0',
+        'STATS_DB': '',
+        'FLASK_APP': 'app.py'
+    })
+    for setting in args.env:
+        key, _, value = setting.partition('=')
+        env[key] = value
+
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'flask', 'run', '--port', str(args.port), '--with-threads'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{args.port}"
+    deadline = time.time() + 300
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"{url}/api/ready", timeout=2) as response:
+                if response.status == 200:
+                    return process, url
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("Server did not become ready within 300 seconds")
+
+def run_level(url, bodies, concurrency, duration):
+    """
+    Keep `concurrency` clients posting images for `duration` seconds
+
+    Returns:
+        Dict with request counts by status, successful requests per second and
+        latency percentiles of the successful requests
+    """
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(offset):
+        i = offset
+        while time.perf_counter() < stop_at:
+            body, content_type = bodies[i % len(bodies)]
+            i += concurrency
+            request = urllib.request.Request(url, data=body, headers={'Content-Type': content_type})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=60) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except (urllib.error.URLError, OSError):
+                status = 'error'
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses[str(status)] += 1
+                if status == 200:
+                    latencies.append(elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = {
+        'concurrency': concurrency,
+        'requests': sum(statuses.values()),
+        'statuses': dict(statuses),
+        'requests_per_second': len(latencies) / elapsed if elapsed else 0,
+        'mean_ms': sum(latencies) / len(latencies) * 1000 if latencies else None
+    }
+    result.update(percentiles(latencies))
+    return result
+
+def main():
+    args = setup_args()
+
+    bodies = [encode_multipart(f"bench_{i}.jpg", make_test_image(args.width, args.height, seed=i)[1])
+              for i in range(args.images)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        process = None
+        if args.url:
+            url, server_pid = args.url.rstrip('/'), args.server_pid
+        else:
+            weights = args.weights or write_stub_model(os.path.join(tmp, 'stub.json'), latency_ms=args.stub_latency_ms)
+            process, url = start_server(args, os.path.abspath(weights))
+            server_pid = process.pid
+        detect_url = f"{url}/api/detect" + (f"?{args.query}" if args.query else '')
+
+        try:
+            results = []
+            for concurrency in args.concurrency:
+                result = run_level(detect_url, bodies, concurrency, args.duration)
+                result['server_rss_bytes'] = rss_bytes(server_pid) if server_pid else None
+                results.append(result)
+                p50 = f"{result['p50_ms']:.1f}" if result['p50_ms'] is not None else 'n/a'
+                p99 = f"{result['p99_ms']:.1f}" if result['p99_ms'] is not None else 'n/a'
+                print(f"concurrency {concurrency:>3}: {result['requests_per_second']:8.1f} req/s  "
+                      f"p50 {p50} ms  p99 {p99} ms  statuses {result['statuses']}")
+
+            try:
+                with urllib.request.urlopen(f"{url}/api/stats", timeout=10) as response:
+                    server_stats = json.loads(response.read())
+            except (urllib.error.URLError, OSError, ValueError):
+                server_stats = None
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+
+    if args.output:
+        write_report(args.output, 'load', {'levels': results, 'server_stats': server_stats}, {
+            'url': args.url or f'local ({args.weights or f"stub {args.stub_latency_ms} ms"})',
+            'duration': args.duration,
+            'images': args.images,
+            'image_size': [args.width, args.height],
+            'query': args.query,
+            'env': args.env
+        })
+
+if __name__ == '__main__':
+    main()
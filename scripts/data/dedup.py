@@ -0,0 +1,122 @@
+import numpy as np
+from PIL import Image
+
+# Side of the grayscale thumbnail the hashes are computed from
+HASH_INPUT = {'dct': 32, 'average': 8}
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis as an n x n matrix"""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    matrix = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * x + 1) * k / (2 * n))
+    matrix[0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+_DCT = _dct_matrix(HASH_INPUT['dct'])
+
+# Set bits per byte value, for vectorized popcounts
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def load_thumbnail(img_path, size):
+    """Grayscale size x size thumbnail; JPEGs are decoded at reduced scale"""
+    with Image.open(img_path) as img:
+        # Lets the JPEG decoder skip most of the work for a tiny target
+        img.draft('L', (size * 4, size * 4))
+        img = img.convert('L').resize((size, size), Image.BILINEAR)
+        return np.asarray(img, dtype=np.float32)
+
+def _pack_bits(bits):
+    """Pack an (n, 64) boolean array into n uint64 values"""
+    return np.packbits(bits, axis=1).view('>u8').astype(np.uint64).reshape(-1)
+
+def compute_hashes(img_paths, method='dct'):
+    """
+    64-bit perceptual hashes for a list of images
+
+    The thumbnails of all readable images are stacked and hashed in one
+    vectorized pass. 'dct' compares the 8x8 lowest frequencies of a 32x32
+    DCT against their median, and 'average' compares an 8x8 thumbnail
+    against its mean.
+
+    Returns:
+        List with a hash as an int, or None for unreadable images
+    """
+    size = HASH_INPUT[method]
+    thumbnails = []
+    readable = []
+    for i, img_path in enumerate(img_paths):
+        try:
+            thumbnails.append(load_thumbnail(img_path, size))
+            readable.append(i)
+        except Exception:
+            continue
+
+    hashes = [None] * len(img_paths)
+    if not thumbnails:
+        return hashes
+
+    stack = np.stack(thumbnails)
+    if method == 'dct':
+        coefficients = (_DCT @ stack @ _DCT.T)[:, :8, :8].reshape(len(stack), 64)
+        # The DC term only reflects overall brightness, so it is left out of the median
+        median = np.median(coefficients[:, 1:], axis=1, keepdims=True)
+        bits = coefficients > median
+    else:
+        flat = stack.reshape(len(stack), 64)
+        bits = flat > flat.mean(axis=1, keepdims=True)
+
+    for i, value in zip(readable, _pack_bits(bits)):
+        hashes[i] = int(value)
+    return hashes
+
+def hamming_distances(hash_value, hashes):
+    """Bit differences between one hash and an array of hashes"""
+    xor = np.bitwise_xor(hashes, np.uint64(hash_value))
+    return _POPCOUNT[xor.view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+def find_groups(hashes, threshold):
+    """
+    Group images whose hashes differ in at most `threshold` bits
+
+    Two hashes within the threshold agree exactly on at least one of
+    threshold + 1 disjoint bit bands, so only images sharing a band value
+    are compared, instead of every pair. Groups are closed transitively.
+
+    Args:
+        hashes: uint64 array of hashes
+        threshold: Largest Hamming distance counted as a near-duplicate
+
+    Returns:
+        Array with the group label of each hash (the index of one member)
+    """
+    count = len(hashes)
+    parent = np.arange(count)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    bands = threshold + 1
+    edges = np.linspace(0, 64, bands + 1).astype(int)
+    for start, end in zip(edges[:-1], edges[1:]):
+        width = end - start
+        if width == 0:
+            continue
+        keys = (hashes >> np.uint64(start)) & np.uint64((1 << width) - 1)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        boundaries = np.flatnonzero(np.diff(sorted_keys)) + 1
+        for bucket in np.split(order, boundaries):
+            if len(bucket) < 2:
+                continue
+            # Compare every member of the bucket with the members after it
+            for position, i in enumerate(bucket[:-1]):
+                others = bucket[position + 1:]
+                for j in others[hamming_distances(hashes[i], hashes[others]) <= threshold]:
+                    root_i, root_j = find(i), find(j)
+                    if root_i != root_j:
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    return np.array([find(i) for i in range(count)])
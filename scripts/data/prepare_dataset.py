@@ -1,19 +1,52 @@
 import os
+import time
 import shutil
+import struct
+import hashlib
 import argparse
-import random
 import json
 import glob
-from pathlib import Path
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
 import numpy as np
 
+from dedup import compute_hashes, find_groups
+
+# Bumped when the output format changes so existing manifests are rebuilt
+MANIFEST_VERSION = 2
+MANIFEST_NAME = '.manifest.json'
+
+# Define class mapping
+CLASS_MAPPING = {
+    'battery': 0,
+    'circuit_board': 1,
+    'mobile': 2,
+    'charger': 3,
+    'adapter': 4,
+    'laptop': 5,
+    'keyboard': 6,
+    'mouse': 7
+}
+
 def setup_args():
     parser = argparse.ArgumentParser(description='Prepare e-waste dataset for YOLOv8 training')
     parser.add_argument('--input-dir', type=str, required=True, help='Path to Kaggle e-waste dataset')
     parser.add_argument('--output-dir', type=str, default='datasets/ewaste', help='Output directory')
     parser.add_argument('--split', type=str, default='70,20,10', help='Train/val/test split percentages')
     parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+    parser.add_argument('--chunk-size', type=int, default=256, help='Images handed to a worker at a time')
+    parser.add_argument('--link', type=str, default='auto', choices=['auto', 'hardlink', 'reflink', 'symlink', 'copy'],
+                        help='How images are placed in the output: auto tries a hardlink, then a reflink, then copies')
+    parser.add_argument('--force', action='store_true', help='Reprocess every image instead of only new or changed ones')
+    parser.add_argument('--no-dedup', action='store_true', help='Do not group near-duplicate images')
+    parser.add_argument('--hash', type=str, default='dct', choices=['dct', 'average'],
+                        help='Perceptual hash used to find near-duplicates')
+    parser.add_argument('--dedup-threshold', type=int, default=4,
+                        help='Largest number of differing hash bits (of 64) for two images to count as near-duplicates')
+    parser.add_argument('--max-per-group', type=int, default=0,
+                        help='Keep at most this many images of each near-duplicate group (0 keeps all)')
     return parser.parse_args()
 
 def create_folders(output_dir):
@@ -29,16 +62,18 @@ def create_folders(output_dir):
     
     for folder in folders:
         os.makedirs(folder, exist_ok=True)
-        print(f"Created directory: {folder}")
     
     return output_dir
 
-def convert_annotation_to_yolo(annotation, img_width, img_height, class_mapping):
+def convert_annotation_to_yolo(annotation, img_width, img_height, class_mapping, unknown_classes=None):
     """
     Convert annotation to YOLO format
     
     YOLO format: <class> <x_center> <y_center> <width> <height>
     All values are normalized to [0, 1]
+    
+    Unknown classes are skipped; they are counted in unknown_classes (a
+    Counter) when given, and reported with a warning otherwise.
     """
     yolo_annotations = []
     
@@ -52,7 +87,10 @@ def convert_annotation_to_yolo(annotation, img_width, img_height, class_mapping)
         
         # Check if class exists in mapping
         if class_name not in class_mapping:
-            print(f"Warning: Class '{class_name}' not found in mapping. Skipping.")
+            if unknown_classes is not None:
+                unknown_classes[class_name] += 1
+            else:
+                print(f"Warning: Class '{class_name}' not found in mapping. Skipping.")
             continue
         
         class_id = class_mapping[class_name]
@@ -74,30 +112,258 @@ def convert_annotation_to_yolo(annotation, img_width, img_height, class_mapping)
     
     return yolo_annotations
 
+def read_image_size(img_path):
+    """
+    Image width and height from the file header, without decoding pixels
+    
+    PNG and JPEG headers are parsed directly, reading a few hundred bytes at
+    most; other formats fall back to PIL.
+    """
+    with open(img_path, 'rb') as f:
+        head = f.read(26)
+        
+        # PNG: the IHDR chunk is always first
+        if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+            width, height = struct.unpack('>II', head[16:24])
+            return width, height
+        
+        # JPEG: walk the marker segments up to the start-of-frame
+        if head[:2] == b'\xff\xd8':
+            f.seek(2)
+            while True:
+                marker = f.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    break
+                code = marker[1]
+                if code == 0xFF:
+                    # Fill byte; the marker code follows
+                    f.seek(-1, os.SEEK_CUR)
+                    continue
+                if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+                    continue
+                length_bytes = f.read(2)
+                if len(length_bytes) < 2:
+                    break
+                length = struct.unpack('>H', length_bytes)[0]
+                if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+                    height, width = struct.unpack('>xHH', f.read(5))
+                    return width, height
+                f.seek(length - 2, os.SEEK_CUR)
+    
+    with Image.open(img_path) as img:
+        return img.size
+
+def place_file(src, dst, mode='auto'):
+    """
+    Make src available at dst without copying its data where possible
+    
+    Args:
+        src: Source image
+        dst: Output path (replaced if it exists)
+        mode: 'hardlink', 'reflink', 'symlink', 'copy', or 'auto' to try a
+            hardlink, then a reflink, then fall back to copying
+    
+    Returns:
+        The method that was used
+    """
+    if os.path.lexists(dst):
+        os.remove(dst)
+    
+    if mode in ('auto', 'hardlink'):
+        try:
+            os.link(src, dst)
+            return 'hardlink'
+        except OSError:
+            if mode == 'hardlink':
+                raise
+    
+    if mode in ('auto', 'reflink'):
+        try:
+            import fcntl
+            # FICLONE: share the source's extents on copy-on-write filesystems
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), 0x40049409, fsrc.fileno())
+            return 'reflink'
+        except (ImportError, OSError):
+            if os.path.exists(dst):
+                os.remove(dst)
+            if mode == 'reflink':
+                raise
+    
+    if mode == 'symlink':
+        os.symlink(os.path.abspath(src), dst)
+        return 'symlink'
+    
+    shutil.copyfile(src, dst)
+    return 'copy'
+
+def assign_split(rel_path, split, seed):
+    """
+    Split for an image, derived from a hash of its path
+    
+    Unlike shuffling the file list, adding or removing images never moves
+    the other images to a different split, so reruns stay incremental.
+    """
+    digest = hashlib.md5(f"{seed}:{rel_path}".encode('utf-8')).digest()
+    position = int.from_bytes(digest[:8], 'big') / 2 ** 64
+    if position < split[0]:
+        return 'train'
+    if position < split[0] + split[1]:
+        return 'val'
+    return 'test'
+
+def output_stem(rel_path):
+    """
+    Output file name, without extension, for an input image
+    
+    Images in different input folders may share a file name, so a short hash
+    of the relative path keeps their outputs apart.
+    """
+    stem = os.path.splitext(os.path.basename(rel_path))[0]
+    digest = hashlib.md5(rel_path.replace(os.sep, '/').encode('utf-8')).hexdigest()[:8]
+    return f"{stem}_{digest}"
+
+def claim_outputs(claimed, rel_path, outputs):
+    """
+    Record the files an image is written to, refusing paths already taken
+    
+    Paths are compared case-insensitively, as they would collide on
+    case-insensitive file systems.
+    
+    Raises:
+        ValueError: If another image is written to one of the same files
+    """
+    for path in outputs:
+        owner = claimed.setdefault(path.lower(), rel_path)
+        if owner != rel_path:
+            raise ValueError(f"{rel_path} and {owner} would both be written to {path}")
+
+def source_signature(img_path, json_path):
+    """Sizes and modification times of an image and its annotation"""
+    img_stat = os.stat(img_path)
+    try:
+        json_stat = os.stat(json_path)
+        annotation = [json_stat.st_size, json_stat.st_mtime_ns]
+    except OSError:
+        annotation = None
+    return [img_stat.st_size, img_stat.st_mtime_ns, annotation]
+
+def process_image(task, class_mapping, link_mode):
+    """
+    Convert one image's annotation and place the image in the output
+    
+    Returns:
+        Tuple of (status, link method or None, Counter of unknown classes);
+        status is 'ok' or the reason the image was skipped
+    """
+    img_path, json_path, out_img_path, out_label_path = task
+    unknown_classes = Counter()
+    
+    # Check for corresponding annotation file
+    if not os.path.exists(json_path):
+        return 'missing_annotation', None, unknown_classes
+    
+    # Read annotation
+    with open(json_path, 'r') as f:
+        try:
+            annotation = json.load(f)
+        except json.JSONDecodeError:
+            return 'invalid_annotation', None, unknown_classes
+    
+    # Get image dimensions
+    try:
+        img_width, img_height = read_image_size(img_path)
+    except Exception:
+        return 'unreadable_image', None, unknown_classes
+    
+    # Convert annotations to YOLO format
+    yolo_annotations = convert_annotation_to_yolo(
+        annotation, img_width, img_height, class_mapping, unknown_classes
+    )
+    
+    if not yolo_annotations:
+        return 'no_valid_annotations', None, unknown_classes
+    
+    method = place_file(img_path, out_img_path, link_mode)
+    
+    # Write YOLO annotation
+    with open(out_label_path, 'w') as f:
+        f.write('\n'.join(yolo_annotations))
+    
+    return 'ok', method, unknown_classes
+
+def hash_chunk(img_paths, method):
+    """Perceptual hashes for a list of images in a worker"""
+    return compute_hashes(img_paths, method)
+
+def process_chunk(tasks, class_mapping, link_mode):
+    """Process a list of images in a worker; returns the results in order"""
+    return [process_image(task, class_mapping, link_mode) for task in tasks]
+
+def remove_outputs(output_dir, record):
+    """Delete the files written for a manifest record"""
+    for path in record.get('outputs', []):
+        try:
+            os.remove(os.path.join(output_dir, path))
+        except OSError:
+            pass
+
+def load_manifest(output_dir, config):
+    """Manifest of an earlier run with the same settings, or an empty one"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('config') != config:
+        print("Settings changed since the last run; reprocessing every image")
+        # Outputs may be named or placed differently now, so clear the old ones
+        for record in manifest.get('images', {}).values():
+            remove_outputs(output_dir, record)
+        return {}
+    return manifest.get('images', {})
+
+def save_manifest(output_dir, config, images):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump({'version': MANIFEST_VERSION, 'config': config, 'images': images}, f)
+    os.replace(temp_path, path)
+
+class Progress:
+    """Throughput and ETA line, printed at most every `interval` seconds"""
+    
+    def __init__(self, total, label='images', interval=2.0):
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.interval = interval
+        self.start = time.perf_counter()
+        self._last = 0.0
+    
+    def update(self, count):
+        self.done += count
+        now = time.perf_counter()
+        if now - self._last >= self.interval or self.done == self.total:
+            self._last = now
+            elapsed = now - self.start
+            rate = self.done / elapsed if elapsed else 0.0
+            eta = (self.total - self.done) / rate if rate else 0.0
+            print(f"\r{self.label}: {self.done}/{self.total}  {rate:.0f} img/s  ETA {eta:.0f}s", end='', flush=True)
+            if self.done == self.total:
+                print()
+
 def process_dataset(args):
     """Process Kaggle e-waste dataset for YOLOv8 training"""
     input_dir = args.input_dir
     output_dir = args.output_dir
     split = [float(x) / 100 for x in args.split.split(',')]
-    
-    # Set random seed
-    random.seed(args.seed)
+    class_mapping = CLASS_MAPPING
     
     # Create output folders
     create_folders(output_dir)
     
-    # Define class mapping
-    class_mapping = {
-        'battery': 0,
-        'circuit_board': 1,
-        'mobile': 2,
-        'charger': 3,
-        'adapter': 4,
-        'laptop': 5,
-        'keyboard': 6,
-        'mouse': 7
-    }
-    
     # List all images in dataset
     image_files = []
     for ext in ['jpg', 'jpeg', 'png']:
@@ -110,72 +376,129 @@ def process_dataset(args):
     
     print(f"Found {len(image_files)} image files")
     
-    # Shuffle and split
-    random.shuffle(image_files)
-    
-    split_indices = [
-        0,
-        int(len(image_files) * split[0]),
-        int(len(image_files) * (split[0] + split[1])),
-        len(image_files)
-    ]
-    
-    dataset_splits = {
-        'train': image_files[split_indices[0]:split_indices[1]],
-        'val': image_files[split_indices[1]:split_indices[2]],
-        'test': image_files[split_indices[2]:split_indices[3]]
-    }
+    # Reuse the results of the last run for images that have not changed
+    config = {'split': args.split, 'seed': args.seed, 'classes': class_mapping, 'link': args.link}
+    previous = {} if args.force else load_manifest(output_dir, config)
+    sources = []
+    for img_path in sorted(image_files):
+        rel_path = os.path.relpath(img_path, input_dir)
+        img_name = os.path.splitext(os.path.basename(img_path))[0]
+        json_path = os.path.join(os.path.dirname(img_path), f"{img_name}.json")
+        sources.append((rel_path, img_path, json_path, source_signature(img_path, json_path)))
     
-    # Process each split
-    for split_name, files in dataset_splits.items():
-        print(f"Processing {split_name} split ({len(files)} images)")
+    chunk_size = max(1, args.chunk_size)
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        # Perceptual hashes, computed only for new or changed images
+        hashes = {}
+        if not args.no_dedup:
+            to_hash = []
+            for rel_path, img_path, _, signature in sources:
+                record = previous.get(rel_path)
+                if record is not None and record['signature'] == signature and record.get('hash_method') == args.hash:
+                    hashes[rel_path] = record.get('hash')
+                else:
+                    to_hash.append((rel_path, img_path))
+            if to_hash:
+                progress = Progress(len(to_hash), 'hashing')
+                chunks = [to_hash[i:i + chunk_size] for i in range(0, len(to_hash), chunk_size)]
+                results = executor.map(hash_chunk, [[path for _, path in chunk] for chunk in chunks], [args.hash] * len(chunks))
+                for chunk, chunk_hashes in zip(chunks, results):
+                    for (rel_path, _), value in zip(chunk, chunk_hashes):
+                        hashes[rel_path] = format(value, '016x') if value is not None else None
+                    progress.update(len(chunk))
         
-        for img_path in files:
-            img_filename = os.path.basename(img_path)
-            img_name, img_ext = os.path.splitext(img_filename)
-            
-            # Check for corresponding annotation file
-            json_path = os.path.join(os.path.dirname(img_path), f"{img_name}.json")
-            
-            if not os.path.exists(json_path):
-                print(f"Warning: No annotation found for {img_path}. Skipping.")
-                continue
-            
-            # Read annotation
-            with open(json_path, 'r') as f:
-                try:
-                    annotation = json.load(f)
-                except json.JSONDecodeError:
-                    print(f"Warning: Could not parse annotation for {img_path}. Skipping.")
-                    continue
+        # Near-duplicates share a group, and every group lands in a single split
+        group_of = {rel_path: rel_path for rel_path, _, _, _ in sources}
+        hashed = [rel_path for rel_path, _, _, _ in sources if hashes.get(rel_path) is not None]
+        if hashed:
+            labels = find_groups(np.array([int(hashes[rel_path], 16) for rel_path in hashed], dtype=np.uint64),
+                                 args.dedup_threshold)
+            for rel_path, label in zip(hashed, labels):
+                group_of[rel_path] = hashed[label]
+        members = {}
+        for rel_path, img_path, _, signature in sources:
+            members.setdefault(group_of[rel_path], []).append((rel_path, signature[0]))
+        
+        # Optionally thin out each group, keeping its largest files
+        dropped = set()
+        if args.max_per_group > 0:
+            for group in members.values():
+                ranked = sorted(group, key=lambda member: (-member[1], member[0]))
+                dropped.update(rel_path for rel_path, _ in ranked[args.max_per_group:])
+        
+        manifest = {}
+        tasks = []
+        unchanged = 0
+        claimed = {}
+        for rel_path, img_path, json_path, signature in sources:
+            group = group_of[rel_path]
+            split_name = assign_split(group, split, args.seed)
+            duplicate = rel_path in dropped
             
-            # Get image dimensions
-            try:
-                with Image.open(img_path) as img:
-                    img_width, img_height = img.size
-            except Exception as e:
-                print(f"Warning: Could not open image {img_path}. Skipping. Error: {e}")
+            record = previous.pop(rel_path, None)
+            if (record is not None and record['signature'] == signature and record['split'] == split_name
+                    and (record.get('status') == 'duplicate') == duplicate):
+                record.update(group=group, hash=hashes.get(rel_path), hash_method=None if args.no_dedup else args.hash)
+                claim_outputs(claimed, rel_path, record.get('outputs', []))
+                manifest[rel_path] = record
+                unchanged += 1
                 continue
+            if record is not None:
+                remove_outputs(output_dir, record)
             
-            # Convert annotations to YOLO format
-            yolo_annotations = convert_annotation_to_yolo(
-                annotation, img_width, img_height, class_mapping
-            )
-            
-            if not yolo_annotations:
-                print(f"Warning: No valid annotations found for {img_path}. Skipping.")
+            manifest[rel_path] = record = {
+                'signature': signature,
+                'split': split_name,
+                'group': group,
+                'hash': hashes.get(rel_path),
+                'hash_method': None if args.no_dedup else args.hash,
+                'outputs': []
+            }
+            if duplicate:
+                record['status'] = 'duplicate'
                 continue
             
             # Define output paths
-            out_img_path = os.path.join(output_dir, split_name, 'images', img_filename)
-            out_label_path = os.path.join(output_dir, split_name, 'labels', f"{img_name}.txt")
-            
-            # Copy image
-            shutil.copy(img_path, out_img_path)
-            
-            # Write YOLO annotation
-            with open(out_label_path, 'w') as f:
-                f.write('\n'.join(yolo_annotations))
+            out_stem = output_stem(rel_path)
+            out_img = os.path.join(split_name, 'images', out_stem + os.path.splitext(img_path)[1])
+            out_label = os.path.join(split_name, 'labels', f"{out_stem}.txt")
+            record['outputs'] = [out_img, out_label]
+            claim_outputs(claimed, rel_path, record['outputs'])
+            tasks.append((rel_path, (img_path, json_path, os.path.join(output_dir, out_img), os.path.join(output_dir, out_label))))
+        
+        # Images removed from the input since the last run
+        for record in previous.values():
+            remove_outputs(output_dir, record)
+        
+        print(f"{len(tasks)} to convert, {unchanged} unchanged, {len(previous)} removed")
+        
+        # Convert in chunks across worker processes
+        statuses = Counter()
+        methods = Counter()
+        unknown_classes = Counter()
+        if tasks:
+            chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+            progress = Progress(len(tasks), 'converting')
+            results = executor.map(
+                process_chunk,
+                [[task for _, task in chunk] for chunk in chunks],
+                [class_mapping] * len(chunks),
+                [args.link] * len(chunks)
+            )
+            for chunk, chunk_results in zip(chunks, results):
+                for (rel_path, _), (status, method, unknown) in zip(chunk, chunk_results):
+                    statuses[status] += 1
+                    if method:
+                        methods[method] += 1
+                    unknown_classes.update(unknown)
+                    manifest[rel_path]['status'] = status
+                    if status != 'ok':
+                        manifest[rel_path]['outputs'] = []
+                progress.update(len(chunk))
+                # Save as we go so an interrupted run resumes where it stopped
+                save_manifest(output_dir, config, {k: v for k, v in manifest.items() if 'status' in v})
+    
+    save_manifest(output_dir, config, manifest)
     
     # Create dataset.yaml file
     yaml_path = os.path.join(output_dir, 'data.yaml')
@@ -189,16 +512,31 @@ def process_dataset(args):
         }
         f.write('# YOLOv8 dataset config\n')
         for key, value in yaml_content.items():
-            if key == 'names':
-                f.write(f"{key}: {value}\n")
-            else:
-                f.write(f"{key}: {value}\n")
+            f.write(f"{key}: {value}\n")
+    
+    # Summarize skipped images instead of reporting each one
+    for status, count in sorted(statuses.items()):
+        if status != 'ok':
+            print(f"Warning: Skipped {count} images ({status.replace('_', ' ')})")
+    for class_name, count in unknown_classes.most_common():
+        print(f"Warning: Class '{class_name}' not found in mapping ({count} annotations skipped)")
+    if methods:
+        print("Placed images by " + ', '.join(f"{method} ({count})" for method, count in methods.most_common()))
+    
+    # Near-duplicate summary over the whole dataset, not just this run
+    if not args.no_dedup:
+        groups = Counter(record['group'] for record in manifest.values())
+        grouped = sum(size for size in groups.values() if size > 1)
+        removed = sum(1 for record in manifest.values() if record.get('status') == 'duplicate')
+        print(f"Near-duplicates: {sum(1 for size in groups.values() if size > 1)} groups covering {grouped} images; "
+              f"{removed} redundant images removed")
     
+    split_counts = Counter(record['split'] for record in manifest.values() if record.get('status') == 'ok')
     print(f"Dataset prepared successfully!")
-    print(f"Total images: {len(image_files)}")
-    print(f"Train: {len(dataset_splits['train'])} images")
-    print(f"Validation: {len(dataset_splits['val'])} images")
-    print(f"Test: {len(dataset_splits['test'])} images")
+    print(f"Total images: {sum(split_counts.values())}")
+    print(f"Train: {split_counts['train']} images")
+    print(f"Validation: {split_counts['val']} images")
+    print(f"Test: {split_counts['test']} images")
     print(f"Dataset YAML: {yaml_path}")
 
 def main():
@@ -206,4 +544,4 @@ def main():
     process_dataset(args)
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
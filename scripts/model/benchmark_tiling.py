@@ -0,0 +1,130 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import cv2
+import numpy as np
+
+# Make the backend model package importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+from model.model import EwasteDetector
+from model.ops import box_iou
+from common import load_labels
+
+def setup_args():
+    parser = argparse.ArgumentParser(description='Compare tiled and single-pass inference on high-resolution images')
+    parser.add_argument('--weights', type=str, required=True, help='Path to the model weights (.pt or .onnx)')
+    parser.add_argument('--images', type=str, required=True, help='Directory of test images')
+    parser.add_argument('--labels', type=str, default=None,
+                        help='Directory of YOLO label files for recall (defaults to ../labels next to the images)')
+    parser.add_argument('--tile-sizes', type=int, nargs='+', default=[640, 960], help='Tile sizes to benchmark')
+    parser.add_argument('--overlap', type=float, default=0.2, help='Fraction of each tile shared with its neighbours')
+    parser.add_argument('--conf', type=float, default=0.25, help='Confidence threshold')
+    parser.add_argument('--iou', type=float, default=0.5, help='Minimum IoU for a detection to count as a hit')
+    parser.add_argument('--limit', type=int, default=50, help='Maximum number of images to use')
+    parser.add_argument('--output', type=str, default=None, help='Optional path for a JSON report')
+    return parser.parse_args()
+
+def count_hits(detections, gt_names, gt_boxes, iou_threshold):
+    """Number of ground-truth boxes matched by a detection of the same class"""
+    if not detections or len(gt_boxes) == 0:
+        return 0
+
+    det_boxes = np.array([d['bbox'] for d in detections], dtype=np.float32)
+    det_names = np.array([d['class'] for d in detections])
+    iou = box_iou(gt_boxes, det_boxes)
+    iou[gt_names[:, None] != det_names[None, :]] = 0
+
+    # Greedy one-to-one matching, best overlaps first
+    hits = 0
+    for i in np.argsort(-iou.max(axis=1)):
+        j = int(iou[i].argmax())
+        if iou[i, j] < iou_threshold:
+            continue
+        hits += 1
+        iou[:, j] = 0
+    return hits
+
+def class_name(detector, class_id):
+    """Name the detector would report for a class id"""
+    names = detector.backend.names
+    if names:
+        return names.get(class_id, f"class_{class_id}")
+    return detector.labels[class_id] if class_id < len(detector.labels) else f"class_{class_id}"
+
+def run_config(detector, samples, conf, tile_size, overlap, iou_threshold):
+    """Time every image through one configuration and measure recall"""
+    latencies = []
+    hits = 0
+    total = 0
+    for image, gt_boxes, gt_names in samples:
+        start = time.perf_counter()
+        detections = detector.detect(image, conf, tile_size, overlap)
+        latencies.append(time.perf_counter() - start)
+
+        hits += count_hits(detections, gt_names, gt_boxes, iou_threshold)
+        total += len(gt_boxes)
+
+    latencies = np.array(latencies)
+    p50, p90 = np.percentile(latencies, [50, 90])
+    return {
+        'tile_size': tile_size,
+        'overlap': overlap if tile_size else None,
+        'mean_ms': float(latencies.mean() * 1000),
+        'p50_ms': float(p50 * 1000),
+        'p90_ms': float(p90 * 1000),
+        'recall': hits / total if total else None,
+        'ground_truth': total
+    }
+
+def main():
+    args = setup_args()
+
+    image_paths = sorted(
+        path for path in glob.glob(os.path.join(args.images, '*'))
+        if path.lower().endswith(('.jpg', '.jpeg', '.png'))
+    )[:args.limit]
+    if not image_paths:
+        print(f"Error: No images found in {args.images}", file=sys.stderr)
+        sys.exit(1)
+
+    labels_dir = args.labels or os.path.join(os.path.dirname(os.path.abspath(args.images)), 'labels')
+    detector = EwasteDetector(model_path=args.weights)
+
+    # Decode everything up front so only inference is timed
+    samples = []
+    for path in image_paths:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"Warning: Could not read {path}")
+            continue
+        height, width = image.shape[:2]
+        stem = os.path.splitext(os.path.basename(path))[0]
+        gt_boxes, gt_classes = load_labels(os.path.join(labels_dir, f"{stem}.txt"), width, height)
+        gt_names = np.array([class_name(detector, int(c)) for c in gt_classes])
+        samples.append((image, gt_boxes, gt_names))
+
+    # Warm up so the first configuration does not pay for lazy initialization
+    detector.detect(samples[0][0], args.conf)
+
+    results = [run_config(detector, samples, args.conf, None, args.overlap, args.iou)]
+    for tile_size in args.tile_sizes:
+        results.append(run_config(detector, samples, args.conf, tile_size, args.overlap, args.iou))
+
+    print(f"{len(samples)} images, IoU >= {args.iou}")
+    print(f"{'mode':<14}{'mean ms':>10}{'p50 ms':>10}{'p90 ms':>10}{'recall':>10}")
+    for result in results:
+        mode = f"tile {result['tile_size']}" if result['tile_size'] else 'single pass'
+        recall = f"{result['recall']:.3f}" if result['recall'] is not None else 'n/a'
+        print(f"{mode:<14}{result['mean_ms']:>10.1f}{result['p50_ms']:>10.1f}{result['p90_ms']:>10.1f}{recall:>10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'images': len(samples), 'iou': args.iou, 'conf': args.conf, 'results': results}, f, indent=2)
+        print(f"Report written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import glob
+import argparse
+import numpy as np
+
+# Make the backend model package importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+from model.backends import UltralyticsBackend, OnnxBackend
+from model.ops import box_iou
+
+def setup_args():
+    parser = argparse.ArgumentParser(description='Check that the ONNX backend matches the PyTorch backend')
+    parser.add_argument('--weights', type=str, required=True, help='Path to the .pt weights')
+    parser.add_argument('--onnx', type=str, required=True, help='Path to the .onnx export of the same weights')
+    parser.add_argument('--images', type=str, required=True, help='Directory of test images')
+    parser.add_argument('--conf', type=float, default=0.25, help='Confidence threshold')
+    parser.add_argument('--iou', type=float, default=0.9, help='Minimum IoU for two boxes to count as the same detection')
+    parser.add_argument('--conf-tolerance', type=float, default=0.02, help='Maximum allowed confidence difference')
+    parser.add_argument('--limit', type=int, default=50, help='Maximum number of images to compare')
+    return parser.parse_args()
+
+def compare(reference, candidate, iou_threshold, conf_tolerance):
+    """
+    Match the detections of two backends for one image
+
+    Returns:
+        Tuple of (number of unmatched detections, largest confidence difference)
+    """
+    ref_boxes, ref_scores, ref_classes = reference
+    cand_boxes, cand_scores, cand_classes = candidate
+
+    if len(ref_boxes) == 0 or len(cand_boxes) == 0:
+        return abs(len(ref_boxes) - len(cand_boxes)), 0.0
+
+    # Only boxes of the same class may match
+    iou = box_iou(ref_boxes, cand_boxes)
+    iou[ref_classes[:, None] != cand_classes[None, :]] = 0
+
+    unmatched = 0
+    max_diff = 0.0
+    for i in np.argsort(-ref_scores):
+        j = int(iou[i].argmax())
+        if iou[i, j] < iou_threshold:
+            unmatched += 1
+            continue
+        diff = abs(float(ref_scores[i]) - float(cand_scores[j]))
+        max_diff = max(max_diff, diff)
+        if diff > conf_tolerance:
+            unmatched += 1
+        iou[:, j] = 0
+
+    # Extra candidate detections with no reference counterpart
+    unmatched += max(0, len(cand_boxes) - len(ref_boxes))
+    return unmatched, max_diff
+
+def main():
+    args = setup_args()
+
+    image_files = []
+    for ext in ['jpg', 'jpeg', 'png']:
+        image_files.extend(glob.glob(os.path.join(args.images, f'*.{ext}')))
+    image_files = sorted(image_files)[:args.limit]
+
+    if not image_files:
+        print(f"Error: No images found in {args.images}")
+        sys.exit(1)
+
+    reference = UltralyticsBackend(args.weights)
+    candidate = OnnxBackend(args.onnx)
+
+    failures = 0
+    worst_diff = 0.0
+    for path in image_files:
+        unmatched, max_diff = compare(
+            reference.predict([path], args.conf)[0],
+            candidate.predict([path], args.conf)[0],
+            args.iou, args.conf_tolerance
+        )
+        worst_diff = max(worst_diff, max_diff)
+        if unmatched:
+            failures += 1
+            print(f"Mismatch: {path} ({unmatched} unmatched detections)")
+
+    print(f"Compared {len(image_files)} images: {failures} mismatched, "
+          f"largest confidence difference {worst_diff:.4f}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+import os
+import sys
+import numpy as np
+
+# Make the backend model package importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+from model.ops import xywh_to_xyxy
+
+def load_labels(label_path, width, height):
+    """
+    Read a YOLO label file into pixel boxes
+
+    Returns:
+        Tuple of (boxes in x1, y1, x2, y2 format, class ids)
+    """
+    if not os.path.exists(label_path):
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+    rows = np.loadtxt(label_path, ndmin=2, dtype=np.float32)
+    if rows.size == 0:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+    boxes = xywh_to_xyxy(rows[:, 1:5] * np.array([width, height, width, height], dtype=np.float32))
+    return boxes, rows[:, 0].astype(np.int64)
@@ -0,0 +1,286 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import yaml
+
+# Make the backend model package importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+from model.model import EwasteDetector, decode_reduced, scale_detections
+from model.ops import box_iou
+from common import load_labels
+
+# COCO-style IoU thresholds 0.50:0.05:0.95
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+def setup_args():
+    parser = argparse.ArgumentParser(description='Score the serving detector against YOLO-format labels')
+    parser.add_argument('--weights', type=str, required=True,
+                        help='Weights as served (.pt, .onnx, a .json stub or a directory of exported variants)')
+    parser.add_argument('--data', type=str, required=True, help='Path to the data.yaml written by prepare_dataset.py')
+    parser.add_argument('--split', type=str, default='test', choices=['train', 'val', 'test'], help='Split to evaluate')
+    parser.add_argument('--conf', type=float, default=0.25, help='Confidence threshold, as configured for serving')
+    parser.add_argument('--tile-size', type=int, default=None, help='Tile size for tiled inference (default: off)')
+    parser.add_argument('--tile-overlap', type=float, default=0.2, help='Fraction of each tile shared with its neighbours')
+    parser.add_argument('--full-decode', action='store_true',
+                        help='Decode JPEGs at full size, as served with REDUCED_DECODE=0 (always the case with tiling)')
+    parser.add_argument('--batch-size', type=int, default=8, help='Images per detect_batch call')
+    parser.add_argument('--threads', type=int, default=None, help='ONNX Runtime threads')
+    parser.add_argument('--limit', type=int, default=None, help='Maximum number of images to evaluate')
+    parser.add_argument('--output', type=str, default=None, help='Optional path for a JSON report')
+    return parser.parse_args()
+
+def split_images(data_yaml, split):
+    """Image paths of a split and the class names, from a data.yaml"""
+    with open(data_yaml) as f:
+        data = yaml.safe_load(f)
+    images_dir = data[split]
+    if not os.path.isabs(images_dir) and data.get('path'):
+        images_dir = os.path.join(data['path'], images_dir)
+    names = data['names']
+    if isinstance(names, dict):
+        names = [names[i] for i in sorted(names)]
+    paths = sorted(
+        path for path in glob.glob(os.path.join(images_dir, '*'))
+        if path.lower().endswith(('.jpg', '.jpeg', '.png'))
+    )
+    return paths, list(names)
+
+def label_path(image_path):
+    """YOLO label file for an image: the labels directory next to its images directory"""
+    images_dir, filename = os.path.split(image_path)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(os.path.dirname(images_dir), 'labels', f"{stem}.txt")
+
+def load_batches(paths, batch_size, min_side=None, stats=None):
+    """
+    Decode images one batch ahead of the consumer, the way the server decodes uploads
+
+    Args:
+        paths: Image files
+        batch_size: Images per batch
+        min_side: JPEGs are decoded at reduced size down to this long side
+            (None decodes at full size)
+        stats: Optional DetectionStats the decode times are recorded in
+
+    Yields:
+        Lists of (path, image, scale) tuples, where scale maps boxes found in
+        the image back onto the file's pixels; unreadable images are left out
+    """
+    def decode(batch_paths):
+        batch = []
+        for path in batch_paths:
+            start = time.perf_counter()
+            try:
+                with open(path, 'rb') as f:
+                    image, scale = decode_reduced(f.read(), min_side)
+            except (OSError, ValueError):
+                continue
+            if stats is not None:
+                stats.record_stage('decode', time.perf_counter() - start)
+            batch.append((path, image, scale))
+        return batch
+
+    batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = executor.submit(decode, batches[0]) if batches else None
+        for next_paths in batches[1:] + [None]:
+            batch = pending.result()
+            pending = executor.submit(decode, next_paths) if next_paths is not None else None
+            yield batch
+
+def match_detections(det_boxes, det_classes, gt_boxes, gt_classes):
+    """
+    True positives of one image's detections at every IoU threshold
+
+    Detections and ground truth are paired one-to-one, greedily by IoU,
+    and only within the same class.
+
+    Returns:
+        Boolean array of shape (detections, thresholds)
+    """
+    tp = np.zeros((len(det_boxes), len(IOU_THRESHOLDS)), dtype=bool)
+    if len(det_boxes) == 0 or len(gt_boxes) == 0:
+        return tp
+
+    iou = box_iou(gt_boxes, det_boxes)
+    iou[gt_classes[:, None] != det_classes[None, :]] = 0
+    for t, threshold in enumerate(IOU_THRESHOLDS):
+        gt_idx, det_idx = np.nonzero(iou >= threshold)
+        if len(gt_idx) == 0:
+            continue
+        # Best overlaps first; each detection and each ground-truth box used once
+        order = np.argsort(-iou[gt_idx, det_idx], kind='stable')
+        gt_idx, det_idx = gt_idx[order], det_idx[order]
+        _, first = np.unique(det_idx, return_index=True)
+        gt_idx, det_idx = gt_idx[first], det_idx[first]
+        order = np.argsort(-iou[gt_idx, det_idx], kind='stable')
+        gt_idx, det_idx = gt_idx[order], det_idx[order]
+        _, first = np.unique(gt_idx, return_index=True)
+        tp[det_idx[first], t] = True
+    return tp
+
+def average_precision(tp, conf, n_gt):
+    """
+    AP at every IoU threshold for one class, with COCO 101-point interpolation
+
+    Args:
+        tp: Boolean array (detections, thresholds)
+        conf: Detection confidences
+        n_gt: Number of ground-truth boxes of the class
+
+    Returns:
+        Array of APs, one per threshold
+    """
+    if n_gt == 0 or len(tp) == 0:
+        return np.zeros(len(IOU_THRESHOLDS))
+
+    order = np.argsort(-conf, kind='stable')
+    tp_cum = np.cumsum(tp[order], axis=0)
+    fp_cum = np.cumsum(~tp[order], axis=0)
+    recall = tp_cum / n_gt
+    precision = tp_cum / (tp_cum + fp_cum)
+
+    # Precision envelope: best precision at this recall or any higher one
+    envelope = np.flip(np.maximum.accumulate(np.flip(precision, axis=0), axis=0), axis=0)
+    points = np.linspace(0, 1, 101)
+    aps = np.empty(len(IOU_THRESHOLDS))
+    for t in range(len(IOU_THRESHOLDS)):
+        index = np.searchsorted(recall[:, t], points, side='left')
+        sampled = np.zeros(len(points))
+        valid = index < len(recall)
+        sampled[valid] = envelope[index[valid], t]
+        aps[t] = sampled.mean()
+    return aps
+
+def summarize(tp, conf, det_classes, gt_classes, names):
+    """Per-class and overall precision, recall, mAP50 and mAP50-95"""
+    per_class = {}
+    for class_id, name in enumerate(names):
+        det_mask = det_classes == class_id
+        n_gt = int((gt_classes == class_id).sum())
+        n_det = int(det_mask.sum())
+        if n_gt == 0 and n_det == 0:
+            continue
+        class_tp = tp[det_mask]
+        aps = average_precision(class_tp, conf[det_mask], n_gt)
+        hits = int(class_tp[:, 0].sum())
+        per_class[name] = {
+            'ground_truth': n_gt,
+            'detections': n_det,
+            'precision': hits / n_det if n_det else 0.0,
+            'recall': hits / n_gt if n_gt else 0.0,
+            'map50': float(aps[0]),
+            'map50_95': float(aps.mean())
+        }
+
+    # Classes without ground truth only add false positives, so they stay out of the mean
+    scored = [values for values in per_class.values() if values['ground_truth']]
+    total_hits = int(tp[:, 0].sum()) if len(tp) else 0
+    overall = {
+        'precision': total_hits / len(tp) if len(tp) else 0.0,
+        'recall': total_hits / len(gt_classes) if len(gt_classes) else 0.0,
+        'map50': float(np.mean([values['map50'] for values in scored])) if scored else 0.0,
+        'map50_95': float(np.mean([values['map50_95'] for values in scored])) if scored else 0.0
+    }
+    return overall, per_class
+
+def main():
+    args = setup_args()
+
+    paths, names = split_images(args.data, args.split)
+    paths = paths[:args.limit] if args.limit else paths
+    if not paths:
+        print(f"Error: No images in the {args.split} split of {args.data}", file=sys.stderr)
+        sys.exit(1)
+    class_ids = {name: i for i, name in enumerate(names)}
+
+    options = {'num_threads': args.threads} if args.threads else {}
+    detector = EwasteDetector(model_path=args.weights, allow_download=False, **options)
+    detector.warmup(1)
+    # Reduced decoding only applies without tiling, as in the server
+    reduced = not args.full_decode and not args.tile_size
+    min_side = detector.input_size() if reduced else None
+
+    all_tp, all_conf, all_det_classes, all_gt_classes = [], [], [], []
+    images = 0
+    detect_seconds = 0.0
+    start = time.perf_counter()
+    for batch in load_batches(paths, max(1, args.batch_size), min_side, detector.stats):
+        if not batch:
+            continue
+        batch_start = time.perf_counter()
+        results = detector.detect_batch([image for _, image, _ in batch], args.conf, args.tile_size, args.tile_overlap)
+        detect_seconds += time.perf_counter() - batch_start
+
+        for (path, image, scale), detections in zip(batch, results):
+            # Match in the file's full-size pixels, which the labels are relative to
+            detections = scale_detections(detections, scale)
+            height, width = image.shape[:2]
+            width, height = round(width * scale[0]), round(height * scale[1])
+            gt_boxes, gt_classes = load_labels(label_path(path), width, height)
+            det_boxes = np.array([det['bbox'] for det in detections], dtype=np.float32).reshape(-1, 4)
+            det_classes = np.array([class_ids.get(det['class'], -1) for det in detections], dtype=np.int64)
+            det_conf = np.array([det['confidence'] for det in detections], dtype=np.float32)
+
+            all_tp.append(match_detections(det_boxes, det_classes, gt_boxes, gt_classes))
+            all_conf.append(det_conf)
+            all_det_classes.append(det_classes)
+            all_gt_classes.append(gt_classes)
+        images += len(batch)
+    elapsed = time.perf_counter() - start
+    if not images:
+        print(f"Error: None of the {len(paths)} images in the {args.split} split could be decoded", file=sys.stderr)
+        sys.exit(1)
+
+    gt_classes = np.concatenate(all_gt_classes)
+    det_conf = np.concatenate(all_conf)
+    overall, per_class = summarize(
+        np.concatenate(all_tp), det_conf, np.concatenate(all_det_classes), gt_classes, names
+    )
+    throughput = {
+        'images': images,
+        'images_per_second': images / elapsed if elapsed else 0.0,
+        'detect_ms_per_image': detect_seconds / images * 1000 if images else 0.0,
+        # Mean time per image in each recorded stage (decode, inference, postprocess)
+        'stages_ms': {
+            stage: summary['mean'] * 1000
+            for stage, summary in ((stage, window.summary()) for stage, window in detector.stats.latency.stages.items())
+            if summary['count']
+        }
+    }
+
+    print(f"{images} images from {args.split}, conf {args.conf}"
+          + (f", tiles {args.tile_size}" if args.tile_size else ''))
+    print(f"{'class':<16}{'gt':>7}{'det':>7}{'P':>8}{'R':>8}{'mAP50':>8}{'mAP50-95':>10}")
+    for name, values in per_class.items():
+        print(f"{name:<16}{values['ground_truth']:>7}{values['detections']:>7}{values['precision']:>8.3f}"
+              f"{values['recall']:>8.3f}{values['map50']:>8.3f}{values['map50_95']:>10.3f}")
+    print(f"{'all':<16}{len(gt_classes):>7}{len(det_conf):>7}"
+          f"{overall['precision']:>8.3f}{overall['recall']:>8.3f}{overall['map50']:>8.3f}{overall['map50_95']:>10.3f}")
+    print(f"{throughput['images_per_second']:.1f} images/s end to end, "
+          f"{throughput['detect_ms_per_image']:.1f} ms per image in detect_batch")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'weights': args.weights,
+                'split': args.split,
+                'conf': args.conf,
+                'tile_size': args.tile_size,
+                'tile_overlap': args.tile_overlap if args.tile_size else None,
+                'reduced_decode': reduced,
+                'batch_size': args.batch_size,
+                'overall': overall,
+                'per_class': per_class,
+                'throughput': throughput
+            }, f, indent=2)
+        print(f"Report written to {args.output}")
+
+if __name__ == '__main__':
+    main()
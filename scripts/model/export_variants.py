@@ -0,0 +1,221 @@
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import numpy as np
+import yaml
+
+# Make the backend model package importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+from model.backends import OnnxBackend, EXPORT_REPORT
+from model.model import EwasteDetector
+
+def setup_args():
+    parser = argparse.ArgumentParser(description='Export, benchmark and select CPU deployment variants of trained weights')
+    parser.add_argument('--weights', type=str, required=True, help='Path to the trained .pt weights')
+    parser.add_argument('--data', type=str, required=True, help='Path to the data.yaml file (its val split is used)')
+    parser.add_argument('--output-dir', type=str, default=None,
+                        help='Directory for the variants and the report (default: deploy/ next to the weights)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[640, 480, 320], help='Input sizes to export')
+    parser.add_argument('--quantize', type=str, nargs='*', default=['dynamic', 'static'],
+                        choices=['dynamic', 'static'], help='INT8 quantization modes to produce per size')
+    parser.add_argument('--calib-images', type=int, default=100, help='Val images used to calibrate static quantization')
+    parser.add_argument('--bench-images', type=int, default=20, help='Val images timed per variant')
+    parser.add_argument('--bench-runs', type=int, default=3, help='Timed passes over the benchmark images')
+    parser.add_argument('--threads', type=int, default=None, help='ONNX Runtime threads while benchmarking')
+    parser.add_argument('--max-map-drop', type=float, default=0.01,
+                        help='Largest mAP50-95 loss against the FP32 reference a variant may have to be selected')
+    return parser.parse_args()
+
+def val_images(data_yaml, limit):
+    """Paths of the first `limit` images of the val split"""
+    with open(data_yaml) as f:
+        data = yaml.safe_load(f)
+    val_dir = data['val']
+    if not os.path.isabs(val_dir) and data.get('path'):
+        val_dir = os.path.join(data['path'], val_dir)
+    paths = sorted(
+        path for path in glob.glob(os.path.join(val_dir, '*'))
+        if path.lower().endswith(('.jpg', '.jpeg', '.png'))
+    )
+    if not paths:
+        raise FileNotFoundError(f"No val images found in {val_dir}")
+    return paths[:limit]
+
+def export_onnx(weights, imgsz, output_path):
+    """Export the weights to a fixed-shape FP32 ONNX model"""
+    from ultralytics import YOLO
+
+    exported = YOLO(weights).export(format='onnx', imgsz=imgsz, dynamic=False, simplify=True)
+    shutil.move(exported, output_path)
+    return output_path
+
+class CalibrationReader:
+    """Feeds letterboxed val images to the static quantizer, one at a time"""
+
+    def __init__(self, model_path, image_paths):
+        self.backend = OnnxBackend(model_path)
+        self.image_paths = list(image_paths)
+        self._index = 0
+
+    def get_next(self):
+        if self._index >= len(self.image_paths):
+            return None
+        batch, _ = self.backend.preprocess([self.image_paths[self._index]])
+        self._index += 1
+        return {self.backend.input_name: batch}
+
+    def rewind(self):
+        self._index = 0
+
+def quantize(fp32_path, output_path, mode, calib_paths):
+    """
+    Quantize an FP32 ONNX model to INT8
+
+    Args:
+        fp32_path: Exported FP32 model
+        output_path: Where to write the quantized model
+        mode: 'dynamic' (weights only, activations quantized at run time) or
+            'static' (activations calibrated on calib_paths)
+        calib_paths: Images for static calibration
+    """
+    from onnxruntime.quantization import quantize_dynamic, quantize_static, QuantType, QuantFormat, CalibrationMethod
+
+    if mode == 'dynamic':
+        quantize_dynamic(fp32_path, output_path, weight_type=QuantType.QUInt8)
+    else:
+        quantize_static(
+            fp32_path, output_path, CalibrationReader(fp32_path, calib_paths),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+            calibrate_method=CalibrationMethod.MinMax
+        )
+    return output_path
+
+def benchmark_latency(model_path, image_paths, runs, threads=None):
+    """Per-image CPU latency of a variant through the serving detector"""
+    options = {'num_threads': threads} if threads else {}
+    detector = EwasteDetector(model_path=model_path, allow_download=False, **options)
+    detector.warmup(2)
+
+    latencies = []
+    for _ in range(runs):
+        for path in image_paths:
+            start = time.perf_counter()
+            detector.detect(path)
+            latencies.append(time.perf_counter() - start)
+
+    latencies = np.array(latencies)
+    p50, p90 = np.percentile(latencies, [50, 90])
+    return {
+        'mean_ms': float(latencies.mean() * 1000),
+        'p50_ms': float(p50 * 1000),
+        'p90_ms': float(p90 * 1000)
+    }
+
+def evaluate_map(model_path, data_yaml, imgsz):
+    """mAP50 and mAP50-95 of a model on the val split"""
+    from ultralytics import YOLO
+
+    metrics = YOLO(model_path, task='detect').val(data=data_yaml, imgsz=imgsz, batch=1, plots=False, verbose=False)
+    return {'map50': float(metrics.box.map50), 'map50_95': float(metrics.box.map)}
+
+def select_variant(variants, max_map_drop):
+    """
+    Fastest variant whose mAP50-95 is within max_map_drop of the reference
+
+    Returns:
+        Name of the selected variant (the reference when nothing qualifies)
+    """
+    reference = next(variant for variant in variants if variant['reference'])
+    eligible = []
+    for variant in variants:
+        variant['map_drop'] = reference['map50_95'] - variant['map50_95']
+        variant['eligible'] = variant['map_drop'] <= max_map_drop
+        if variant['eligible']:
+            eligible.append(variant)
+    return min(eligible, key=lambda variant: variant['latency']['p50_ms'])['name']
+
+def export_deployment_variants(weights, data_yaml, output_dir=None, sizes=(640, 480, 320),
+                               quantize_modes=('dynamic', 'static'), calib_images=100,
+                               bench_images=20, bench_runs=3, threads=None, max_map_drop=0.01):
+    """
+    Export deployment variants, measure them and select one
+
+    Every input size is exported as FP32 ONNX and, for each quantization
+    mode, as INT8. All variants are timed on the CPU through the serving
+    detector and evaluated on the val split. The reference is FP32 at the
+    first size. The report marks the fastest variant within the accuracy
+    budget as selected, and serving the output directory loads that variant.
+
+    Returns:
+        The report dict (also written to export_report.json in output_dir)
+    """
+    output_dir = output_dir or os.path.join(os.path.dirname(os.path.abspath(weights)), 'deploy')
+    os.makedirs(output_dir, exist_ok=True)
+    calib_paths = val_images(data_yaml, calib_images)
+    bench_paths = val_images(data_yaml, bench_images)
+
+    # Export every variant first
+    variants = []
+    for imgsz in sizes:
+        fp32_file = f"fp32-{imgsz}.onnx"
+        print(f"Exporting {fp32_file}")
+        export_onnx(weights, imgsz, os.path.join(output_dir, fp32_file))
+        variants.append({'name': f"fp32-{imgsz}", 'file': fp32_file, 'imgsz': imgsz, 'precision': 'fp32'})
+
+        for mode in quantize_modes:
+            int8_file = f"int8-{mode}-{imgsz}.onnx"
+            print(f"Quantizing {int8_file}")
+            try:
+                quantize(os.path.join(output_dir, fp32_file), os.path.join(output_dir, int8_file), mode, calib_paths)
+            except Exception as e:
+                print(f"Warning: {mode} quantization at {imgsz} failed: {e}")
+                continue
+            variants.append({'name': f"int8-{mode}-{imgsz}", 'file': int8_file, 'imgsz': imgsz, 'precision': f'int8-{mode}'})
+
+    # Then measure them one after another on an otherwise idle machine
+    for i, variant in enumerate(variants):
+        path = os.path.join(output_dir, variant['file'])
+        variant['reference'] = i == 0
+        variant['size_bytes'] = os.path.getsize(path)
+        variant['latency'] = benchmark_latency(path, bench_paths, bench_runs, threads)
+        variant.update(evaluate_map(path, data_yaml, variant['imgsz']))
+        print(f"{variant['name']:<22}{variant['latency']['p50_ms']:>10.1f} ms p50"
+              f"{variant['map50']:>10.3f} mAP50{variant['map50_95']:>10.3f} mAP50-95")
+
+    selected = select_variant(variants, max_map_drop)
+    report = {
+        'weights': os.path.abspath(weights),
+        'data': os.path.abspath(data_yaml),
+        'created': time.time(),
+        'max_map_drop': max_map_drop,
+        'threads': threads,
+        'selected': selected,
+        'variants': variants
+    }
+    report_path = os.path.join(output_dir, EXPORT_REPORT)
+    temp_path = report_path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    # Replaced in one step so a server watching the directory never reads half a report
+    os.replace(temp_path, report_path)
+
+    print(f"Selected {selected}; report written to {report_path}")
+    return report
+
+def main():
+    args = setup_args()
+    export_deployment_variants(
+        args.weights, args.data, args.output_dir, args.sizes, args.quantize,
+        args.calib_images, args.bench_images, args.bench_runs, args.threads, args.max_map_drop
+    )
+
+if __name__ == '__main__':
+    main()
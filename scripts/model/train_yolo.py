@@ -3,6 +3,8 @@ import argparse
 import yaml
 from ultralytics import YOLO
 
+from export_variants import export_deployment_variants
+
 def setup_args():
     parser = argparse.ArgumentParser(description='Train YOLOv8 model for e-waste detection')
     parser.add_argument('--data', type=str, default='data.yaml', help='Path to the data.yaml file')
@@ -14,6 +16,14 @@ def setup_args():
                         help='YOLOv8 model size: n(ano), s(mall), m(edium), l(arge), x(large)')
     parser.add_argument('--pretrained', action='store_true', help='Use pretrained weights')
     parser.add_argument('--output-dir', type=str, default='runs/train', help='Output directory')
+    parser.add_argument('--export-sizes', type=int, nargs='+', default=None,
+                        help='Input sizes to export deployment variants at; the first is the accuracy reference '
+                             '(default: the training size, then 480 and 320)')
+    parser.add_argument('--quantize', type=str, nargs='*', default=['dynamic', 'static'],
+                        choices=['dynamic', 'static'], help='INT8 quantization modes to export')
+    parser.add_argument('--max-map-drop', type=float, default=0.01,
+                        help='Largest mAP50-95 loss a deployment variant may have to be selected')
+    parser.add_argument('--skip-export', action='store_true', help='Only export a plain FP32 ONNX model')
     return parser.parse_args()
 
 def create_data_yaml(data_dir, output_yaml='data.yaml'):
@@ -78,8 +88,19 @@ def train_yolo(args):
     metrics = model.val()
     print(f"Validation metrics: {metrics}")
     
-    # Export the model to ONNX format for deployment
-    model.export(format='onnx')
+    # Export deployment variants, benchmark them on this CPU and select one
+    if args.skip_export:
+        model.export(format='onnx')
+    else:
+        best_weights = getattr(model.trainer, 'best', None) or os.path.join(
+            args.output_dir, f'ewaste_yolov8{args.model_size}', 'weights', 'best.pt'
+        )
+        # The first size is the accuracy reference
+        sizes = args.export_sizes or [args.img_size] + [size for size in (480, 320) if size < args.img_size]
+        export_deployment_variants(
+            str(best_weights), args.data, sizes=sizes, quantize_modes=args.quantize,
+            max_map_drop=args.max_map_drop
+        )
     
     print(f"Training completed. Model saved at {args.output_dir}/ewaste_yolov8{args.model_size}")
     return results